@@ -1,23 +1,69 @@
+import os
 import platform
 import subprocess
+import argparse
 import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from openai import OpenAI
 
+# Parser snmpwalk & context builder dipakai bersama dengan network API (folder 3_learn_n8n_diagnostic_icmp_snmp)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3_learn_n8n_diagnostic_icmp_snmp"))
+from snmp_walk_parser import interfaces_from_walk, interface_row
+from snmp_engine import SnmpClient, SnmpError, format_value
+from context_builder import build_context, DEFAULT_TOKEN_BUDGET
+from triage_rules import triage, render_report, findings_hint
+from analysis_cache import AnalysisCache, fingerprint
+
 # --- KONFIGURASI AI LOKAL ---
 # Sesuaikan base_url dengan setup AI lokal Anda (contoh: Ollama default port 11434, atau LM Studio 1234)
+# AI_BASE_URL juga bisa diarahkan ke openai_standin_server.py untuk testing tanpa model
+AI_BASE_URL = os.environ.get("AI_BASE_URL", "http://localhost:11434/v1")
 AI_CLIENT = OpenAI(
-    base_url="http://localhost:11434/v1", 
+    base_url=AI_BASE_URL, 
     api_key="local-ai" # API Key biasanya dummy untuk local AI
 )
-AI_MODEL_NAME = "gemma3:4b" # Sesuaikan dengan nama model yang Anda load (misal: mistral, llama3, qwen)
+AI_MODEL_NAME = os.environ.get("AI_MODEL_NAME", "gemma3:4b") # Sesuaikan dengan nama model yang Anda load (misal: mistral, llama3, qwen)
+# Streaming: laporan tampil token demi token (AI_STREAM=0 = tunggu jawaban lengkap)
+AI_STREAM = os.environ.get("AI_STREAM", "1") == "1"
+# Batas token data diagnostik di prompt (interface bermasalah didahulukan, sisanya diringkas)
+AI_CONTEXT_BUDGET = int(os.environ.get("AI_CONTEXT_BUDGET", DEFAULT_TOKEN_BUDGET))
+# Pre-triage berbasis rule sebelum AI:
+#   auto    - kasus yang jelas dijawab rule engine (mikrodetik), AI hanya untuk kasus yang tidak jelas
+#   explain - AI selalu dipanggil dan diberi temuan rule untuk dijelaskan
+#   off     - selalu AI tanpa pre-triage
+AI_TRIAGE = os.environ.get("AI_TRIAGE", "auto").lower()
+# Fleet mode (--batch): request AI bersamaan (samakan dengan slot paralel server, mis. OLLAMA_NUM_PARALLEL),
+# jumlah device sehat per prompt (0/1 = satu prompt per device) dan thread pengumpulan data
+AI_PARALLEL = int(os.environ.get("AI_PARALLEL", "4"))
+AI_GROUP_HEALTHY = int(os.environ.get("AI_GROUP_HEALTHY", "8"))
+FLEET_COLLECT_WORKERS = int(os.environ.get("FLEET_COLLECT_WORKERS", "16"))
+# Cache analisa AI di disk, dengan key fingerprint kondisi device (status, kelas loss, bucket latency/jitter,
+# interface bermasalah) - device yang kondisinya tidak berubah dijawab dari cache tanpa memanggil AI.
+# AI_CACHE_PATH kosong = cache mati; TTL dalam detik (0 = tidak kedaluwarsa)
+AI_CACHE_PATH = os.environ.get("AI_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "nms-ai", "analysis_cache.sqlite"))
+AI_CACHE_TTL = int(os.environ.get("AI_CACHE_TTL", "3600"))
+AI_CACHE_MAX_ENTRIES = int(os.environ.get("AI_CACHE_MAX_ENTRIES", "2000"))
+# SNMP: "native" = klien SNMPv2c in-process (1 GET untuk sysDescr+sysUpTime, GETBULK lockstep untuk ifTable,
+# tanpa fork), "subprocess" = satu proses snmpwalk per OID (butuh net-snmp terpasang)
+SNMP_ENGINE = os.environ.get("SNMP_ENGINE", "native").lower()
+SNMP_TIMEOUT = float(os.environ.get("SNMP_TIMEOUT", "1.0"))
+SNMP_RETRIES = int(os.environ.get("SNMP_RETRIES", "1"))
+OID_SYS_DESCR = '1.3.6.1.2.1.1.1.0'
+OID_SYS_UPTIME = '1.3.6.1.2.1.1.3.0'
+IF_STATUS_COLUMNS = ['1.3.6.1.2.1.2.2.1.2', '1.3.6.1.2.1.2.2.1.7', '1.3.6.1.2.1.2.2.1.8'] # ifDescr, ifAdminStatus, ifOperStatus
+# Naikkan setiap kali system prompt / format context berubah, supaya analisa lama di cache tidak dipakai lagi
+PROMPT_VERSION = "1"
 
 class NetworkCollector:
     """Kelas untuk mengambil data mentah dari perangkat network"""
     
-    def __init__(self, target_ip, community_string):
+    def __init__(self, target_ip, community_string, snmp_port=161):
         self.ip = target_ip
         self.community = community_string
+        self.snmp_port = snmp_port
 
     def ping_diagnostic(self):
         """Melakukan Advanced ICMP Ping (Status, Packet Loss, Latency, Jitter)"""
@@ -83,6 +129,10 @@ class NetworkCollector:
         except Exception as e:
             return {"status": "UNKNOWN", "error": f"Ping parsing error: {e}"}
 
+    def snmp_agent(self):
+        """Argumen agent untuk snmpwalk ("ip" atau "ip:port")"""
+        return self.ip if self.snmp_port == 161 else f"{self.ip}:{self.snmp_port}"
+
     def snmp_get(self, oid):
         """Helper untuk mengambil single OID via SNMP v2c menggunakan snmpwalk via subprocess"""
         try:
@@ -91,7 +141,7 @@ class NetworkCollector:
             # -O qv: Output value only (clean output)
             cmd = [
                 "snmpwalk", "-v2c", "-c", self.community, 
-                "-O", "qv", self.ip, oid
+                "-O", "qv", self.snmp_agent(), oid
             ]
             
             result = subprocess.check_output(cmd, stderr=subprocess.DEVNULL)
@@ -110,7 +160,7 @@ class NetworkCollector:
             cmd = [
                 "snmpwalk", "-v2c", "-c", self.community, 
                 "-O", "qn", # qn: Quick print numeric (OID = Value)
-                self.ip, oid
+                self.snmp_agent(), oid
             ]
             
             result = subprocess.check_output(cmd, stderr=subprocess.DEVNULL).decode("utf-8").strip()
@@ -122,6 +172,68 @@ class NetworkCollector:
             print(f"[!] Error walking OID {oid}: {e}")
             return None
 
+    def snmp_native(self):
+        """
+        (sysDescr, sysUpTime, interfaces) lewat satu socket UDP: 1 GET untuk kedua scalar,
+        lalu ifDescr/ifAdminStatus/ifOperStatus di-walk bersamaan dengan GETBULK.
+        sysDescr None kalau agent SNMP tidak menjawab.
+        """
+        try:
+            with SnmpClient(self.ip, self.community, port=self.snmp_port,
+                            timeout=SNMP_TIMEOUT, retries=SNMP_RETRIES) as client:
+                system = client.get([OID_SYS_DESCR, OID_SYS_UPTIME])
+                sys_descr = format_value(*system[OID_SYS_DESCR])
+                if not sys_descr:
+                    return None, None, []
+                sys_uptime = format_value(*system[OID_SYS_UPTIME])
+
+                print("   [+] SNMP Contacted. Fetching interfaces...")
+                interfaces_data = []
+                try:
+                    for idx, (descr, admin, oper) in client.walk_table(IF_STATUS_COLUMNS):
+                        if descr is None:
+                            continue
+                        interfaces_data.append(interface_row(
+                            idx, format_value(*descr),
+                            str(admin[1]) if admin else "0", str(oper[1]) if oper else "0"
+                        ))
+                except SnmpError as e:
+                    # Baris yang sudah diterima tetap dipakai
+                    print(f"Error processing interfaces: {e}")
+                return sys_descr, sys_uptime, interfaces_data
+        except SnmpError:
+            return None, None, []
+
+    def snmp_subprocess(self):
+        """Seperti snmp_native(), tapi dengan snmpwalk per OID (SNMP_ENGINE=subprocess)"""
+        sys_descr = self.snmp_get(OID_SYS_DESCR) # sysDescr
+        sys_uptime = self.snmp_get(OID_SYS_UPTIME) # sysUpTime
+        
+        # Jika basic SNMP gagal
+        if not sys_descr:
+            return None, None, []
+
+        # Interface Table Collection (IfAdminStatus, IfOperStatus, IfDescr)
+        # OIDs:
+        # ifDescr: .1.3.6.1.2.1.2.2.1.2
+        # ifAdminStatus: .1.3.6.1.2.1.2.2.1.7 (1=up, 2=down)
+        # ifOperStatus: .1.3.6.1.2.1.2.2.1.8 (1=up, 2=down)
+        print("   [+] SNMP Contacted. Fetching interfaces...")
+        interfaces_data = [] # List of dicts
+        try:
+            # Kita ambil raw walk text dan parse manual sederhana
+            # Note: Ini cara 'naive' tanpa library PySNMP/EasySNMP untuk portabilitas
+            raw_descr = self.snmp_walk('1.3.6.1.2.1.2.2.1.2') or ""
+            raw_admin = self.snmp_walk('1.3.6.1.2.1.2.2.1.7') or ""
+            raw_oper  = self.snmp_walk('1.3.6.1.2.1.2.2.1.8') or ""
+
+            # Parse ketiga walk sekaligus dan gabungkan per index (index OID lengkap)
+            interfaces_data = interfaces_from_walk("\n".join((raw_descr, raw_admin, raw_oper)))
+
+        except Exception as e:
+            print(f"Error processing interfaces: {e}")
+        return sys_descr, sys_uptime, interfaces_data
+
     def collect_full_diagnostic(self):
         """Mengumpulkan snapshot data untuk AI"""
         print(f"\n[🔄] Mengumpulkan data dari {self.ip}...")
@@ -135,72 +247,12 @@ class NetworkCollector:
                  "error": "Device completely unreachable via ICMP."
              }
 
-        # 2. SNMP Info Collection
-        snmp_status = "UP"
-        
-        # System Info
-        sys_descr = self.snmp_get('1.3.6.1.2.1.1.1.0') # sysDescr
-        sys_uptime = self.snmp_get('1.3.6.1.2.1.1.3.0') # sysUpTime
-        
-        # Jika basic SNMP gagal
-        if not sys_descr:
-             snmp_status = "DOWN"
-             # Masih bisa return data ping
-        
-        # Interface Table Collection (IfAdminStatus, IfOperStatus, IfDescr)
-        # OIDs:
-        # ifDescr: .1.3.6.1.2.1.2.2.1.2
-        # ifAdminStatus: .1.3.6.1.2.1.2.2.1.7 (1=up, 2=down)
-        # ifOperStatus: .1.3.6.1.2.1.2.2.1.8 (1=up, 2=down)
-        
-        interfaces_data = [] # List of dicts
-        
-        if snmp_status == "UP":
-            print("   [+] SNMP Contacted. Fetching interfaces...")
-            try:
-                # Kita ambil raw walk text dan parse manual sederhana
-                # Note: Ini cara 'naive' tanpa library PySNMP/EasySNMP untuk portabilitas
-                raw_descr = self.snmp_walk('1.3.6.1.2.1.2.2.1.2') or ""
-                raw_admin = self.snmp_walk('1.3.6.1.2.1.2.2.1.7') or ""
-                raw_oper  = self.snmp_walk('1.3.6.1.2.1.2.2.1.8') or ""
-                
-                # Parsing logic helper
-                def parse_walk_to_dict(raw_text):
-                    data = {}
-                    for line in raw_text.splitlines():
-                        if not line: continue
-                        # Format: .1.3.6...1.2.X = ...
-                        parts = line.split(" = ")
-                        if len(parts) >= 2:
-                            oid_part = parts[0]
-                            val_part = parts[1].strip()
-                            # Ambil index terakhir dari OID
-                            idx = oid_part.split(".")[-1]
-                            data[idx] = val_part
-                    return data
-
-                d_descr = parse_walk_to_dict(raw_descr)
-                d_admin = parse_walk_to_dict(raw_admin)
-                d_oper  = parse_walk_to_dict(raw_oper)
-                
-                # Gabungkan per index
-                for idx, name in d_descr.items():
-                    # Parse status from numeric (ex: 1)
-                    a_stat = d_admin.get(idx, "0")
-                    o_stat = d_oper.get(idx, "0")
-                    
-                    # Mapping status code
-                    status_map = {'1': 'UP', '2': 'DOWN', '3': 'TESTING'}
-                    
-                    interfaces_data.append({
-                        "id": idx,
-                        "name": name.strip('"'), # Remove quotes if string
-                        "admin_status": status_map.get(a_stat, f"Unknown({a_stat})"),
-                        "oper_status": status_map.get(o_stat, f"Unknown({o_stat})")
-                    })
-                    
-            except Exception as e:
-                print(f"Error processing interfaces: {e}")
+        # 2. SNMP Info Collection (native: tanpa fork snmpwalk, penting di fleet mode)
+        if SNMP_ENGINE == "native":
+            sys_descr, sys_uptime, interfaces_data = self.snmp_native()
+        else:
+            sys_descr, sys_uptime, interfaces_data = self.snmp_subprocess()
+        snmp_status = "UP" if sys_descr else "DOWN" # Masih bisa return data ping
 
         data_package = {
             "overall_status": "UP", # Pingable
@@ -209,24 +261,116 @@ class NetworkCollector:
             "device_info": sys_descr or "N/A",
             "uptime_raw": sys_uptime or "N/A",
             "interfaces_count": len(interfaces_data),
-            "interfaces_detail": interfaces_data[:10], # Limit output agar tidak flood context
-            "note": "Showing first 10 interfaces only"
+            # Semua interface: build_context() yang memilih & meringkas sesuai budget token
+            "interfaces_detail": interfaces_data
         }
         
         return data_package
 
+class StreamStats:
+    """Waktu & kecepatan satu jawaban streaming (time-to-first-token, tokens/sec)"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token = None
+        self.end = None
+        self.chunks = 0
+        self.completion_tokens = None # dari usage server (stream_options), kalau didukung
+        self.source = "llm"           # "rules" = dijawab rule engine, "cache" = analisa tersimpan; AI tidak dipanggil
+
+    def token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        self.chunks += 1
+
+    @property
+    def tokens(self):
+        # Tanpa usage dari server: satu chunk konten ~ satu token (Ollama / LM Studio)
+        return self.completion_tokens if self.completion_tokens is not None else self.chunks
+
+    def summary(self):
+        end = self.end or time.perf_counter()
+        ttft = (self.first_token or end) - self.start
+        generation = end - (self.first_token or end)
+        return {
+            "ttft_s": round(ttft, 3),
+            "total_s": round(end - self.start, 3),
+            "tokens": self.tokens,
+            # Kecepatan generate setelah token pertama (prefill tidak ikut dihitung)
+            "tokens_per_s": round((self.tokens - 1) / generation, 1) if generation > 0 and self.tokens > 1 else None,
+        }
+
+    def __str__(self):
+        s = self.summary()
+        if self.source == "rules":
+            return f"Rule-based verdict in {((self.end or time.perf_counter()) - self.start) * 1e6:.0f} µs (AI tidak dipanggil)"
+        if self.source == "cache":
+            return f"Cache hit in {((self.end or time.perf_counter()) - self.start) * 1e3:.1f} ms (AI tidak dipanggil)"
+        rate = f"{s['tokens_per_s']} tok/s" if s['tokens_per_s'] is not None else "n/a tok/s"
+        return f"TTFT {s['ttft_s']:.2f}s | {s['tokens']} tokens | {rate} | total {s['total_s']:.2f}s"
+
+def open_cache(path=None):
+    """AnalysisCache dari konfigurasi, atau None kalau cache dimatikan / file cache tidak bisa dibuka"""
+    path = AI_CACHE_PATH if path is None else path
+    if not path:
+        return None
+    try:
+        return AnalysisCache(path, ttl=AI_CACHE_TTL, max_entries=AI_CACHE_MAX_ENTRIES)
+    except Exception as e:
+        print(f"[!] Cache analisa tidak aktif ({path}): {e}")
+        return None
+
 class TroubleshootAgent:
     """AI Agent yang menganalisa data"""
-    
-    def analyze(self, data_context):
-        if "error" in data_context:
-            return f"❌ **CRITICAL FAILURE**: {data_context['error']}\nSaran: Cek kelistrikan fisik atau jalur kabel utama."
 
+    def __init__(self, triage_mode=None, cache=None):
+        self.triage_mode = triage_mode or AI_TRIAGE
+        # cache=None: dari konfigurasi AI_CACHE_*, cache=False: tanpa cache
+        self.cache = open_cache() if cache is None else (cache or None)
+        self.last_stats = None  # StreamStats dari analyze_stream() terakhir
+        self.last_triage = None # hasil triage() terakhir (verdict terstruktur)
+
+    def cache_key(self, data_context, triage_result=None, kind="single"):
+        """Key cache: fingerprint data + semua yang ikut menentukan jawaban (model, prompt, mode explain)"""
+        salt = "|".join((AI_MODEL_NAME, PROMPT_VERSION, str(AI_CONTEXT_BUDGET), kind,
+                         "explain" if triage_result is not None else "plain"))
+        return fingerprint(data_context, salt)
+
+    def cached_report(self, key):
+        return self.cache.get(key) if self.cache is not None else None
+
+    def store_report(self, key, report):
+        if self.cache is not None and report:
+            self.cache.put(key, report)
+
+    def _failure_report(self, data_context):
+        return f"❌ **CRITICAL FAILURE**: {data_context['error']}\nSaran: Cek kelistrikan fisik atau jalur kabel utama."
+
+    def pre_triage(self, data_context, explain=None):
+        """
+        (hasil triage, laporan rule atau None). Laporan rule hanya kalau hasilnya jelas
+        dan bukan mode explain; None berarti AI perlu dipanggil.
+        """
+        if self.triage_mode == "off":
+            self.last_triage = None
+            return None, None
+        result = self.last_triage = triage(data_context)
+        explain = self.triage_mode == "explain" if explain is None else explain
+        if result["conclusive"] and not explain:
+            return result, render_report(result, data_context.get('ip'))
+        return result, None
+
+    def build_messages(self, data_context, triage_result=None):
+        """Pesan system + user untuk chat completion"""
         # Prompt Engineering: Meminta AI bertindak sebagai Network Expert
         system_prompt = """
         You are a Senior Network Support Engineer acting as an automated troubleshooting agent.
         Your goal is to analyze the provided raw network data (ICMP metrics, SNMP Interface Status) and provide a concise, actionable summary.
         
+        The data is a compact text summary: one line per device / ICMP fact, then the
+        anomalous interfaces worst first as "|"-separated rows (header given), while
+        healthy interfaces are only counted.
+        
         Data Interpretation Guide:
         - Packet Loss > 0% is BAD.
         - High Jitter (> 20ms) suggests congestion or bad cabling.
@@ -240,28 +384,295 @@ class TroubleshootAgent:
         4. Suggest 2-3 specific next steps (CLI commands, Physical checks).
         """
 
-        user_message = f"""
-        Please analyze this diagnostic data for IP {data_context.get('ip', 'target')}:
-        {json.dumps(data_context, indent=2)}
-        """
+        user_message = (
+            f"Please analyze this diagnostic data for IP {data_context.get('ip', 'target')}:\n"
+            f"{build_context(data_context, AI_CONTEXT_BUDGET)}"
+        )
+        if triage_result is not None:
+            # Temuan rule engine sebagai petunjuk: AI menjelaskan & mengkorelasikan
+            user_message += f"\n{findings_hint(triage_result)}"
+
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+
+    def analyze(self, data_context, explain=None):
+        if "error" in data_context:
+            return self._failure_report(data_context)
+
+        triage_result, report = self.pre_triage(data_context, explain)
+        if report is not None:
+            return report
+
+        key = self.cache_key(data_context, triage_result)
+        cached = self.cached_report(key)
+        if cached is not None:
+            print("[💾] Kondisi device sama dengan analisa sebelumnya, jawaban dari cache.")
+            return cached
 
         print("[🤖] AI sedang menganalisa data...")
         
         try:
             completion = AI_CLIENT.chat.completions.create(
                 model=AI_MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
+                messages=self.build_messages(data_context, triage_result),
                 temperature=0.3, # Rendah agar analisis faktual & konsisten
             )
-            return completion.choices[0].message.content
+            analysis = completion.choices[0].message.content
+            self.store_report(key, analysis)
+            return analysis
         except Exception as e:
             return f"Error menghubungkan ke Local AI: {e}"
 
+    def analyze_stream(self, data_context, explain=None):
+        """Seperti analyze(), tapi yield potongan teks begitu token datang; statistik di self.last_stats"""
+        stats = self.last_stats = StreamStats()
+        if "error" in data_context:
+            stats.token()
+            stats.end = time.perf_counter()
+            yield self._failure_report(data_context)
+            return
+
+        triage_result, report = self.pre_triage(data_context, explain)
+        if report is not None:
+            stats.source = "rules"
+            stats.token()
+            stats.end = time.perf_counter()
+            yield report
+            return
+
+        key = self.cache_key(data_context, triage_result)
+        cached = self.cached_report(key)
+        if cached is not None:
+            stats.source = "cache"
+            stats.token()
+            stats.end = time.perf_counter()
+            yield cached
+            return
+
+        parts = []
+        try:
+            stream = AI_CLIENT.chat.completions.create(
+                model=AI_MODEL_NAME,
+                messages=self.build_messages(data_context, triage_result),
+                temperature=0.3, # Rendah agar analisis faktual & konsisten
+                stream=True,
+                stream_options={"include_usage": True}, # jumlah token asli di chunk terakhir (kalau server mendukung)
+            )
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None and chunk.usage.completion_tokens is not None:
+                    stats.completion_tokens = chunk.usage.completion_tokens
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    stats.token()
+                    parts.append(text)
+                    yield text
+            self.store_report(key, "".join(parts)) # hanya jawaban yang selesai utuh
+        except Exception as e:
+            yield f"\nError menghubungkan ke Local AI: {e}"
+        finally:
+            stats.end = time.perf_counter()
+
+# --- FLEET MODE (banyak device sekaligus) ---
+
+SEVERITY_ORDER = {"Critical": 0, "Warning": 1, "Unknown": 2, "Healthy": 3}
+
+FLEET_GROUP_PROMPT = """
+        You are a Senior Network Support Engineer reviewing several devices that automated
+        checks found healthy. Each device block starts with "ip=". For every device answer
+        with exactly one line: "<ip>: <Health Verdict> - <one short sentence>".
+        Flag anything that still looks suspicious.
+        """
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def load_fleet(path):
+    """Daftar device dari file: JSON (list diagnostik / {"ip", "community", "snmp_port"}) atau teks satu IP per baris"""
+    with open(path) as f:
+        text = f.read()
+    try:
+        entries = json.loads(text)
+    except ValueError:
+        entries = [line.split(",")[0].strip() for line in text.splitlines()
+                   if line.strip() and not line.startswith("#")]
+    if isinstance(entries, dict):
+        entries = entries.get("devices") or []
+    return [{"ip": e} if isinstance(e, str) else e for e in entries]
+
+def is_collected(entry):
+    return any(k in entry for k in ("overall_status", "status", "icmp_metrics", "icmp", "snmp_status"))
+
+class FleetAnalyzer:
+    """Analisa banyak device: pre-triage, request AI paralel, device sehat digabung dalam satu prompt"""
+
+    def __init__(self, agent=None, parallel=None, group_healthy=None):
+        self.agent = agent or TroubleshootAgent()
+        self.parallel = max(1, parallel or AI_PARALLEL)                        # request AI bersamaan
+        self.group_healthy = AI_GROUP_HEALTHY if group_healthy is None else group_healthy # 0/1 = tanpa grouping
+
+    def collect(self, entries):
+        """Lengkapi entry yang baru berisi IP dengan collect_full_diagnostic() (paralel)"""
+        def run(entry):
+            if is_collected(entry):
+                return entry
+            data = NetworkCollector(entry["ip"], entry.get("community") or "public",
+                                    int(entry.get("snmp_port") or 161)).collect_full_diagnostic()
+            data["ip"] = entry["ip"]
+            return data
+        with ThreadPoolExecutor(max_workers=max(1, min(FLEET_COLLECT_WORKERS, len(entries)))) as pool:
+            return list(pool.map(run, entries))
+
+    def _complete(self, messages):
+        """(teks, completion_tokens, latency detik) dari satu request non-streaming"""
+        start = time.perf_counter()
+        completion = AI_CLIENT.chat.completions.create(
+            model=AI_MODEL_NAME, messages=messages, temperature=0.3)
+        tokens = completion.usage.completion_tokens if completion.usage is not None else None
+        return completion.choices[0].message.content or "", tokens, time.perf_counter() - start
+
+    def _group_messages(self, devices):
+        blocks = [build_context(d, max(150, AI_CONTEXT_BUDGET // len(devices))) for d in devices]
+        return [
+            {"role": "system", "content": FLEET_GROUP_PROMPT},
+            {"role": "user", "content": "\n---\n".join(blocks)}
+        ]
+
+    def _run_job(self, job):
+        kind, devices, triages = job
+        key = self.agent.cache_key(devices if kind == "group" else devices[0], triages[0], kind)
+        try:
+            text = self.agent.cached_report(key)
+            if text is not None:
+                source, tokens, latency = "cache", None, None
+            else:
+                messages = self._group_messages(devices) if kind == "group" else self.agent.build_messages(devices[0], triages[0])
+                text, tokens, latency = self._complete(messages)
+                self.agent.store_report(key, text)
+                source = "llm-group" if kind == "group" else "llm"
+            if kind == "group":
+                lines = {}
+                for line in text.splitlines():
+                    ip, sep, rest = line.strip().lstrip("-* ").partition(":")
+                    if sep:
+                        lines[ip.strip()] = rest.strip()
+                # Baris per device kalau model mengikuti format, kalau tidak seluruh jawaban
+                reports = [lines.get(d.get("ip"), text) for d in devices]
+            else:
+                reports = [text]
+            return [dict(report=r, latency_s=round(latency, 3) if latency is not None else None, tokens=tokens, source=source)
+                    for r in reports]
+        except Exception as e:
+            return [dict(report=f"Error menghubungkan ke Local AI: {e}", latency_s=None, tokens=None, source="error")
+                    for _ in devices]
+
+    def run(self, entries):
+        """{"devices": [hasil per device, urutan input], "stats": {...}}"""
+        started = time.perf_counter()
+        devices = self.collect(entries)
+        collected = time.perf_counter()
+
+        results = [None] * len(devices)
+        jobs, healthy = [], []
+        for i, data in enumerate(devices):
+            base = {"ip": data.get("ip"), "verdict": "Unknown", "findings": []}
+            if "error" in data:
+                results[i] = dict(base, verdict="Critical", source="rules", report=self.agent._failure_report(data))
+                continue
+            triage_result, report = self.agent.pre_triage(data)
+            if triage_result is not None:
+                base.update(verdict=triage_result["verdict"], findings=[f["detail"] for f in triage_result["findings"]])
+            if report is not None:
+                results[i] = dict(base, source="rules", report=report)
+            elif self.group_healthy > 1 and triage_result is not None and triage_result["verdict"] == "Healthy":
+                healthy.append((i, base))
+            else:
+                results[i] = base
+                jobs.append(("single", [data], [triage_result], [i]))
+        for n in range(0, len(healthy), max(1, self.group_healthy)):
+            chunk = healthy[n:n + self.group_healthy]
+            for i, base in chunk:
+                results[i] = base
+            jobs.append(("group", [devices[i] for i, _ in chunk], [None] * len(chunk), [i for i, _ in chunk]))
+
+        tokens = 0
+        with ThreadPoolExecutor(max_workers=self.parallel) as pool:
+            job_outputs = list(pool.map(self._run_job, [j[:3] for j in jobs]))
+            for job, outputs in zip(jobs, job_outputs):
+                tokens += outputs[0]["tokens"] or 0 # sekali per request, juga untuk prompt gabungan
+                for i, output in zip(job[3], outputs):
+                    results[i].update(output)
+
+        finished = time.perf_counter()
+        latencies = [r["latency_s"] for r in results if r.get("latency_s") is not None]
+        analysis_s = finished - collected
+        stats = {
+            "devices": len(devices),
+            "llm_requests": sum(1 for _, outputs in zip(jobs, job_outputs) if outputs[0]["source"] != "cache"),
+            "answered_by_rules": sum(1 for r in results if r.get("source") == "rules"),
+            "answered_by_cache": sum(1 for r in results if r.get("source") == "cache"),
+            "parallel": self.parallel,
+            "collect_s": round(collected - started, 3),
+            "analysis_s": round(analysis_s, 3),
+            "devices_per_s": round(len(devices) / analysis_s, 2) if analysis_s > 0 else None,
+            "request_latency_p50_s": _percentile(latencies, 0.50),
+            "request_latency_p95_s": _percentile(latencies, 0.95),
+            "request_latency_max_s": max(latencies) if latencies else None,
+            "completion_tokens": tokens,
+            "tokens_per_s": round(tokens / analysis_s, 1) if tokens and analysis_s > 0 else None,
+            "cache": self.agent.cache.stats() if self.agent.cache is not None else None,
+        }
+        return {"devices": results, "stats": stats}
+
+def render_fleet_report(fleet):
+    """Laporan gabungan: ringkasan verdict, lalu device terburuk dulu, lalu statistik"""
+    results = fleet["devices"]
+    counts = {}
+    for r in results:
+        counts[r["verdict"]] = counts.get(r["verdict"], 0) + 1
+    lines = ["=" * 40, "📄 LAPORAN ANALISIS FLEET", "=" * 40,
+             "Ringkasan: " + ", ".join(f"{v} {counts[v]}" for v in sorted(counts, key=lambda v: SEVERITY_ORDER.get(v, 9))), ""]
+    for r in sorted(results, key=lambda r: SEVERITY_ORDER.get(r["verdict"], 9)):
+        lines.append(f"### {r['ip']} [{r['verdict']}] ({r.get('source')})")
+        lines.append(str(r.get("report", "")).strip())
+        lines.append("")
+    s = fleet["stats"]
+    lines.append("=" * 40)
+    lines.append(f"[⏱] {s['devices']} device, {s['llm_requests']} request AI (paralel {s['parallel']}),"
+                 f" {s['answered_by_rules']} dijawab rule engine, {s['answered_by_cache']} dari cache | analisa {s['analysis_s']}s"
+                 f" ({s['devices_per_s']} device/s) | latency p50 {s['request_latency_p50_s']}s"
+                 f" p95 {s['request_latency_p95_s']}s | {s['completion_tokens']} tokens ({s['tokens_per_s']} tok/s)")
+    if s.get("cache"):
+        c = s["cache"]
+        lines.append(f"[💾] cache: {c['hits']} hit / {c['misses']} miss (hit ratio {c['hit_ratio']:.0%}),"
+                     f" {c['entries']}/{c['max_entries']} entry, TTL {c['ttl_s']}s")
+    return "\n".join(lines)
+
 # --- MAIN PROGRAM ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NMS AI Troubleshoot Assistant (Local)")
+    parser.add_argument("--batch", help="File daftar device: JSON (diagnostik / {ip, community}) atau satu IP per baris")
+    parser.add_argument("--parallel", type=int, default=AI_PARALLEL, help="Request AI bersamaan")
+    parser.add_argument("--group-healthy", type=int, default=AI_GROUP_HEALTHY, help="Device sehat per prompt (0 = tanpa grouping)")
+    parser.add_argument("--json-out", help="Tulis hasil per device + statistik ke file JSON")
+    parser.add_argument("--no-cache", action="store_true", help="Selalu tanya AI, abaikan cache analisa")
+    args = parser.parse_args()
+    agent = TroubleshootAgent(cache=False if args.no_cache else None)
+
+    if args.batch:
+        fleet = FleetAnalyzer(agent, parallel=args.parallel, group_healthy=args.group_healthy).run(load_fleet(args.batch))
+        print(render_fleet_report(fleet))
+        if args.json_out:
+            with open(args.json_out, "w") as f:
+                json.dump(fleet, f, indent=2, ensure_ascii=False)
+        sys.exit(0)
+
     print("=== NMS AI Troubleshoot Assistant (Local) ===")
     target_ip = input("Masukkan IP Target: ")
     community = input("Masukkan SNMP Community (default: public): ") or "public"
@@ -275,11 +686,19 @@ if __name__ == "__main__":
         raw_data['ip'] = target_ip
 
     # 2. Analyze with AI
-    agent = TroubleshootAgent()
-    analysis = agent.analyze(raw_data)
-
-    print("\n" + "="*40)
-    print("📄 LAPORAN ANALISIS AI")
-    print("="*40)
-    print(analysis)
-    print("="*40)
\ No newline at end of file
+    if AI_STREAM:
+        print("\n" + "="*40)
+        print("📄 LAPORAN ANALISIS AI")
+        print("="*40)
+        for text in agent.analyze_stream(raw_data):
+            print(text, end="", flush=True)
+        print("\n" + "="*40)
+        print(f"[⏱] {agent.last_stats}")
+    else:
+        analysis = agent.analyze(raw_data)
+
+        print("\n" + "="*40)
+        print("📄 LAPORAN ANALISIS AI")
+        print("="*40)
+        print(analysis)
+        print("="*40)
\ No newline at end of file
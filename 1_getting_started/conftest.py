@@ -0,0 +1,17 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Modul bersama (snmp_engine, snmp_standin_agent, ...) ada di folder network API, sama seperti di agent
+sys.path.insert(0, os.path.join(HERE, "..", "3_learn_n8n_diagnostic_icmp_snmp"))
+
+@pytest.fixture(scope="session")
+def agent_module():
+    # Nama file diawali angka: dimuat lewat importlib, bukan import biasa
+    spec = importlib.util.spec_from_file_location("troubleshooting_agent", os.path.join(HERE, "1_1_troubleshooting_agent.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,149 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Stand-in OpenAI-compatible chat server for local testing of the troubleshooting
+# agent without Ollama / LM Studio: POST /v1/chat/completions (plain and
+# "stream": true as server-sent events, with an optional usage chunk) and
+# GET /v1/models. The answer is a canned report emitted word by word, with a
+# configurable time-to-first-token and per-token delay.
+#
+#   python openai_standin_server.py --port 11434 --ttft 0.3 --token-delay 0.02
+#   AI_BASE_URL=http://127.0.0.1:11434/v1 python 1_1_troubleshooting_agent.py
+
+CANNED_REPORT = (
+    "**Health Verdict: Warning**\n\n"
+    "1. ICMP Quality: latency and jitter are within normal range, no packet loss.\n"
+    "2. Interface Table: ports with Admin UP / Oper DOWN point to a physical layer issue.\n"
+    "3. Next steps: check the cable and SFP of the affected ports, then run "
+    "`show interfaces status` and `show logging | include LINK`.\n"
+)
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+def split_tokens(text):
+    """Word-sized pieces (whitespace kept) that join back into `text`"""
+    pieces, current = [], ""
+    for ch in text:
+        current += ch
+        if ch in " \n":
+            pieces.append(current)
+            current = ""
+    if current:
+        pieces.append(current)
+    return pieces
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._json(200, {"object": "list", "data": [{"id": self.server.model, "object": "model", "owned_by": "standin"}]})
+        else:
+            self._json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._json(404, {"error": {"message": "not found"}})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        except ValueError:
+            self._json(400, {"error": {"message": "invalid JSON"}})
+            return
+        messages = request.get("messages") or []
+        prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) for m in messages)
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.prompt_tokens.append(prompt_tokens)
+        model = request.get("model") or self.server.model
+        created = int(time.time())
+        tokens = split_tokens(self.server.reply)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens)}
+
+        time.sleep(self.server.ttft)
+        if not request.get("stream"):
+            time.sleep(self.server.token_delay * len(tokens))
+            self._json(200, {
+                "id": "chatcmpl-standin", "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": self.server.reply},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(choices, **extra):
+            chunk = dict({"id": "chatcmpl-standin", "object": "chat.completion.chunk", "created": created,
+                          "model": model, "choices": choices}, **extra)
+            self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+
+        event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(self.server.token_delay)
+            event([{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+        event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (request.get("stream_options") or {}).get("include_usage"):
+            event([], usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+class OpenAIStandinServer(ThreadingHTTPServer):
+    """Threaded stand-in chat completion server; port 0 picks a free port"""
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, model="standin", reply=CANNED_REPORT,
+                 ttft=0.2, token_delay=0.01, verbose=False):
+        super().__init__((host, port), StandinHandler)
+        self.model = model
+        self.reply = reply
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.verbose = verbose
+        self.requests = 0
+        self.prompt_tokens = [] # estimated prompt size of every request
+        self.lock = threading.Lock()
+        self.port = self.server_address[1]
+        self.base_url = f"http://{host}:{self.port}/v1"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="openai-standin", daemon=True).start()
+        return self
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in OpenAI-compatible chat server for local testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", default="standin")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds between tokens")
+    args = parser.parse_args()
+
+    server = OpenAIStandinServer(args.host, args.port, args.model, ttft=args.ttft,
+                                 token_delay=args.token_delay, verbose=True)
+    print(f"Stand-in OpenAI-compatible server on {server.base_url} (model '{args.model}')")
+    server.serve_forever()
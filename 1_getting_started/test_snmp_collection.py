@@ -0,0 +1,43 @@
+import pytest
+
+from snmp_standin_agent import SnmpStandinAgent, build_demo_mib
+
+# collect_full_diagnostic() of the troubleshooting agent against the local UDP
+# stand-in SNMP agent: native engine, no snmpwalk process.
+#
+#   python -m pytest -q test_snmp_collection.py
+
+PING_UP = {"status": "UP", "packet_loss_pct": 0.0, "latency_avg_ms": 1.0,
+           "latency_min_ms": 1.0, "latency_max_ms": 1.0, "jitter_ms": 0.0}
+
+@pytest.fixture
+def snmp_agent():
+    agent = SnmpStandinAgent(build_demo_mib(12), port=0).start()
+    yield agent
+    agent.stop()
+
+@pytest.fixture
+def no_fork(agent_module, monkeypatch):
+    def forbidden(*args, **kwargs):
+        raise AssertionError(f"forked {args[0] if args else kwargs}")
+    monkeypatch.setattr(agent_module.subprocess, "check_output", forbidden)
+    monkeypatch.setattr(agent_module.NetworkCollector, "ping_diagnostic", lambda self: dict(PING_UP))
+
+def test_full_diagnostic_without_snmpwalk(agent_module, snmp_agent, no_fork):
+    data = agent_module.NetworkCollector("127.0.0.1", "public", snmp_agent.port).collect_full_diagnostic()
+
+    assert data["snmp_status"] == "UP"
+    assert data["device_info"] == "Stand-in SNMP agent (network_api test)"
+    assert data["uptime_raw"] == "0:0:20:34.56"
+    assert data["interfaces_count"] == 12
+    assert data["interfaces_detail"][4] == {"id": "5", "name": "GigabitEthernet0/5",
+                                            "admin_status": "UP", "oper_status": "DOWN"}
+    # 1 GET for both scalars + lockstep GETBULK walk of the three status columns
+    assert snmp_agent.requests == 2
+
+def test_silent_agent_is_snmp_down(agent_module, snmp_agent, no_fork, monkeypatch):
+    monkeypatch.setattr(agent_module, "SNMP_TIMEOUT", 0.2)
+    monkeypatch.setattr(agent_module, "SNMP_RETRIES", 0)
+    data = agent_module.NetworkCollector("127.0.0.1", "wrong", snmp_agent.port).collect_full_diagnostic()
+    assert data["snmp_status"] == "DOWN" and data["interfaces_count"] == 0
+    assert agent_module.NetworkCollector("a..b", "public").snmp_native() == (None, None, [])
@@ -0,0 +1,60 @@
+import math
+
+import pytest
+from openai import OpenAI
+
+from openai_standin_server import OpenAIStandinServer, CANNED_REPORT, split_tokens
+
+# Streaming analysis of the troubleshooting agent against the local stand-in
+# OpenAI-compatible server (ephemeral port), no Ollama / LM Studio needed.
+#
+#   python -m pytest -q test_streaming.py
+
+DATA = {
+    "ip": "10.0.0.1",
+    "overall_status": "UP",
+    "icmp_metrics": {"status": "UP", "packet_loss_pct": 0.0, "latency_avg_ms": 1.2, "jitter_ms": 0.3},
+    "snmp_status": "UP",
+    "device_info": "Stand-in switch",
+    "uptime_raw": "123456",
+    "interfaces_count": 2,
+    "interfaces_detail": [
+        {"id": "1", "name": "Gi0/1", "admin_status": "UP", "oper_status": "UP"},
+        {"id": "2", "name": "Gi0/2", "admin_status": "UP", "oper_status": "DOWN"},
+    ],
+}
+
+@pytest.fixture
+def server(agent_module, monkeypatch):
+    server = OpenAIStandinServer(ttft=0.05, token_delay=0.005).start()
+    monkeypatch.setattr(agent_module, "AI_CLIENT", OpenAI(base_url=server.base_url, api_key="standin"))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_stream_joins_to_full_report_with_stats(agent_module, server):
+    agent = agent_module.TroubleshootAgent(triage_mode="off", cache=False)
+    chunks = list(agent.analyze_stream(DATA))
+
+    assert "".join(chunks) == CANNED_REPORT
+    assert len(chunks) > 1 # token demi token, bukan satu jawaban utuh
+    assert server.requests == 1
+
+    stats = agent.last_stats
+    summary = stats.summary()
+    assert stats.source == "llm"
+    assert summary["ttft_s"] > 0
+    # Jumlah token dari chunk usage (include_usage), bukan hitungan chunk
+    assert stats.completion_tokens == len(split_tokens(CANNED_REPORT))
+    assert summary["tokens"] == stats.completion_tokens
+    assert summary["tokens_per_s"] is not None and math.isfinite(summary["tokens_per_s"])
+    assert summary["tokens_per_s"] > 0
+
+def test_finished_stream_is_replayed_from_cache(agent_module, server, tmp_path):
+    cache = agent_module.open_cache(str(tmp_path / "analysis_cache.sqlite"))
+    agent = agent_module.TroubleshootAgent(triage_mode="off", cache=cache)
+    assert "".join(agent.analyze_stream(DATA)) == CANNED_REPORT
+
+    assert "".join(agent.analyze_stream(DATA)) == CANNED_REPORT
+    assert agent.last_stats.source == "cache"
+    assert server.requests == 1 # jawaban kedua tidak memanggil AI
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from context_builder import interface_issues
+
+# Persistent cache of LLM analyses, keyed by a fingerprint of what the model
+# would actually conclude from: status, loss class, latency / jitter buckets and
+# the set of faulty interfaces. Exact RTTs, counters, rates and uptime ticks are
+# left out, so re-analysing a device whose state has not meaningfully changed is
+# a lookup instead of a full inference. Stored in SQLite (stdlib, safe to share
+# between processes), with TTL and LRU size eviction.
+
+DEFAULT_TTL = 3600
+DEFAULT_MAX_ENTRIES = 2000
+
+# Packet loss classes (upper bound %, name)
+LOSS_CLASSES = ((0.0, "none"), (1.0, "trace"), (5.0, "low"), (20.0, "medium"), (99.99, "high"), (100.0, "total"))
+
+def loss_class(pct):
+    if pct is None:
+        return None
+    for bound, name in LOSS_CLASSES:
+        if pct <= bound:
+            return name
+    return "total"
+
+def ms_bucket(ms):
+    """Power-of-two bucket of a latency / jitter value: 0 (< 1 ms), 1 (1-2 ms), 2 (2-4 ms), ..."""
+    if ms is None:
+        return None
+    return 0 if ms < 1 else int(math.log2(ms)) + 1
+
+def normalize(data):
+    """The parts of a diagnostic result that decide an analysis"""
+    icmp = data.get("icmp_metrics") or data.get("icmp") or data.get("ping_diagnostics") or {}
+    faulty = []
+    admin_down = 0
+    interfaces = data.get("interfaces_detail") or []
+    for row in interfaces:
+        score, issues = interface_issues(row)
+        if score:
+            # "util 93%" -> "util": the class of problem, not its exact size
+            faulty.append([str(row.get("id")), row.get("name"), row.get("admin_status"), row.get("oper_status"),
+                           sorted(issue.split(" ")[0] for issue in issues)])
+        elif row.get("admin_status") == "DOWN":
+            admin_down += 1
+    faulty.sort()
+    return {
+        "ip": data.get("ip"),
+        "status": data.get("overall_status") or data.get("status"),
+        "error": data.get("error"),
+        "device": data.get("device_info") or data.get("sys_descr"),
+        "icmp": [icmp.get("status"), loss_class(icmp.get("packet_loss_pct")),
+                 ms_bucket(icmp.get("latency_avg_ms")), ms_bucket(icmp.get("jitter_ms"))],
+        "snmp": data.get("snmp_status"),
+        "interfaces": [data.get("interfaces_count", len(interfaces)), admin_down],
+        "faulty": faulty,
+    }
+
+def fingerprint(data, salt=""):
+    """Stable hex key of a diagnostic result (or list of results); `salt` = model / prompt / mode"""
+    state = [normalize(d) for d in data] if isinstance(data, list) else normalize(data)
+    payload = json.dumps([salt, state], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class AnalysisCache:
+    """fingerprint -> analysis text, on disk, with TTL and LRU eviction beyond max_entries"""
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL") # readers never wait for a writing process
+        self._db.execute("""CREATE TABLE IF NOT EXISTS analyses (
+            key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL,
+            last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response, created FROM analyses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM analyses WHERE key = ?", (key,))
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE analyses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO analyses (key, response, created, last_used) VALUES (?, ?, ?, ?)",
+                             (key, response, now, now))
+            count = self._db.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            if self.max_entries and count > self.max_entries:
+                excess = count - self.max_entries
+                self._db.execute("DELETE FROM analyses WHERE key IN "
+                                 "(SELECT key FROM analyses ORDER BY last_used LIMIT ?)", (excess,))
+                self.evictions += excess
+
+    def purge_expired(self):
+        if not self.ttl:
+            return 0
+        with self._lock:
+            removed = self._db.execute("DELETE FROM analyses WHERE created < ?", (time.time() - self.ttl,)).rowcount
+            self.expired += removed
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM analyses")
+
+    def stats(self):
+        with self._lock:
+            entries, lifetime_hits = self._db.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM analyses").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stored_entry_hits": lifetime_hits
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,358 @@
+import argparse
+import asyncio
+import json
+import socket
+import time
+
+import icmp_engine
+import snmp_engine
+from collector import (
+    NetworkCollector, interface_from_cells, use_native_icmp, counter_tracker, snmp_pool,
+    SNMP_PORT, SNMP_TIMEOUT, SNMP_RETRIES, PING_PROFILE,
+    OID_SYS_DESCR, OID_SYS_UPTIME, IF_COLUMNS,
+)
+
+# asyncio variant of NetworkCollector.
+# Per device the ICMP probe, the SNMP scalar GET and the ifTable GETBULK walk
+# run concurrently, so a device costs max(latencies) instead of their sum.
+# Many devices share one event loop (and one ICMP socket) with a concurrency
+# limit and a per-device timeout.
+
+DEFAULT_CONCURRENCY = 100
+DEFAULT_DEVICE_TIMEOUT = 10.0
+
+# --- ICMP ---
+
+class AsyncIcmpProber:
+    """ICMP echo over one non-blocking socket shared by every coroutine in the loop"""
+
+    def __init__(self):
+        self.sock, self.raw = icmp_engine.open_icmp_socket()
+        self.sock.setblocking(False)
+        self.ident = icmp_engine.next_ident()
+        self._seq = 0
+        self._waiters = {} # (addr, ident, seq) -> (future, sent_at)
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self.sock.fileno(), self._on_readable)
+
+    def close(self):
+        self._loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+    def _on_readable(self):
+        while True:
+            try:
+                data, (addr, _) = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            now = time.monotonic()
+            reply = icmp_engine.parse_echo_reply(data, self.raw, self.ident)
+            if reply is None:
+                continue
+            waiter = self._waiters.pop((addr,) + reply, None)
+            if waiter and not waiter[0].done():
+                waiter[0].set_result((now - waiter[1]) * 1000.0)
+
+    async def ping(self, target, profile=icmp_engine.PROBE_PROFILES["standard"]):
+        """Same result schema as NetworkCollector.ping_diagnostic()"""
+        try:
+            addr = (await self._loop.getaddrinfo(target, None, family=socket.AF_INET))[0][4][0]
+        except (OSError, UnicodeError) as e:
+            return {"status": "UNKNOWN", "error": f"Ping error: {e}"}
+
+        rtts = await self._round(addr, profile.count, profile.interval, profile.timeout, profile.first_reply)
+        if profile.extra and None in rtts:
+            # Adaptive: loss in the first round, measure it with more echoes
+            rtts += await self._round(addr, profile.extra, profile.interval, profile.timeout, False)
+        return icmp_engine.summarize_rtts(rtts, len(rtts), profile.keep_rtts)
+
+    async def _round(self, addr, count, interval, timeout, first_reply):
+        """Send up to `count` echoes, returns their RTTs (ms, None = lost)"""
+        keys = []
+        futures = [] # None for echoes that could not be sent
+        try:
+            for i in range(count):
+                if i:
+                    sent = [f for f in futures if f is not None]
+                    if first_reply and sent:
+                        done, _ = await asyncio.wait(sent, timeout=interval, return_when=asyncio.FIRST_COMPLETED)
+                        if done:
+                            break
+                    else:
+                        await asyncio.sleep(interval)
+                self._seq = (self._seq + 1) & 0xFFFF
+                key = (addr, self.ident, self._seq)
+                future = self._loop.create_future()
+                self._waiters[key] = (future, time.monotonic())
+                keys.append(key)
+                try:
+                    self.sock.sendto(icmp_engine.build_echo_request(self.ident, self._seq), (addr, 0))
+                except OSError:
+                    self._waiters.pop(key, None)
+                    future = None # counted as lost
+                futures.append(future)
+
+            sent = [f for f in futures if f is not None]
+            if sent and not (first_reply and any(f.done() for f in sent)):
+                await asyncio.wait(sent, timeout=timeout,
+                                   return_when=asyncio.FIRST_COMPLETED if first_reply else asyncio.ALL_COMPLETED)
+        finally:
+            for key in keys:
+                self._waiters.pop(key, None)
+        return [f.result() if f is not None and f.done() else None for f in futures]
+
+# --- SNMP ---
+
+class _SnmpProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.waiters = {} # request_id -> future
+
+    def datagram_received(self, data, addr):
+        try:
+            pdu_type, request_id, error_status, error_index, _, varbinds = snmp_engine.decode_message(data)
+        except snmp_engine.SnmpError:
+            return
+        future = self.waiters.pop(request_id, None)
+        if future is None or future.done() or pdu_type != snmp_engine.GET_RESPONSE:
+            return
+        if error_status:
+            future.set_exception(snmp_engine.SnmpError(
+                f"SNMP error-status {error_status} at index {error_index}", error_status))
+        else:
+            future.set_result((varbinds, len(data)))
+
+    def error_received(self, exc):
+        # ICMP port unreachable etc.: fail everything in flight
+        for future in self.waiters.values():
+            if not future.done():
+                future.set_exception(snmp_engine.SnmpError(f"SNMP receive failed: {exc}"))
+        self.waiters.clear()
+
+class AsyncSnmpClient:
+    """asyncio twin of snmp_engine.SnmpClient (GET + lockstep GETBULK walks over one UDP socket)"""
+
+    def __init__(self, target_ip, community="public", port=SNMP_PORT, timeout=SNMP_TIMEOUT, retries=SNMP_RETRIES):
+        self.ip = target_ip
+        self.community = community
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self._request_id = 0
+        self.last_response_size = 0
+        self._transport = None
+        self._protocol = None
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        try:
+            self._transport, self._protocol = await loop.create_datagram_endpoint(
+                _SnmpProtocol, remote_addr=(self.ip, self.port))
+        except (OSError, UnicodeError) as e:
+            raise snmp_engine.SnmpError(f"Cannot reach SNMP agent {self.ip}: {e}")
+        return self
+
+    async def __aexit__(self, *exc):
+        self._transport.close()
+
+    async def request(self, build, *args):
+        self._request_id = (self._request_id % 0x7FFFFFFF) + 1
+        request_id = self._request_id
+        packet = build(self.community, request_id, *args)
+        loop = asyncio.get_running_loop()
+
+        for _ in range(self.retries + 1):
+            future = loop.create_future()
+            self._protocol.waiters[request_id] = future
+            self._transport.sendto(packet)
+            try:
+                varbinds, self.last_response_size = await asyncio.wait_for(future, self.timeout)
+                return varbinds
+            except asyncio.TimeoutError:
+                continue
+            finally:
+                self._protocol.waiters.pop(request_id, None)
+        raise snmp_engine.SnmpTimeout(f"No SNMP response from {self.ip}:{self.port}")
+
+    async def get(self, oids):
+        oids = [oid.strip(".") for oid in oids]
+        varbinds = await self.request(snmp_engine.build_get, oids)
+        result = {oid: (snmp_engine.NO_SUCH_OBJECT, None) for oid in oids}
+        for oid, tag, value in varbinds:
+            if oid in result:
+                result[oid] = (tag, None if tag in snmp_engine.EXCEPTION_TAGS else value)
+        return result
+
+    async def walk_table(self, columns, max_repetitions=25):
+        """Returns every (index, row) of a lockstep GETBULK walk"""
+        return await self.run_walk(snmp_engine.TableWalk(columns, max_repetitions))
+
+    async def run_walk(self, walk):
+        rows = []
+        while not walk.done:
+            try:
+                varbinds = await self.request(snmp_engine.build_getbulk, walk.next_oids(), 0, walk.max_repetitions)
+            except snmp_engine.SnmpError as e:
+                if walk.too_big(e):
+                    continue
+                raise
+            rows.extend(walk.feed(varbinds, self.last_response_size))
+        rows.extend(walk.flush())
+        return rows
+
+# --- COLLECTOR ---
+
+class AsyncNetworkCollector:
+    """Concurrent per-device collection with the same result schema as NetworkCollector"""
+
+    def __init__(self, target_ip, community_string="public", icmp_prober=None, snmp_port=SNMP_PORT):
+        self.ip = target_ip
+        self.community = community_string
+        self.icmp_prober = icmp_prober
+        self.snmp_port = snmp_port
+
+    async def ping_diagnostic(self, profile=None):
+        profile = profile or icmp_engine.PROBE_PROFILES[PING_PROFILE]
+        if self.icmp_prober is not None and use_native_icmp(self.ip):
+            return await self.icmp_prober.ping(self.ip, profile)
+        # No ICMP socket permission: fall back to the forked ping in a worker thread
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, NetworkCollector(self.ip, self.community).ping_subprocess, profile)
+
+    async def _walk(self, client, state, columns):
+        """GETBULK walk of the columns this device has, sized by what its previous walks showed"""
+        walk = state.start_walk(columns)
+        if walk is None:
+            return []
+        try:
+            rows = await client.run_walk(walk)
+        except snmp_engine.SnmpTimeout:
+            state.end_walk(walk, lost=True)
+            raise
+        state.end_walk(walk)
+        return list(state.widen(columns, walk, rows))
+
+    async def collect_snmp_data(self):
+        # Negative cache / max-repetitions are shared with the threaded collectors
+        state = snmp_pool.state(self.ip, self.community, self.snmp_port)
+        sys_oids = [OID_SYS_DESCR, OID_SYS_UPTIME]
+        wanted = state.request_oids(sys_oids)
+        try:
+            async with AsyncSnmpClient(self.ip, self.community, port=self.snmp_port) as client:
+                system, table = await asyncio.gather(
+                    client.get(wanted) if wanted else asyncio.sleep(0, {}),
+                    self._walk(client, state, IF_COLUMNS),
+                    return_exceptions=True
+                )
+        except snmp_engine.SnmpError as e:
+            system = table = e # unresolvable target
+
+        if isinstance(system, Exception):
+            return {"snmp_status": "DOWN", "error": "No SNMP response"}
+        system = state.get_result(sys_oids, system)
+        sys_descr = snmp_engine.format_value(*system[OID_SYS_DESCR])
+        if not sys_descr:
+            return {"snmp_status": "DOWN", "error": "No SNMP response"}
+
+        interfaces_data = []
+        state.observe_uptime(system[OID_SYS_UPTIME][1])
+        if not isinstance(table, Exception):
+            device = f"{self.ip}:{self.snmp_port}"
+            counter_tracker.observe_uptime(device, system[OID_SYS_UPTIME][1])
+            for idx, cells in table:
+                row = interface_from_cells(device, idx, cells)
+                if row is not None:
+                    interfaces_data.append(row)
+
+        return {
+            "snmp_status": "UP",
+            "device_info": sys_descr,
+            "uptime_raw": snmp_engine.format_value(*system[OID_SYS_UPTIME]) or "N/A",
+            "interfaces_count": len(interfaces_data),
+            "interfaces_detail": interfaces_data
+        }
+
+    async def collect_full_diagnostic(self):
+        """ICMP + SNMP snapshot, both started at once"""
+        ping_res, snmp_res = await asyncio.gather(self.ping_diagnostic(), self.collect_snmp_data())
+        if ping_res.get('status') == 'DOWN':
+            return {
+                "status": "DOWN",
+                "ping_diagnostics": ping_res,
+                "error": "Device completely unreachable via ICMP."
+            }
+
+        return {
+            "overall_status": "UP",
+            "icmp_metrics": ping_res,
+            "snmp_status": snmp_res.get("snmp_status", "DOWN"),
+            "device_info": snmp_res.get("device_info", "N/A"),
+            "uptime_raw": snmp_res.get("uptime_raw", "N/A"),
+            "interfaces_count": snmp_res.get("interfaces_count", 0),
+            "interfaces_detail": snmp_res.get("interfaces_detail", [])
+        }
+
+# --- FLEET ---
+
+def normalize_target(target):
+    """Accept "ip", (ip, community) or {"ip": .., "community": .., "snmp_port": ..}"""
+    if isinstance(target, dict):
+        return target["ip"], target.get("community", "public"), int(target.get("snmp_port", SNMP_PORT))
+    if isinstance(target, (tuple, list)):
+        return target[0], (target[1] if len(target) > 1 else "public"), SNMP_PORT
+    return target, "public", SNMP_PORT
+
+async def iter_collect_many(targets, concurrency=DEFAULT_CONCURRENCY, device_timeout=DEFAULT_DEVICE_TIMEOUT):
+    """Collect every target, yielding (position, result) as each device finishes"""
+    semaphore = asyncio.Semaphore(concurrency)
+    try:
+        prober = AsyncIcmpProber()
+    except OSError:
+        prober = None # subprocess fallback inside ping_diagnostic()
+
+    async def run_one(position, target):
+        ip, community, port = normalize_target(target)
+        async with semaphore:
+            collector = AsyncNetworkCollector(ip, community, icmp_prober=prober, snmp_port=port)
+            try:
+                result = await asyncio.wait_for(collector.collect_full_diagnostic(), device_timeout)
+            except asyncio.TimeoutError:
+                result = {"status": "UNKNOWN", "error": f"Collection timed out after {device_timeout}s"}
+            except Exception as e:
+                result = {"status": "UNKNOWN", "error": f"Collection error: {e}"}
+        result['ip'] = ip
+        return position, result
+
+    tasks = [asyncio.ensure_future(run_one(i, t)) for i, t in enumerate(targets)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        if prober is not None:
+            prober.close()
+
+async def collect_many(targets, concurrency=DEFAULT_CONCURRENCY, device_timeout=DEFAULT_DEVICE_TIMEOUT):
+    """Collect every target, results in input order"""
+    targets = list(targets)
+    results = [None] * len(targets)
+    async for position, result in iter_collect_many(targets, concurrency, device_timeout):
+        results[position] = result
+    return results
+
+def run_collection(targets, concurrency=DEFAULT_CONCURRENCY, device_timeout=DEFAULT_DEVICE_TIMEOUT):
+    """Blocking entry point for scripts"""
+    return asyncio.run(collect_many(targets, concurrency, device_timeout))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Concurrent ICMP + SNMP collection for many devices")
+    parser.add_argument("ips", nargs="+")
+    parser.add_argument("--community", default="public")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_DEVICE_TIMEOUT)
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    results = run_collection([(ip, args.community) for ip in args.ips], args.concurrency, args.timeout)
+    print(json.dumps(results, indent=2))
+    print(f"{len(results)} devices in {time.monotonic() - started:.2f}s")
@@ -0,0 +1,54 @@
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+from history_store import HistoryStore
+from poller import ICMP_METRICS
+
+# On-disk history cost: appending 1-minute samples, and range queries over
+# weeks of them (mmap'ed segments, one metric column sliced out).
+#
+#   python bench_history_store.py --devices 100 --days 14
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="HistoryStore append / range query benchmark")
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--dir", help="Store directory (default: a temporary one, removed afterwards)")
+    args = parser.parse_args()
+
+    root = args.dir or tempfile.mkdtemp(prefix="history-bench-")
+    store = HistoryStore(root, retention_days=0)
+    ips = [f"10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(args.devices)]
+    end = int(time.time()) // 60 * 60
+    start = end - args.days * 86400
+    values = [1.0] + [0.5] * (len(ICMP_METRICS) - 1)
+
+    try:
+        began = time.perf_counter()
+        for ts in range(start, end, 60):
+            values[2] = 1.0 + ts % 3600 / 1000.0 # latency_avg_ms moves
+            for ip in ips:
+                store.append(ip, "icmp", ts, values)
+        store.flush()
+        elapsed = time.perf_counter() - began
+        size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root) for f in files)
+        print(f"append: {store.records} records in {elapsed:.1f}s ({elapsed * 1e6 / store.records:.2f} us/record),"
+              f" {size / 1e6:.1f} MB on disk")
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        for label, q_start, step in (("1 day", end - 86400, None), (f"{args.days} days", start, None),
+                                     (f"{args.days} days, 1h step", start, 3600)):
+            began = time.perf_counter()
+            for ip in ips[:50]:
+                points = store.query(ip, "latency_avg_ms", q_start, end, step)
+            per_query = (time.perf_counter() - began) / min(50, len(ips))
+            print(f"query {label:<18} {per_query * 1000:7.2f} ms  ({len(points)} points)")
+        grown = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+        print(f"peak RSS growth during queries: {grown / 1024:.1f} MB")
+    finally:
+        if not args.dir:
+            shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,66 @@
+import argparse
+import time
+
+from metrics_exporter import MetricsExporter
+from counter_rates import COUNTER_FIELDS
+
+# /metrics cost with a large inventory: recording results (incremental
+# re-render of one device) and scraping (join of prebuilt fragments).
+#
+#   python bench_metrics_exporter.py --devices 1000 --interfaces 4
+
+def icmp_result(i):
+    return {
+        "status": "UP", "packet_loss_pct": 0.0, "latency_avg_ms": 1.2 + i % 7, "latency_min_ms": 0.9,
+        "latency_max_ms": 3.1, "jitter_ms": 0.4, "latency_p50_ms": 1.1, "latency_p95_ms": 2.8,
+        "latency_p99_ms": 3.0, "jitter_rfc3550_ms": 0.3, "loss_burst_max": 0,
+    }
+
+def snmp_result(i, interfaces):
+    return {
+        "snmp_status": "UP",
+        "interfaces_detail": [
+            {
+                "id": str(idx), "name": f"GigabitEthernet0/{idx}", "admin_status": "UP",
+                "oper_status": "DOWN" if idx % 5 == 0 else "UP", "speed_mbps": 1000,
+                "counters": {field: (i * 1000003 + idx * 7919) % 2 ** 63 for field in COUNTER_FIELDS},
+            }
+            for idx in range(1, interfaces + 1)
+        ],
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="MetricsExporter update / scrape benchmark")
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--interfaces", type=int, default=4)
+    parser.add_argument("--scrapes", type=int, default=5)
+    args = parser.parse_args()
+
+    exporter = MetricsExporter()
+    ips = [f"10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(args.devices)]
+    snmp = [snmp_result(i, args.interfaces) for i in range(args.devices)]
+    now = time.time()
+
+    start = time.perf_counter()
+    for i, ip in enumerate(ips):
+        exporter.set_device({"ip": ip, "profile": "default", "tags": ["dc1"]})
+        exporter.update_icmp(ip, icmp_result(i), now)
+        exporter.update_snmp(ip, snmp[i], now)
+    record = time.perf_counter() - start
+    print(f"{args.devices} devices, {exporter.series_count()} series")
+    print(f"record:  {record * 1e6 / args.devices:8.1f} us per device (icmp + snmp)")
+
+    for openmetrics, compress in ((False, False), (True, False), (False, True)):
+        timings = []
+        for n in range(args.scrapes):
+            exporter.update_icmp(ips[n % len(ips)], icmp_result(n), now) # every scrape sees a change
+            start = time.perf_counter()
+            body = exporter.render(openmetrics, compress)
+            timings.append(time.perf_counter() - start)
+        label = ("openmetrics" if openmetrics else "prometheus") + (" gzip" if compress else "")
+        print(f"scrape {label:<16} {min(timings) * 1000:7.1f} ms  {len(body) / 1e6:6.2f} MB")
+
+    exporter.render()
+    start = time.perf_counter()
+    exporter.render()
+    print(f"scrape unchanged         {(time.perf_counter() - start) * 1000:7.3f} ms (cached)")
@@ -0,0 +1,65 @@
+import argparse
+import multiprocessing
+import time
+
+from inventory import normalize_device
+from sharded_poller import collect_once, DEFAULT_CONCURRENCY
+from snmp_standin_agent import SnmpStandinAgent, build_demo_mib
+
+# Throughput of one full inventory round (ICMP + SNMP per device) versus the
+# number of poller processes. Devices are 127.x.y.z loopback addresses (the
+# kernel answers their pings); stand-in SNMP agents run in their own processes
+# on 0.0.0.0 so every device address reaches them.
+#
+#   python bench_sharded_poller.py --devices 2000 --processes 1,2,4 --agents 4
+
+def run_agent(interfaces, ports):
+    agent = SnmpStandinAgent(build_demo_mib(interfaces), host="0.0.0.0")
+    ports.put(agent.port)
+    agent.serve_forever()
+
+def start_agents(count, interfaces):
+    ctx = multiprocessing.get_context("spawn")
+    ports = ctx.Queue()
+    agents = [ctx.Process(target=run_agent, args=(interfaces, ports), daemon=True) for _ in range(count)]
+    for agent in agents:
+        agent.start()
+    return agents, [ports.get(timeout=30) for _ in agents]
+
+def make_devices(count, ports, ping):
+    return [
+        normalize_device({
+            "ip": f"127.{1 + i // 65024}.{(i // 254) % 256}.{i % 254 + 1}",
+            "snmp_port": ports[i % len(ports)],
+            "ping": ping,
+        })
+        for i in range(count)
+    ]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sharded poller throughput benchmark")
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--processes", default="1,2,4", help="comma separated process counts")
+    parser.add_argument("--agents", type=int, default=4, help="stand-in SNMP agent processes")
+    parser.add_argument("--interfaces", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="devices in flight per process")
+    parser.add_argument("--ping", default="fast", help="probe profile of every device")
+    args = parser.parse_args()
+
+    agents, ports = start_agents(args.agents, args.interfaces)
+    devices = make_devices(args.devices, ports, args.ping)
+    print(f"{len(devices)} devices, {args.agents} SNMP agents, {args.interfaces} interfaces, "
+          f"ping profile '{args.ping}', {multiprocessing.cpu_count()} CPUs")
+
+    try:
+        for processes in [int(p) for p in args.processes.split(",")]:
+            start = time.perf_counter()
+            results = collect_once(devices, processes=processes, concurrency=args.concurrency)
+            elapsed = time.perf_counter() - start
+            icmp_up = sum(1 for icmp, _ in results if icmp.get("status") == "UP")
+            snmp_up = sum(1 for _, snmp in results if snmp and snmp.get("snmp_status") == "UP")
+            print(f"processes={processes:<3} {elapsed:7.2f}s  {len(results) / elapsed:8.0f} devices/s  "
+                  f"icmp UP {icmp_up}/{len(results)}  snmp UP {snmp_up}/{len(results)}")
+    finally:
+        for agent in agents:
+            agent.terminate()
@@ -0,0 +1,421 @@
+import os
+import math
+import platform
+import re
+import subprocess
+import time
+
+import icmp_engine
+import snmp_engine
+from instrumentation import Instrumentation
+from snmp_session import SnmpSessionPool
+from counter_rates import CounterRateTracker, COUNTER_FIELDS
+from snmp_walk_parser import interfaces_from_walk, interface_row
+
+# Device collection shared by the Flask API (network_api.py), the asyncio
+# collector and the sharded poller workers: engine settings, OIDs, the SNMP
+# session pool, the counter rate tracker and NetworkCollector itself.
+# Importing it has no side effect beyond these objects (no Flask app, no
+# history writer), so poller worker processes can use it directly.
+
+# --- CONFIGURATION ---
+# ICMP engine: "auto" = in-process socket prober, falling back to the ping binary
+# when raw/unprivileged ICMP sockets are not permitted; "subprocess" = always fork ping
+ICMP_ENGINE = os.environ.get("ICMP_ENGINE", "auto").lower()
+
+# Probe profile of plain ping_diagnostic() calls (poller, batch, /snmp/data streams).
+# /icmp/status always uses "fast"; /icmp/qos takes "qos" (default) or "adaptive"/"standard".
+PING_PROFILE = os.environ.get("PING_PROFILE", "standard").lower()
+
+# SNMP engine: "native" = in-process SNMPv2c client (one GET for the scalars,
+# GETBULK for the ifTable columns); "subprocess" = one snmpwalk fork per OID
+SNMP_ENGINE = os.environ.get("SNMP_ENGINE", "native").lower()
+SNMP_PORT = int(os.environ.get("SNMP_PORT", "161"))
+SNMP_TIMEOUT = float(os.environ.get("SNMP_TIMEOUT", "1.0"))
+SNMP_RETRIES = int(os.environ.get("SNMP_RETRIES", "1"))
+# Per-device SNMP sessions: native sockets idle this long are closed; OIDs a device
+# does not have are skipped for SNMP_NEGATIVE_TTL seconds; GETBULK sized per device
+SNMP_SESSION_IDLE = float(os.environ.get("SNMP_SESSION_IDLE", "300"))
+SNMP_MAX_SESSIONS = int(os.environ.get("SNMP_MAX_SESSIONS", "4096"))
+SNMP_NEGATIVE_TTL = float(os.environ.get("SNMP_NEGATIVE_TTL", "600"))
+SNMP_RESPONSE_BUDGET = int(os.environ.get("SNMP_RESPONSE_BUDGET", "4096"))
+# Previous counter samples (for rates) of devices not sampled for COUNTER_IDLE_TIMEOUT
+# seconds are dropped (keep it above the longest poll interval), and at most
+# COUNTER_MAX_DEVICES devices are kept (LRU)
+COUNTER_MAX_DEVICES = int(os.environ.get("COUNTER_MAX_DEVICES", "16384"))
+COUNTER_IDLE_TIMEOUT = float(os.environ.get("COUNTER_IDLE_TIMEOUT", "3600"))
+
+# --- OIDS ---
+OID_SYS_DESCR = '1.3.6.1.2.1.1.1.0'
+OID_SYS_UPTIME = '1.3.6.1.2.1.1.3.0'
+OID_IF_DESCR = '1.3.6.1.2.1.2.2.1.2'
+OID_IF_ADMIN_STATUS = '1.3.6.1.2.1.2.2.1.7'
+OID_IF_OPER_STATUS = '1.3.6.1.2.1.2.2.1.8'
+OID_IF_IN_OCTETS = '1.3.6.1.2.1.2.2.1.10'          # Counter32, used when ifHC* is missing
+OID_IF_IN_DISCARDS = '1.3.6.1.2.1.2.2.1.13'
+OID_IF_IN_ERRORS = '1.3.6.1.2.1.2.2.1.14'
+OID_IF_OUT_OCTETS = '1.3.6.1.2.1.2.2.1.16'         # Counter32, used when ifHC* is missing
+OID_IF_OUT_DISCARDS = '1.3.6.1.2.1.2.2.1.19'
+OID_IF_OUT_ERRORS = '1.3.6.1.2.1.2.2.1.20'
+OID_IF_HC_IN_OCTETS = '1.3.6.1.2.1.31.1.1.1.6'     # ifXTable Counter64
+OID_IF_HC_IN_UCAST_PKTS = '1.3.6.1.2.1.31.1.1.1.7'
+OID_IF_HC_OUT_OCTETS = '1.3.6.1.2.1.31.1.1.1.10'
+OID_IF_HC_OUT_UCAST_PKTS = '1.3.6.1.2.1.31.1.1.1.11'
+OID_IF_HIGH_SPEED = '1.3.6.1.2.1.31.1.1.1.15'      # Mbit/s
+
+# Columns walked together (GETBULK) by the native engine, in row-cell order
+IF_STATUS_COLUMNS = [OID_IF_DESCR, OID_IF_ADMIN_STATUS, OID_IF_OPER_STATUS]
+IF_COUNTER_COLUMNS = [
+    OID_IF_HC_IN_OCTETS, OID_IF_HC_OUT_OCTETS, OID_IF_HC_IN_UCAST_PKTS, OID_IF_HC_OUT_UCAST_PKTS,
+    OID_IF_IN_ERRORS, OID_IF_OUT_ERRORS, OID_IF_IN_DISCARDS, OID_IF_OUT_DISCARDS,
+    OID_IF_HIGH_SPEED, OID_IF_IN_OCTETS, OID_IF_OUT_OCTETS,
+]
+IF_COLUMNS = IF_STATUS_COLUMNS + IF_COUNTER_COLUMNS
+# 14 columns per repetition: keep responses well under a typical agent's max message size.
+# Starting value only: sessions resize it per device (SNMP_RESPONSE_BUDGET)
+IF_MAX_REPETITIONS = 10
+
+snmp_pool = SnmpSessionPool(
+    max_sessions=SNMP_MAX_SESSIONS, idle_timeout=SNMP_SESSION_IDLE,
+    timeout=SNMP_TIMEOUT, retries=SNMP_RETRIES, max_repetitions=IF_MAX_REPETITIONS,
+    negative_ttl=SNMP_NEGATIVE_TTL, response_budget=SNMP_RESPONSE_BUDGET
+)
+
+# Previous counter sample per (device, ifIndex), for bps/pps/error rates between polls
+counter_tracker = CounterRateTracker(max_devices=COUNTER_MAX_DEVICES, idle_timeout=COUNTER_IDLE_TIMEOUT)
+
+# Self-instrumentation, shown by the API's GET /stats/timings (probe phases are timed here)
+INSTRUMENTATION = os.environ.get("INSTRUMENTATION", "1") == "1"
+
+instrumentation = Instrumentation(enabled=INSTRUMENTATION)
+
+# --- INSTRUMENTATION UTILS ---
+
+def run_command(command, phase, stderr=subprocess.STDOUT):
+    """subprocess.check_output() timed as "<phase>.spawn" (fork/exec) and "<phase>.wait" (until exit)"""
+    with instrumentation.timer(phase + ".spawn"):
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+    with instrumentation.timer(phase + ".wait"):
+        output, _ = proc.communicate()
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, command, output)
+    return output
+
+# --- HELPER CLASSES ---
+
+class NetworkCollector:
+    """Class to extract raw data from network devices (ICMP/SNMP)"""
+    
+    def __init__(self, target_ip, community_string="public", snmp_port=None):
+        self.ip = target_ip
+        self.community = community_string
+        self.snmp_port = snmp_port or SNMP_PORT
+
+    def ping_diagnostic(self, profile=None):
+        """Advanced ICMP Ping (Status, Packet Loss, Latency, Jitter)"""
+        profile = profile or icmp_engine.PROBE_PROFILES[PING_PROFILE]
+        if use_native_icmp(self.ip):
+            try:
+                with instrumentation.timer("icmp.native"):
+                    return icmp_engine.ping(self.ip, profile)
+            except OSError:
+                pass # socket refused at runtime, use the ping binary instead
+        return self.ping_subprocess(profile)
+
+    def ping_command(self, profile, count=None):
+        """ping binary arguments for a probe profile"""
+        count = str(count or profile.count)
+        if platform.system().lower() == 'windows':
+            return ['ping', '-n', '1' if profile.first_reply else count, '-w', str(int(profile.timeout * 1000)), self.ip]
+        if profile.first_reply:
+            # -w deadline + -c 1: keep sending every -i seconds until the first reply
+            deadline = math.ceil(profile.count * profile.interval + profile.timeout)
+            return ['ping', '-c', '1', '-i', str(profile.interval), '-w', str(deadline), self.ip]
+        command = ['ping', '-c', count]
+        if profile.interval != 1.0:
+            command += ['-i', str(profile.interval)]
+        return command + [self.ip]
+
+    def ping_subprocess(self, profile=None):
+        """ICMP Ping by forking the system ping binary and parsing its output"""
+        profile = profile or icmp_engine.PROBE_PROFILES[PING_PROFILE]
+        command = self.ping_command(profile)
+        
+        try:
+            output = run_command(command, "icmp.subprocess").decode('utf-8')
+
+            # Per-packet replies give the same statistics as the native engine;
+            # the summary-line parsing below is the fallback for unknown formats
+            with instrumentation.timer("icmp.parse"):
+                rtts = parse_ping_replies(output)
+            if rtts is not None:
+                if profile.extra and None in rtts:
+                    # Adaptive: loss in the first round, measure it with more echoes
+                    try:
+                        more = run_command(self.ping_command(profile, profile.extra), "icmp.subprocess").decode('utf-8')
+                        rtts += parse_ping_replies(more) or [None] * profile.extra
+                    except subprocess.CalledProcessError:
+                        rtts += [None] * profile.extra
+                return icmp_engine.summarize_rtts(rtts, len(rtts), profile.keep_rtts)
+            
+            result = {
+                "status": "UP", 
+                "packet_loss_pct": 0.0,
+                "latency_avg_ms": 0.0,
+                "latency_min_ms": 0.0,
+                "latency_max_ms": 0.0,
+                "jitter_ms": 0.0, # mdev approximation
+            }
+
+            # 1. Parse Packet Loss
+            loss_index = output.find("% packet loss")
+            if loss_index != -1:
+                start_loss = output.rfind(" ", 0, loss_index)
+                loss_str = output[start_loss+1:loss_index]
+                try:
+                    result['packet_loss_pct'] = float(loss_str)
+                except ValueError:
+                    pass
+
+            if result['packet_loss_pct'] == 100.0:
+                result['status'] = "DOWN"
+                return result
+
+            # 2. Parse Latency & Jitter (mdev on Linux)
+            # Linux: "rtt min/avg/max/mdev = 0.048/0.142/0.245/0.100 ms"
+            if "min/avg/max" in output:
+                try:
+                    vals_lines = [line for line in output.split("\n") if "min/avg/max" in line]
+                    if vals_lines:
+                        vals_line = vals_lines[0]
+                        parts = vals_line.split(" = ")[1].split(" ")[0].split("/")
+                        result['latency_min_ms'] = float(parts[0])
+                        result['latency_avg_ms'] = float(parts[1])
+                        result['latency_max_ms'] = float(parts[2])
+                        result['jitter_ms'] = float(parts[3]) # mdev
+                except Exception:
+                    pass
+            
+            # Simple Windows fallback
+            elif "Average =" in output:
+                # Basic parsing for Windows if needed
+                pass
+
+            return result
+
+        except subprocess.CalledProcessError:
+            return {"status": "DOWN", "packet_loss_pct": 100.0, "error": "Ping command failed"}
+        except Exception as e:
+            return {"status": "UNKNOWN", "error": f"Ping error: {e}"}
+
+    def device_key(self):
+        """Identity of this device for per-device state (counter history)"""
+        return f"{self.ip}:{self.snmp_port}"
+
+    def snmp_agent(self):
+        """snmpwalk agent argument ("ip" or "ip:port")"""
+        return self.ip if self.snmp_port == 161 else f"{self.ip}:{self.snmp_port}"
+
+    def snmp_session(self):
+        """Pooled native SNMPv2c session of this device (context manager)"""
+        return snmp_pool.session(self.ip, self.community, self.snmp_port)
+
+    def snmp_get(self, oid):
+        """Get single OID via SNMP v2c"""
+        if SNMP_ENGINE == "native":
+            try:
+                with self.snmp_session() as session, instrumentation.timer("snmp.native.get"):
+                    return snmp_engine.format_value(*session.get([oid])[oid.strip(".")])
+            except snmp_engine.SnmpError:
+                return None
+        return self.snmp_subprocess_get(oid)
+
+    def snmp_subprocess_get(self, oid):
+        """Get single OID by forking snmpwalk"""
+        try:
+            cmd = [
+                "snmpwalk", "-v2c", "-c", self.community, 
+                "-O", "qv", self.snmp_agent(), oid
+            ]
+            result = run_command(cmd, "snmp.subprocess", stderr=subprocess.DEVNULL)
+            return result.decode("utf-8").strip()
+        except subprocess.CalledProcessError:
+            return None
+        except Exception:
+            return None
+
+    def snmp_walk(self, oid):
+        """Walk OID via SNMP v2c"""
+        try:
+            cmd = [
+                "snmpwalk", "-v2c", "-c", self.community, 
+                "-O", "qn", # qn: Quick print numeric
+                self.snmp_agent(), oid
+            ]
+            result = run_command(cmd, "snmp.subprocess", stderr=subprocess.DEVNULL).decode("utf-8").strip()
+            return result
+        except subprocess.CalledProcessError:
+            return None
+        except Exception:
+            return None
+
+    def iter_snmp_data(self):
+        """
+        Yield ("system", info) then ("interface", row) for every ifTable row as soon as it
+        has been walked, so callers can stream without holding the whole table.
+        info carries snmp_status DOWN (and nothing follows) when the agent does not answer.
+        """
+        if SNMP_ENGINE != "native":
+            result = self.collect_snmp_data_subprocess()
+            interfaces = result.pop("interfaces_detail", [])
+            result.pop("interfaces_count", None)
+            yield "system", result
+            for row in interfaces:
+                yield "interface", row
+            return
+
+        with self.snmp_session() as session:
+            # 1 datagram for both scalars
+            try:
+                with instrumentation.timer("snmp.native.get"):
+                    system = session.get([OID_SYS_DESCR, OID_SYS_UPTIME])
+            except snmp_engine.SnmpError:
+                yield "system", {"snmp_status": "DOWN", "error": "No SNMP response"}
+                return
+
+            sys_descr = snmp_engine.format_value(*system[OID_SYS_DESCR])
+            if not sys_descr:
+                yield "system", {"snmp_status": "DOWN", "error": "No SNMP response"}
+                return
+            yield "system", {
+                "snmp_status": "UP",
+                "device_info": sys_descr,
+                "uptime_raw": snmp_engine.format_value(*system[OID_SYS_UPTIME]) or "N/A"
+            }
+
+            # Status + ifTable/ifXTable counter columns walked together with GETBULK
+            # (minus the columns this device has shown it does not have)
+            counter_tracker.observe_uptime(self.device_key(), system[OID_SYS_UPTIME][1])
+            session.state.observe_uptime(system[OID_SYS_UPTIME][1])
+            waited = session.client.wait_time # rows are yielded mid-walk: time only the requests
+            try:
+                for idx, cells in session.walk_table(IF_COLUMNS):
+                    row = interface_from_cells(self.device_key(), idx, cells)
+                    if row is not None:
+                        yield "interface", row
+            except snmp_engine.SnmpError:
+                pass # keep whatever rows arrived before the agent stopped answering
+            instrumentation.observe("snmp.native.walk", session.client.wait_time - waited)
+
+    def collect_snmp_data(self):
+        """Collect SNMP System Info and Interface Stats"""
+        if SNMP_ENGINE != "native":
+            return self.collect_snmp_data_subprocess()
+
+        info = None
+        interfaces_data = []
+        for kind, payload in self.iter_snmp_data():
+            if kind == "system":
+                info = payload
+            else:
+                interfaces_data.append(payload)
+
+        if info.get("snmp_status") != "UP":
+            return info
+        return dict(info, interfaces_count=len(interfaces_data), interfaces_detail=interfaces_data)
+
+    def collect_snmp_data_subprocess(self):
+        """Collect SNMP System Info and Interface Stats by forking snmpwalk per OID"""
+        snmp_status = "UP"
+        
+        # System Info
+        sys_descr = self.snmp_subprocess_get(OID_SYS_DESCR) # sysDescr
+        sys_uptime = self.snmp_subprocess_get(OID_SYS_UPTIME) # sysUpTime
+        
+        if not sys_descr:
+             snmp_status = "DOWN"
+             return {"snmp_status": "DOWN", "error": "No SNMP response"}
+        
+        interfaces_data = []
+        
+        if snmp_status == "UP":
+            try:
+                # Skip the walks that came back empty last time (negative cache)
+                state = snmp_pool.state(self.ip, self.community, self.snmp_port)
+                walks = []
+                for oid in state.supported(IF_STATUS_COLUMNS):
+                    raw = self.snmp_walk(oid)
+                    if raw == "":
+                        state.mark_unsupported([oid])
+                    walks.append(raw or "")
+
+                # One pass over all three walks, joined on the full index suffix
+                with instrumentation.timer("snmp.parse"):
+                    interfaces_data = interfaces_from_walk("\n".join(walks))
+            except Exception:
+                pass
+
+        return {
+            "snmp_status": snmp_status,
+            "device_info": sys_descr or "N/A",
+            "uptime_raw": sys_uptime or "N/A",
+            "interfaces_count": len(interfaces_data),
+            "interfaces_detail": interfaces_data
+        }
+
+def interface_from_cells(device, idx, cells, ts=None):
+    """
+    interfaces_detail entry from one IF_COLUMNS walk row: status, raw counters and
+    rates since the previous poll of the same interface. None if the row has no ifDescr.
+    """
+    descr, admin, oper = cells[0], cells[1], cells[2]
+    if descr is None:
+        return None
+    row = interface_row(
+        idx,
+        snmp_engine.format_value(*descr),
+        str(admin[1]) if admin else "0",
+        str(oper[1]) if oper else "0"
+    )
+    if len(cells) < len(IF_COLUMNS):
+        return row
+
+    (hc_in, hc_out, hc_in_pkts, hc_out_pkts, in_err, out_err, in_disc, out_disc,
+     high_speed, in_oct32, out_oct32) = cells[3:]
+    # Prefer 64-bit ifXTable octets, fall back to the 32-bit ifTable ones
+    cells_by_field = (hc_in or in_oct32, hc_out or out_oct32, hc_in_pkts, hc_out_pkts,
+                      in_err, out_err, in_disc, out_disc)
+    values = [cell[1] if cell else None for cell in cells_by_field]
+    widths = [(64 if cell[0] == snmp_engine.COUNTER64 else 32) if cell and cell[1] is not None else 0
+              for cell in cells_by_field]
+    if not any(widths):
+        return row
+
+    speed_bps = high_speed[1] * 1000000 if high_speed and high_speed[1] else None
+    row["speed_mbps"] = high_speed[1] if high_speed else None
+    row["counters"] = dict(zip(COUNTER_FIELDS, values))
+    row["rates"] = counter_tracker.update(device, idx, time.time() if ts is None else ts,
+                                          values, widths, speed_bps)
+    return row
+
+_PING_SENT = re.compile(r"(\d+) packets transmitted|Sent = (\d+)")
+_PING_REPLY = re.compile(r"(?:icmp_seq=(\d+).*?)?time[=<]([\d.]+) ?ms")
+
+def parse_ping_replies(output):
+    """Per-packet RTTs (ms, None = lost) from ping output, None if it cannot be parsed"""
+    sent = _PING_SENT.search(output)
+    if sent is None:
+        return None
+    rtts = [None] * int(sent.group(1) or sent.group(2))
+    position = 0
+    for seq, rtt in _PING_REPLY.findall(output):
+        # Linux numbers echoes from icmp_seq=1; Windows replies are taken in order
+        index = int(seq) - 1 if seq else position
+        if 0 <= index < len(rtts) and rtts[index] is None:
+            rtts[index] = float(rtt)
+        position += 1
+    return rtts
+
+def use_native_icmp(target_ip):
+    """Whether the in-process ICMP engine can probe this target (IPv4 only)"""
+    return ICMP_ENGINE != "subprocess" and ":" not in target_ip and icmp_engine.icmp_available()
@@ -0,0 +1,136 @@
+import math
+
+# Compact LLM context for one diagnostic result.
+# Instead of indented JSON of everything (or the first 10 interfaces), the
+# model gets a dense text summary: device and ICMP lines, then the interfaces
+# ranked by how suspicious they are (admin UP / oper DOWN, errors, discards,
+# saturation) as "|"-separated rows, and the healthy rest only as counts.
+# Rows are added in rank order until the token budget is used up, so the
+# faulty port is always in the context even on a 400-port chassis.
+
+DEFAULT_TOKEN_BUDGET = 1500
+CHARS_PER_TOKEN = 3 # conservative for digit / symbol heavy text (real prompts: ~3-4)
+
+UTIL_WARN_PCT = 90.0
+DESCR_MAX_CHARS = 160
+
+ANOMALY_HEADER = "id|name|admin/oper|issue|in/out Mbps|err/s in/out|disc/s in/out"
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _num(value, digits=1):
+    if value is None:
+        return "-"
+    value = round(float(value), digits)
+    return str(int(value)) if value == int(value) else str(value)
+
+def interface_issues(row):
+    """(score, [issue]) of one interfaces_detail entry; score 0 = healthy or administratively down"""
+    admin, oper = row.get("admin_status"), row.get("oper_status")
+    rates = row.get("rates") or {}
+    score, issues = 0, []
+    if admin == "UP" and oper == "DOWN":
+        score, issues = 100, ["link down"]
+    elif admin == "UP" and oper != "UP":
+        score, issues = 60, [f"oper {str(oper).lower()}"]
+    elif admin not in ("UP", "DOWN"):
+        score, issues = 40, [f"admin {str(admin).lower()}"]
+    if admin == "DOWN":
+        return score, issues
+
+    errors = (rates.get("in_errors_ps") or 0) + (rates.get("out_errors_ps") or 0)
+    discards = (rates.get("in_discards_ps") or 0) + (rates.get("out_discards_ps") or 0)
+    if errors > 0:
+        score += 50 + min(errors, 40)
+        issues.append("errors")
+    if discards > 0:
+        score += 30 + min(discards, 20)
+        issues.append("discards")
+    util = max(rates.get("in_util_pct") or 0, rates.get("out_util_pct") or 0)
+    if util >= UTIL_WARN_PCT:
+        score += 30
+        issues.append(f"util {_num(util, 0)}%")
+    return score, issues
+
+def _anomaly_row(row, issues):
+    rates = row.get("rates") or {}
+    mbps = lambda key: None if rates.get(key) is None else rates[key] / 1e6
+    return "|".join((
+        str(row.get("id")), str(row.get("name") or "").replace("|", "/"),
+        f"{row.get('admin_status')}/{row.get('oper_status')}", ",".join(issues),
+        f"{_num(mbps('in_bps'))}/{_num(mbps('out_bps'))}",
+        f"{_num(rates.get('in_errors_ps'), 2)}/{_num(rates.get('out_errors_ps'), 2)}",
+        f"{_num(rates.get('in_discards_ps'), 2)}/{_num(rates.get('out_discards_ps'), 2)}",
+    ))
+
+def _icmp_line(icmp):
+    if not icmp:
+        return None
+    parts = [f"icmp: status={icmp.get('status')}", f"loss={_num(icmp.get('packet_loss_pct'))}%"]
+    rtt = [icmp.get(k) for k in ("latency_min_ms", "latency_avg_ms", "latency_max_ms")]
+    if any(v is not None for v in rtt):
+        parts.append("rtt min/avg/max=" + "/".join(_num(v, 2) for v in rtt) + "ms")
+    if icmp.get("latency_p95_ms") is not None:
+        parts.append(f"p95={_num(icmp['latency_p95_ms'], 2)}ms")
+    if icmp.get("jitter_ms") is not None:
+        parts.append(f"jitter={_num(icmp['jitter_ms'], 2)}ms")
+    if icmp.get("loss_burst_max"):
+        parts.append(f"max_loss_burst={icmp['loss_burst_max']}")
+    if icmp.get("error"):
+        parts.append(f"error={icmp['error']}")
+    return " ".join(parts)
+
+def build_context(data, budget=DEFAULT_TOKEN_BUDGET):
+    """Compact text of a collect_full_diagnostic() / collect_snmp_data() result within ~`budget` tokens"""
+    lines = [" ".join(filter(None, (
+        f"ip={data.get('ip', 'target')}",
+        f"status={data.get('overall_status') or data.get('status')}" if (data.get('overall_status') or data.get('status')) else None,
+        f"snmp={data.get('snmp_status')}" if data.get('snmp_status') else None,
+        f"uptime={data.get('uptime_raw')}" if data.get('uptime_raw') not in (None, "N/A") else None,
+    )))]
+    descr = data.get("device_info") or data.get("sys_descr")
+    if descr and descr != "N/A":
+        descr = " ".join(str(descr).split())
+        lines.append("device: " + (descr[:DESCR_MAX_CHARS] + "..." if len(descr) > DESCR_MAX_CHARS else descr))
+    icmp_line = _icmp_line(data.get("icmp_metrics") or data.get("icmp") or data.get("ping_diagnostics"))
+    if icmp_line:
+        lines.append(icmp_line)
+    if data.get("error"):
+        lines.append(f"error: {data['error']}")
+
+    interfaces = data.get("interfaces_detail") or []
+    ranked = []
+    states = {}
+    for row in interfaces:
+        score, issues = interface_issues(row)
+        if score:
+            ranked.append((score, row, issues))
+        else:
+            state = "admin-down" if row.get("admin_status") == "DOWN" else "up/up"
+            states[state] = states.get(state, 0) + 1
+    ranked.sort(key=lambda entry: -entry[0]) # stable: equal scores keep ifIndex order
+
+    if not interfaces and not data.get("interfaces_count"):
+        return "\n".join(lines)
+    healthy = ", ".join(f"{state} {count}" for state, count in sorted(states.items(), key=lambda s: s[0] != "up/up"))
+    lines.append(f"interfaces: total={data.get('interfaces_count', len(interfaces))}"
+                 f" anomalous={len(ranked)}" + (f" healthy: {healthy}" if healthy else ""))
+    if not ranked:
+        return "\n".join(lines)
+
+    lines.append("anomalous interfaces, worst first (" + ANOMALY_HEADER + "):")
+    used = estimate_tokens("\n".join(lines))
+    reserve = estimate_tokens("... 99999 more anomalous interfaces not listed") + 1
+    listed = 0
+    for _, row, issues in ranked:
+        text = _anomaly_row(row, issues)
+        cost = estimate_tokens(text) + 1
+        if used + cost + reserve > budget and listed:
+            break
+        lines.append(text)
+        used += cost
+        listed += 1
+    if listed < len(ranked):
+        lines.append(f"... {len(ranked) - listed} more anomalous interfaces not listed")
+    return "\n".join(lines)
@@ -0,0 +1,150 @@
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# Interface counter -> rate conversion between polls.
+# The previous sample of every (device, ifIndex) lives in flat typed arrays
+# (8 x uint64 counters + 8 x uint8 widths + 1 x float64 timestamp = 80 bytes
+# per interface), so 100k interfaces stay in the low tens of MB. Devices are
+# kept in LRU order: ones not sampled for `idle_timeout` seconds (an ad-hoc
+# /snmp/data query) or beyond `max_devices` are forgotten, their next sample
+# is a first sample again.
+
+COUNTER_FIELDS = (
+    "in_octets", "out_octets",
+    "in_ucast_pkts", "out_ucast_pkts",
+    "in_errors", "out_errors",
+    "in_discards", "out_discards",
+)
+RATE_NAMES = (
+    "in_bps", "out_bps",
+    "in_pps", "out_pps",
+    "in_errors_ps", "out_errors_ps",
+    "in_discards_ps", "out_discards_ps",
+)
+# Octet counters are reported as bits per second
+RATE_SCALE = (8, 8, 1, 1, 1, 1, 1, 1)
+
+FIELD_COUNT = len(COUNTER_FIELDS)
+
+DEFAULT_MAX_DEVICES = 16384
+DEFAULT_IDLE_TIMEOUT = 3600.0 # a rate against an older sample is not worth keeping it for
+
+class _DeviceCounters:
+    __slots__ = ("slots", "values", "widths", "ts", "uptime", "last_used")
+
+    def __init__(self):
+        self.slots = {}          # ifIndex -> slot
+        self.values = array("Q") # FIELD_COUNT counters per slot
+        self.widths = array("B") # counter width in bits per field (0 = not reported)
+        self.ts = array("d")     # sample time per slot
+        self.uptime = None       # last sysUpTime, to detect reboots
+        self.last_used = 0.0     # monotonic time of the last sample
+
+class CounterRateTracker:
+    """Keeps the previous counter sample per (device, ifIndex) and turns new samples into rates"""
+
+    def __init__(self, max_devices=DEFAULT_MAX_DEVICES, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.max_devices = max_devices
+        self.idle_timeout = idle_timeout
+        self._devices = OrderedDict() # device -> _DeviceCounters, least recently sampled first
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _device(self, device, reset=False):
+        """Counters of a device (created if missing or `reset`), caller holds self._lock"""
+        now = time.monotonic()
+        dev = None if reset else self._devices.get(device)
+        if dev is None:
+            dev = self._devices[device] = _DeviceCounters()
+        self._devices.move_to_end(device)
+        dev.last_used = now
+        # Idle devices are at the front: forget them, and the least recently sampled over the cap
+        while len(self._devices) > 1:
+            key, oldest = next(iter(self._devices.items()))
+            if len(self._devices) <= self.max_devices and now - oldest.last_used <= self.idle_timeout:
+                break
+            del self._devices[key]
+            self.evictions += 1
+        return dev
+
+    def observe_uptime(self, device, uptime_ticks):
+        """Forget a device's samples when sysUpTime went backwards (reboot => counters reset)"""
+        if uptime_ticks is None:
+            return
+        with self._lock:
+            dev = self._device(device)
+            if dev.uptime is not None and uptime_ticks < dev.uptime:
+                dev = self._device(device, reset=True)
+            dev.uptime = uptime_ticks
+
+    def forget(self, device):
+        with self._lock:
+            self._devices.pop(device, None)
+
+    def interfaces_tracked(self):
+        with self._lock:
+            return sum(len(dev.slots) for dev in self._devices.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "devices": len(self._devices),
+                "interfaces": sum(len(dev.slots) for dev in self._devices.values()),
+                "max_devices": self.max_devices,
+                "idle_timeout_s": self.idle_timeout,
+                "evictions": self.evictions
+            }
+
+    def update(self, device, if_index, ts, values, widths, speed_bps=None):
+        """
+        Store a sample and return rates against the previous one.
+        `values`/`widths` follow COUNTER_FIELDS (width 32/64 bits, 0 if the counter is missing).
+        Returns None on the first sample, else {rate name: value or None}.
+        """
+        with self._lock:
+            dev = self._device(device)
+
+            slot = dev.slots.get(if_index)
+            if slot is None:
+                dev.slots[if_index] = len(dev.ts)
+                dev.ts.append(ts)
+                dev.values.extend(v or 0 for v in values)
+                dev.widths.extend(widths)
+                return None
+
+            base = slot * FIELD_COUNT
+            dt = ts - dev.ts[slot]
+            rates = None
+            if dt > 0:
+                rates = {}
+                for i in range(FIELD_COUNT):
+                    rates[RATE_NAMES[i]] = self._rate(
+                        values[i], widths[i], dev.values[base + i], dev.widths[base + i], dt, RATE_SCALE[i], speed_bps)
+
+            dev.ts[slot] = ts
+            for i in range(FIELD_COUNT):
+                dev.values[base + i] = values[i] or 0
+                dev.widths[base + i] = widths[i]
+
+        if rates is not None and speed_bps:
+            for direction in ("in", "out"):
+                bps = rates[f"{direction}_bps"]
+                rates[f"{direction}_util_pct"] = round(100.0 * bps / speed_bps, 2) if bps is not None else None
+        return rates
+
+    @staticmethod
+    def _rate(current, width, previous, prev_width, dt, scale, speed_bps):
+        if not width or width != prev_width:
+            return None
+        delta = current - previous
+        if delta < 0:
+            if width == 64:
+                return None # a 64-bit counter does not wrap between polls: it was reset
+            delta += 1 << 32  # Counter32 wrapped once
+        rate = delta * scale / dt
+        # A "wrap" that implies more than line rate was really a counter reset
+        if scale == 8 and speed_bps and rate > speed_bps * 1.05:
+            return None
+        return round(rate, 2)
@@ -0,0 +1,71 @@
+import multiprocessing
+import os
+
+# Production server settings for network_api.py, all overridable from the environment.
+#
+#   gunicorn -c gunicorn.conf.py network_api:app
+#
+# WORKER_CLASS:
+#   gthread (default) - WEB_CONCURRENCY processes x WEB_THREADS threads; a slow ping/SNMP
+#                       timeout only ties up one thread, not the whole server
+#   gevent            - async-capable mode: sockets, select and subprocess are monkey-patched
+#                       to be cooperative, so one worker keeps serving while hundreds of
+#                       probes wait on the network (up to WORKER_CONNECTIONS per worker)
+#
+# POLL_INVENTORY: the background poller keeps its samples in process memory and
+# /icmp/*, /snmp/data and /timeseries/* answer from them, so it runs in exactly one
+# process: with polling enabled the server is forced to ONE worker that is never
+# recycled (scale it with WEB_THREADS or gevent; POLL_PROCESSES shards the probing).
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+
+POLLING = bool(os.environ.get("POLL_INVENTORY"))
+
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+if POLLING:
+    workers = 1
+worker_class = os.environ.get("WORKER_CLASS", "gthread")
+threads = int(os.environ.get("WEB_THREADS", "8"))
+worker_connections = int(os.environ.get("WORKER_CONNECTIONS", "500"))
+
+# A worker silent for longer than `timeout` is killed and restarted.
+# Must stay above the slowest probe (4-packet ping ~3s, SNMP timeout x retries x walks)
+timeout = int(os.environ.get("TIMEOUT", "60"))
+# On SIGTERM, in-flight requests get this long to finish before workers are killed
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("KEEPALIVE", "5"))
+
+# Recycle workers now and then to bound memory growth (never while polling: a
+# recycled worker would start over with empty ring buffers)
+max_requests = 0 if POLLING else int(os.environ.get("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", "1000"))
+
+accesslog = os.environ.get("ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info")
+
+def on_starting(server):
+    # Also enforced here: -w / --max-requests on the command line override this file
+    if POLLING:
+        if server.num_workers > 1:
+            server.log.warning(f"network_api: POLL_INVENTORY is set, running 1 worker instead of {server.num_workers}")
+            server.num_workers = 1
+        if server.cfg.max_requests:
+            server.cfg.set("max_requests", 0)
+    server.log.info(f"network_api: {server.num_workers} x {server.cfg.worker_class_str} workers"
+                    f" ({server.cfg.threads} threads / {server.cfg.worker_connections} connections),"
+                    f" timeout {server.cfg.timeout}s" + (", polling" if POLLING else ""))
+
+def nworkers_changed(server, new_value, old_value):
+    # TTIN would add workers without the poller's samples
+    if POLLING and new_value > 1:
+        server.log.warning("network_api: POLL_INVENTORY is set, keeping a single worker")
+        server.num_workers = 1
+
+def post_worker_init(worker):
+    if POLLING:
+        from network_api import start_poller
+        start_poller()
+
+def worker_int(worker):
+    worker.log.info("network_api: worker interrupted, finishing in-flight requests")
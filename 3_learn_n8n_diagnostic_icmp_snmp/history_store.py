@@ -0,0 +1,251 @@
+import ipaddress
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+from array import array
+
+from poller import ICMP_METRICS, SNMP_METRICS
+
+# Append-only on-disk history of poll results, read through mmap.
+#
+#   <root>/<YYYYMMDD>/<device>/icmp.seg   one segment per UTC day, device and kind
+#
+# A segment is a 16-byte header (magic, version, column count) followed by
+# fixed-width records: uint32 timestamp + one float32 per metric of the kind
+# (ICMP_METRICS / SNMP_METRICS order, native byte order). One poll is one
+# record, so a write is one append per device and kind. A range query maps
+# only the segments of the days it covers and slices one metric out of them as
+# a strided memoryview, so reading weeks of a device never decodes the other
+# columns or loads other devices' files. New metrics may only be appended to
+# the metric tuples: older segments simply have fewer columns. A writer whose
+# column count differs from the day's segment (an upgrade during the day) starts
+# a second one, <kind>.c<columns>.seg, and reads merge both.
+#
+# Several threads and processes (gunicorn workers) may write the same segment:
+# a segment only appears complete with its header (written to a temporary file,
+# then hard-linked into place, which fails if another writer was first), and
+# every append is one O_APPEND write of whole records.
+
+MAGIC = b"NDH1"
+HEADER = struct.Struct("=4sHH8x")
+KINDS = {"icmp": ICMP_METRICS, "snmp": SNMP_METRICS}
+DAY = 86400
+
+FLUSH_INTERVAL = 5.0    # seconds a record may wait in memory
+FLUSH_RECORDS = 4096    # ... or this many pending records
+
+def _day(ts):
+    return time.strftime("%Y%m%d", time.gmtime(ts))
+
+def _device_dir(ip):
+    """Directory name of a device, built from its normalized address (ValueError for anything else)"""
+    # Never the raw string: "../x" or "/abs/path" must not become a path component
+    address = str(ipaddress.ip_address(str(ip).strip()))
+    return address.replace(":", "_") # IPv6 colons are not portable in file names
+
+def metric_kind(metric):
+    """("icmp" | "snmp", column index) of a metric name, None if unknown"""
+    for kind, columns in KINDS.items():
+        if metric in columns:
+            return kind, columns.index(metric)
+    return None
+
+def _create_segment(path, columns, data):
+    """Create a segment holding `data` atomically, False if it already exists"""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, HEADER.pack(MAGIC, 1, columns) + data)
+    finally:
+        os.close(fd)
+    try:
+        os.link(tmp, path)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        os.unlink(tmp)
+
+def _append_segment(path, columns, data):
+    """Append records to a segment (created if missing), False if it has another column count"""
+    while True:
+        try:
+            fd = os.open(path, os.O_RDWR | os.O_APPEND)
+        except FileNotFoundError:
+            if _create_segment(path, columns, data):
+                return True
+            continue # another writer created it first: append to theirs
+        try:
+            header = os.pread(fd, HEADER.size, 0)
+            magic, _, found = HEADER.unpack(header) if len(header) == HEADER.size else (None, 0, 0)
+            if magic != MAGIC or found != columns:
+                return False
+            os.write(fd, data)
+            return True
+        finally:
+            os.close(fd)
+
+class HistoryStore:
+    """Day-partitioned, fixed-width segment files per device and result kind"""
+
+    def __init__(self, root, retention_days=30):
+        self.root = root
+        self._root = os.path.join(os.path.abspath(root), "")
+        self.retention_days = retention_days
+        self.records = 0
+        self._pending = {} # segment path -> (column count, bytearray of records)
+        self._pending_records = 0
+        self._last_flush = time.monotonic()
+        self._last_day = None
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, day, ip, kind):
+        path = os.path.join(self.root, day, _device_dir(ip), kind + ".seg")
+        if not os.path.abspath(path).startswith(self._root):
+            raise ValueError(f"{ip!r}: segment path outside the history store")
+        return path
+
+    def append(self, ip, kind, ts, values):
+        """Queue one record; `values` follow KINDS[kind]. ValueError if `ip` is not an IP address"""
+        columns = len(KINDS[kind])
+        record = array("I", [int(ts)]).tobytes() + array("f", values[:columns]).tobytes()
+        day = _day(ts)
+        with self._lock:
+            path = self._path(day, ip, kind)
+            pending = self._pending.get(path)
+            if pending is None:
+                pending = self._pending[path] = (columns, bytearray())
+            pending[1].extend(record)
+            self._pending_records += 1
+            self.records += 1
+            due = (self._pending_records >= FLUSH_RECORDS
+                   or time.monotonic() - self._last_flush >= FLUSH_INTERVAL)
+            rolled = day != self._last_day
+            self._last_day = day
+        if due:
+            self.flush()
+        if rolled:
+            self.prune()
+
+    def flush(self):
+        """Write pending records, one O_APPEND write per segment"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._pending_records = 0
+            self._last_flush = time.monotonic()
+        for path, (columns, data) in pending.items():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not _append_segment(path, columns, data):
+                # Segment of the day has another column count: records go to their own one
+                base, _ = os.path.splitext(path)
+                _append_segment(f"{base}.c{columns}.seg", columns, data)
+
+    def prune(self, now=None):
+        """Delete day directories older than the retention"""
+        if not self.retention_days:
+            return
+        oldest = _day((time.time() if now is None else now) - self.retention_days * DAY)
+        for name in os.listdir(self.root):
+            if name.isdigit() and len(name) == 8 and name < oldest:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def days(self):
+        return sorted(n for n in os.listdir(self.root) if n.isdigit() and len(n) == 8)
+
+    def _segments(self, day, ip, kind):
+        """Segment files of a device and kind for one day"""
+        directory = os.path.dirname(self._path(day, ip, kind))
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        return [os.path.join(directory, n) for n in sorted(names)
+                if n == kind + ".seg" or (n.startswith(kind + ".c") and n.endswith(".seg"))]
+
+    def _read(self, path, column, start, end):
+        """[(ts, value)] of one column of a segment within [start, end]"""
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= HEADER.size:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, _, columns = HEADER.unpack_from(mm)
+                if magic != MAGIC or column >= columns:
+                    return []
+                width = columns + 1
+                count = (size - HEADER.size) // (4 * width) # a torn last record is ignored
+                view = memoryview(mm)[HEADER.size:HEADER.size + count * width * 4]
+                try:
+                    stamps = view.cast("I")[::width].tolist()
+                    values = view.cast("f")[column + 1::width].tolist()
+                finally:
+                    view.release()
+        return [(ts, v) for ts, v in zip(stamps, values) if start <= ts <= end]
+
+    def query(self, ip, metric, start=0, end=None, step=None):
+        """
+        [(ts, value)] of one metric, oldest first; None for an unknown metric.
+        `step` (seconds) averages the points into buckets of that width.
+        """
+        found = metric_kind(metric)
+        if found is None:
+            return None
+        kind, column = found
+        self.flush() # reads see what was recorded so far
+        end = time.time() if end is None else end
+        first, last = _day(max(start, 0)), _day(end)
+        points = []
+        for day in self.days():
+            if first <= day <= last:
+                for path in self._segments(day, ip, kind):
+                    points.extend(self._read(path, column, start, end))
+        points.sort(key=lambda p: p[0]) # several writer processes may interleave
+        if step:
+            points = downsample(points, step)
+        return points
+
+    def metrics(self, ip):
+        """Metric names with at least one segment for the device"""
+        names = []
+        for kind, columns in KINDS.items():
+            if any(self._segments(day, ip, kind) for day in self.days()):
+                names.extend(columns)
+        return names
+
+    def stats(self):
+        with self._lock:
+            pending = self._pending_records
+        days = self.days()
+        return {
+            "root": self.root,
+            "days": len(days),
+            "first_day": days[0] if days else None,
+            "last_day": days[-1] if days else None,
+            "records_written": self.records,
+            "pending_records": pending,
+            "retention_days": self.retention_days
+        }
+
+def downsample(points, step):
+    """Average (ts, value) points into `step`-second buckets (bucket start as ts)"""
+    out = []
+    bucket, total, count = None, 0.0, 0
+    for ts, value in points:
+        b = ts - ts % step
+        if b != bucket:
+            if count:
+                out.append((bucket, total / count))
+            bucket, total, count = b, 0.0, 0
+        total += value
+        count += 1
+    if count:
+        out.append((bucket, total / count))
+    return out
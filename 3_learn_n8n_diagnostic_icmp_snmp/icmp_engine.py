@@ -0,0 +1,311 @@
+import math
+import heapq
+import itertools
+import random
+import select
+import socket
+import struct
+import time
+from array import array
+from collections import namedtuple
+
+# In-process ICMP echo engine.
+# Replaces "fork ping + scrape its text output" with a single socket that
+# multiplexes echo requests for many targets and matches replies by id/sequence.
+#
+# Socket preference:
+#   1. SOCK_DGRAM + IPPROTO_ICMP  -> unprivileged ping socket (Linux, needs net.ipv4.ping_group_range)
+#   2. SOCK_RAW   + IPPROTO_ICMP  -> needs root / CAP_NET_RAW
+# If neither can be opened, icmp_available() returns False and callers fall back to the ping binary.
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+PAYLOAD = b"network-api-icmp-probe".ljust(48, b"\x00")
+
+# Probe profiles: how many echoes, how fast, and when a target is finished.
+#   first_reply: finish on the first reply (liveness check)
+#   extra:       echoes added when the first `count` saw loss (adaptive)
+#   keep_rtts:   also return the per-packet RTT array ("rtt_ms", None = lost)
+ProbeProfile = namedtuple("ProbeProfile", "count interval timeout first_reply extra keep_rtts")
+
+PROBE_PROFILES = {
+    "fast": ProbeProfile(count=3, interval=0.2, timeout=0.5, first_reply=True, extra=0, keep_rtts=False),
+    "standard": ProbeProfile(count=4, interval=1.0, timeout=1.0, first_reply=False, extra=0, keep_rtts=False),
+    "qos": ProbeProfile(count=10, interval=0.2, timeout=1.0, first_reply=False, extra=0, keep_rtts=True),
+    "adaptive": ProbeProfile(count=3, interval=0.2, timeout=1.0, first_reply=False, extra=7, keep_rtts=True),
+}
+
+# Random start: worker / shard processes have consecutive PIDs, a PID-seeded
+# counter would hand out overlapping ids within a few sockets
+_ident_counter = itertools.count(random.getrandbits(16))
+
+def next_ident():
+    """Echo identifier for a new socket (raw sockets share one id space per host)"""
+    return next(_ident_counter) & 0xFFFF
+
+_available = None
+
+def checksum(data):
+    """RFC 1071 Internet checksum"""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack("!%dH" % (len(data) // 2), data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+def open_icmp_socket():
+    """Open an ICMP socket, returns (sock, is_raw). Raises OSError when privileges are missing"""
+    try:
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP), False
+    except OSError:
+        return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+
+def icmp_available():
+    """True if this process may open an ICMP socket (result is cached)"""
+    global _available
+    if _available is None:
+        try:
+            sock, _ = open_icmp_socket()
+            sock.close()
+            _available = True
+        except OSError:
+            _available = False
+    return _available
+
+def build_echo_request(ident, seq):
+    """ICMP echo request packet (header + fixed payload)"""
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, checksum(header + PAYLOAD), ident, seq) + PAYLOAD
+
+def parse_echo_reply(data, raw, ident):
+    """(ident, seq) of an echo reply meant for us, None for anything else"""
+    if raw:
+        data = data[(data[0] & 0x0F) * 4:] # strip IPv4 header
+    if len(data) < 8:
+        return None
+    icmp_type, _, _, reply_ident, seq = struct.unpack("!BBHHH", data[:8])
+    # Raw sockets see every ICMP packet on the host: filter on our identifier.
+    # Datagram sockets are already demultiplexed by the kernel (it rewrites the id).
+    if icmp_type != ICMP_ECHO_REPLY or (raw and reply_ident != ident):
+        return None
+    return ident, seq
+
+def profile_for(name, **overrides):
+    """PROBE_PROFILES entry by name with some fields replaced. Raises KeyError for unknown names"""
+    profile = PROBE_PROFILES[name]
+    return profile._replace(**overrides) if overrides else profile
+
+LOST = float("nan") # lost echo in an RTT array
+
+def percentile(ordered, pct):
+    """Linear-interpolated percentile of an ascending sequence"""
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def rtt_statistics(rtts):
+    """
+    Tail latency, jitter and loss pattern of one probe.
+    `rtts` is the per-packet RTT array in send order (ms, None/NaN = lost).
+    """
+    samples = array("f", [LOST if r is None else r for r in rtts])
+    received = array("f", [r for r in samples if r == r]) # NaN != NaN
+    lost = [r != r for r in samples]
+
+    # Loss bursts: runs of consecutive lost echoes
+    bursts = 0
+    longest = run = 0
+    for is_lost in lost:
+        if is_lost:
+            run += 1
+            bursts += run == 1
+            longest = max(longest, run)
+        else:
+            run = 0
+    stats = {"loss_bursts": bursts, "loss_burst_max": longest}
+    if not received:
+        return stats
+
+    ordered = sorted(received)
+    # RFC 3550 interarrival jitter (J += (|D| - J) / 16) over consecutive replies,
+    # with the RTT difference as D; plus the plain mean |D| (IPDV)
+    deltas = [abs(b - a) for a, b in zip(received, received[1:])]
+    jitter = 0.0
+    for d in deltas:
+        jitter += (d - jitter) / 16.0
+    stats.update({
+        "latency_p50_ms": round(percentile(ordered, 50), 3),
+        "latency_p95_ms": round(percentile(ordered, 95), 3),
+        "latency_p99_ms": round(percentile(ordered, 99), 3),
+        "jitter_rfc3550_ms": round(jitter, 3),
+        "ipdv_avg_ms": round(sum(deltas) / len(deltas), 3) if deltas else 0.0,
+    })
+    return stats
+
+def summarize_rtts(rtts, sent, keep_rtts=False):
+    """Build the ping_diagnostic() result dict from per-packet RTTs (ms, None/NaN = lost)"""
+    received = [r for r in rtts if r is not None and r == r]
+    loss_pct = round(100.0 * (sent - len(received)) / sent, 1) if sent else 100.0
+    if not received:
+        result = {"status": "DOWN", "packet_loss_pct": 100.0, "error": "No ICMP echo reply"}
+    else:
+        avg = sum(received) / len(received)
+        # Same definition as iputils "mdev" so numbers match the ping binary's summary line
+        mdev = math.sqrt(max(0.0, sum(r * r for r in received) / len(received) - avg * avg))
+        result = {
+            "status": "UP",
+            "packet_loss_pct": loss_pct,
+            "latency_avg_ms": round(avg, 3),
+            "latency_min_ms": round(min(received), 3),
+            "latency_max_ms": round(max(received), 3),
+            "jitter_ms": round(mdev, 3), # mdev approximation, see jitter_rfc3550_ms
+        }
+    result["packets_sent"] = sent
+    result["packets_received"] = len(received)
+    result.update(rtt_statistics(rtts))
+    if keep_rtts:
+        result["rtt_ms"] = [None if r is None or r != r else round(r, 3) for r in rtts]
+    return result
+
+class _Target:
+    """Per-target probe state"""
+    __slots__ = ("name", "addr", "seqs", "sent_at", "rtts", "next_seq", "planned", "needed", "replies", "done")
+
+    def __init__(self, name, addr, count, extra=0, first_reply=False):
+        self.name = name
+        self.addr = addr
+        self.seqs = []
+        self.sent_at = array("d", bytes(8 * (count + extra)))
+        self.rtts = array("f", [LOST]) * (count + extra) # ms, 4 bytes per echo
+        self.next_seq = 0
+        self.planned = count # echoes to send (grows by `extra` on loss)
+        self.needed = 1 if first_reply else count # replies that finish the target early
+        self.replies = 0
+        self.done = False
+
+class IcmpProber:
+    """Multiplexes ICMP echo requests for many targets over one socket"""
+
+    def __init__(self):
+        self.sock, self.raw = open_icmp_socket()
+        self.sock.setblocking(False)
+        self.ident = next_ident()
+        self._seq = itertools.count()
+        self._inflight = {} # (addr, ident, seq) -> (target, packet index)
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _send(self, target, index):
+        seq = next(self._seq) & 0xFFFF
+        packet = build_echo_request(self.ident, seq)
+        target.seqs.append(seq)
+        target.sent_at[index] = time.monotonic()
+        try:
+            self.sock.sendto(packet, (target.addr, 0))
+        except OSError:
+            return # counted as lost (e.g. ENOBUFS, no route)
+        self._inflight[(target.addr, self.ident, seq)] = (target, index)
+
+    def _drain(self):
+        """Read every queued reply, returns targets that received all the replies they need"""
+        completed = []
+        while True:
+            try:
+                data, (addr, _) = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return completed
+            now = time.monotonic()
+
+            reply = parse_echo_reply(data, self.raw, self.ident)
+            if reply is None:
+                continue
+
+            entry = self._inflight.pop((addr,) + reply, None)
+            if entry is None:
+                continue
+            target, index = entry
+            if target.done:
+                continue
+            target.rtts[index] = (now - target.sent_at[index]) * 1000.0
+            target.replies += 1
+            if target.replies == target.needed:
+                completed.append(target)
+
+    def _finish(self, target, keep_rtts):
+        target.done = True
+        for seq in target.seqs:
+            self._inflight.pop((target.addr, self.ident, seq), None)
+        return target.name, summarize_rtts(target.rtts[:target.next_seq], target.next_seq, keep_rtts)
+
+    def probe(self, targets, count=4, interval=1.0, timeout=1.0, window=256,
+              first_reply=False, extra=0, keep_rtts=False):
+        """
+        Ping every target `count` times, `interval` seconds apart.
+        Yields (target, result) as soon as a target has the replies it needs or its last
+        packet timed out. At most `window` targets are in flight at once.
+        `first_reply` stops at the first reply; `extra` more echoes are sent when the
+        first `count` saw loss. Takes the fields of a ProbeProfile as keywords.
+        """
+        pending = list(targets)
+        pending.reverse()
+        heap = [] # (when, tiebreak, target): next send or final deadline
+        order = itertools.count()
+        active = 0
+
+        while pending or active:
+            # Admit new targets into the window
+            while pending and active < window:
+                name = pending.pop()
+                try:
+                    addr = socket.gethostbyname(name)
+                except (OSError, UnicodeError) as e: # UnicodeError: empty labels, "a..b"
+                    yield name, {"status": "UNKNOWN", "error": f"Ping error: {e}"}
+                    continue
+                target = _Target(name, addr, count, extra, first_reply)
+                heapq.heappush(heap, (time.monotonic(), next(order), target))
+                active += 1
+
+            now = time.monotonic()
+            while heap and heap[0][0] <= now:
+                _, _, target = heapq.heappop(heap)
+                if target.done:
+                    continue
+                if target.next_seq < target.planned:
+                    self._send(target, target.next_seq)
+                    target.next_seq += 1
+                    delay = interval if target.next_seq < target.planned else timeout
+                    heapq.heappush(heap, (now + delay, next(order), target))
+                elif extra and target.planned == count and target.replies < count:
+                    # Adaptive: loss in the first round, measure it with more echoes
+                    target.planned += extra
+                    target.needed = target.planned
+                    heapq.heappush(heap, (now, next(order), target))
+                else:
+                    active -= 1
+                    yield self._finish(target, keep_rtts)
+
+            if not active:
+                continue
+            wait = max(0.0, heap[0][0] - time.monotonic())
+            readable, _, _ = select.select([self.sock], [], [], wait)
+            if readable:
+                for target in self._drain():
+                    active -= 1
+                    yield self._finish(target, keep_rtts)
+
+def ping(target, profile=PROBE_PROFILES["standard"]):
+    """Single-target convenience wrapper, same result schema as NetworkCollector.ping_diagnostic()"""
+    with IcmpProber() as prober:
+        for _, result in prober.probe([target], **profile._asdict()):
+            return result
+    return {"status": "UNKNOWN", "error": "Ping error: no result"}
@@ -0,0 +1,123 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from contextlib import nullcontext
+
+# Self-instrumentation of the API: where does the time of a request go?
+# Named phases ("icmp.subprocess.spawn", "snmp.native.walk", "http.get_snmp_data", ...)
+# feed log-bucketed histograms. A request that asked for it also gets the
+# phases it ran summed into a Server-Timing header.
+# Disabled, timer() hands out one shared no-op context manager.
+
+# Upper bounds of the histogram buckets in ms: 0.025 ms .. ~105 s, doubling
+BUCKETS_MS = tuple(0.025 * 2 ** i for i in range(23))
+
+_NOOP = nullcontext()
+
+class Histogram:
+    """Count / sum / max plus doubling buckets of one phase (milliseconds)"""
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * (len(BUCKETS_MS) + 1))) # last bucket: overflow
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (max for the overflow bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total, 3),
+            "avg_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max, 3),
+            "p50_ms": round(self.quantile(0.50), 3),
+            "p90_ms": round(self.quantile(0.90), 3),
+            "p99_ms": round(self.quantile(0.99), 3),
+        }
+
+class _Timer:
+    __slots__ = ("owner", "name", "start")
+
+    def __init__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.owner.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+class Instrumentation:
+    """Thread-safe registry of phase histograms with optional per-request span collection"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.since = time.time()
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local() # greenlet-local under gevent's monkey patching
+
+    def timer(self, name):
+        """Context manager timing one phase"""
+        return _Timer(self, name) if self.enabled else _NOOP
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        ms = seconds * 1000.0
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(ms)
+        spans = getattr(self._local, "spans", None)
+        if spans is not None:
+            spans[name] = spans.get(name, 0.0) + ms
+
+    def begin_request(self, collect_spans):
+        """Start collecting this thread's phases for a Server-Timing header (or not)"""
+        self._local.spans = {} if collect_spans else None
+
+    def end_request(self):
+        """{phase: ms} collected since begin_request(), None if not collecting"""
+        spans = getattr(self._local, "spans", None)
+        self._local.spans = None
+        return spans
+
+    def snapshot(self, prefix=None):
+        with self._lock:
+            phases = {name: h.snapshot() for name, h in sorted(self._histograms.items())
+                      if prefix is None or name.startswith(prefix)}
+        return {"enabled": self.enabled, "since": round(self.since, 3), "phases": phases}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self.since = time.time()
+
+def server_timing(spans):
+    """Server-Timing header value from {phase: ms}"""
+    return ", ".join(f"{name};dur={ms:.3f}" for name, ms in spans.items())
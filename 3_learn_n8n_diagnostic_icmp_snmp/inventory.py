@@ -0,0 +1,126 @@
+import csv
+import ipaddress
+import json
+import os
+
+from icmp_engine import PROBE_PROFILES
+from topology import check_parents
+
+# Device inventory for the pollers.
+# One device = {"ip", "community", "snmp_port", "tags", "profile", "interval", "ping", "snmp", "parent"}.
+# A poll profile bundles how a device is polled (interval, ICMP probe profile,
+# SNMP on/off); devices name a profile and may override any of its fields.
+# "parent" is the IP of the upstream device it is reached through (optional,
+# see topology.py); it must be in the same inventory.
+#
+# Accepted files:
+#   .json  [{"ip": ..}, ..] or {"profiles": {..}, "devices": [..]}
+#   .yaml  same structure as the JSON object form (needs PyYAML)
+#   .csv   header row with ip[,community,snmp_port,tags,profile,interval,ping,snmp,parent];
+#          tags separated by ";" (e.g. "core;dc1")
+
+DEFAULT_INTERVAL = 60
+DEFAULT_SNMP_PORT = 161
+
+# Profiles without an "interval" use the loader's default interval
+POLL_PROFILES = {
+    "default": {"ping": "standard", "snmp": True},
+    "critical": {"interval": 15, "ping": "qos", "snmp": True},
+    "icmp-only": {"ping": "fast", "snmp": False},
+}
+
+PROFILE_FIELDS = ("interval", "ping", "snmp")
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() not in ("", "0", "false", "no", "off")
+    return bool(value)
+
+def _as_tags(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [t.strip() for t in value.replace(",", ";").split(";") if t.strip()]
+    return [str(t) for t in value]
+
+def normalize_device(entry, profiles=POLL_PROFILES, default_interval=None):
+    """Validated device dict from an inventory entry (str IP or dict). Raises ValueError"""
+    if isinstance(entry, str):
+        entry = {"ip": entry}
+    ip = str(entry.get("ip") or "").strip()
+    if not ip:
+        raise ValueError(f"Inventory entry without ip: {entry}")
+    ipaddress.ip_address(ip) # raises ValueError for garbage
+
+    profile_name = entry.get("profile") or "default"
+    if profile_name not in profiles:
+        raise ValueError(f"{ip}: unknown poll profile '{profile_name}'")
+    settings = dict(profiles[profile_name])
+    for field in PROFILE_FIELDS:
+        if entry.get(field) not in (None, ""):
+            settings[field] = entry[field]
+    ping = str(settings.get("ping") or "standard")
+    if ping not in PROBE_PROFILES:
+        raise ValueError(f"{ip}: unknown ping profile '{ping}'")
+    parent = str(entry.get("parent") or "").strip() or None
+    if parent is not None:
+        ipaddress.ip_address(parent)
+        if parent == ip:
+            raise ValueError(f"{ip}: a device cannot be its own parent")
+
+    return {
+        "ip": ip,
+        "community": entry.get("community") or "public",
+        "snmp_port": int(entry.get("snmp_port") or DEFAULT_SNMP_PORT),
+        "tags": _as_tags(entry.get("tags")),
+        "profile": profile_name,
+        "interval": float(settings.get("interval") or default_interval or DEFAULT_INTERVAL),
+        "ping": ping,
+        "snmp": _as_bool(settings.get("snmp", True)),
+        "parent": parent,
+    }
+
+def _read_entries(path):
+    """(profiles, entries) from a JSON / YAML / CSV file"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline="") as f:
+            return {}, [row for row in csv.DictReader(f) if any(row.values())]
+
+    with open(path) as f:
+        if ext in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("YAML inventories need PyYAML (pip install pyyaml)")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    if isinstance(data, list):
+        return {}, data
+    if isinstance(data, dict):
+        return data.get("profiles") or {}, data.get("devices") or []
+    raise ValueError(f"{path}: expected a list of devices or an object with 'devices'")
+
+def load_inventory(path, default_interval=None):
+    """Device dicts from an inventory file; an IP listed twice keeps its first entry (stores are keyed by IP)"""
+    custom_profiles, entries = _read_entries(path)
+    profiles = dict(POLL_PROFILES)
+    for name, settings in custom_profiles.items():
+        profiles[name] = dict(POLL_PROFILES["default"], **settings)
+
+    devices = []
+    seen = set()
+    for entry in entries:
+        device = normalize_device(entry, profiles, default_interval)
+        if device["ip"] not in seen:
+            seen.add(device["ip"])
+            devices.append(device)
+    check_parents(devices)
+    return devices
+
+def filter_devices(devices, tags=None):
+    """Devices carrying every tag in `tags`"""
+    wanted = set(_as_tags(tags))
+    return [d for d in devices if wanted.issubset(d["tags"])]
@@ -0,0 +1,99 @@
+import argparse
+import base64
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+# Simple closed-loop load generator for network_api.py.
+# Each client thread keeps one keep-alive connection and fires requests back to back.
+#
+# Compare serving modes against the same target, e.g.:
+#   python network_api.py                                                  (dev server)
+#   gunicorn -c gunicorn.conf.py network_api:app                           (gthread)
+#   WORKER_CLASS=gevent gunicorn -c gunicorn.conf.py network_api:app       (gevent)
+# then:
+#   python load_test.py --url http://localhost:5000 --clients 50 --duration 30 --fresh
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+def client_loop(url, path, body, headers, deadline, latencies, errors, lock):
+    parsed = urlparse(url)
+    conn_cls = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+    conn = conn_cls(parsed.hostname, parsed.port, timeout=120)
+    local_lat = []
+    local_err = 0
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            conn.request("POST", path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                local_err += 1
+            else:
+                local_lat.append(time.monotonic() - started)
+        except (OSError, http.client.HTTPException):
+            local_err += 1
+            conn.close()
+    conn.close()
+    with lock:
+        latencies.extend(local_lat)
+        errors[0] += local_err
+
+def run(url, path, target_ip, clients, duration, user, password, fresh):
+    token = base64.b64encode(f"{user}:{password}".encode()).decode()
+    headers = {"Content-Type": "application/json", "Authorization": f"Basic {token}"}
+    payload = {"ip": target_ip}
+    if fresh:
+        payload["fresh"] = True # bypass the probe cache: measure real probe throughput
+    body = json.dumps(payload)
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=client_loop, args=(url, path, body, headers, deadline, latencies, errors, lock))
+        for _ in range(clients)
+    ]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "endpoint": path,
+        "clients": clients,
+        "duration_s": round(elapsed, 2),
+        "requests_ok": len(latencies),
+        "errors": errors[0],
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "latency_max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test for network_api.py")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--endpoint", default="/icmp/qos")
+    parser.add_argument("--ip", default="127.0.0.1")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--fresh", action="store_true", help="bypass the probe cache")
+    args = parser.parse_args()
+
+    report = run(args.url, args.endpoint, args.ip, args.clients, args.duration, args.user, args.password, args.fresh)
+    print(json.dumps(report, indent=2))
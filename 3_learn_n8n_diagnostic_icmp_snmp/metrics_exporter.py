@@ -0,0 +1,193 @@
+import gzip
+import threading
+
+from counter_rates import COUNTER_FIELDS
+
+# Prometheus / OpenMetrics exposition of the poller results.
+# Every recorded result re-renders only that device's sample lines, stored per
+# metric family ({family: {ip: lines}}), so a scrape is one join of prebuilt
+# strings (cached until the next update) and never triggers a probe.
+# Benchmark: bench_metrics_exporter.py
+
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+PREFIX = "netdiag_"
+
+# name -> (type, help); counters get the "_total" sample suffix, info "_info"
+FAMILIES = {
+    "device": ("info", "Inventory device (poll profile and tags)"),
+    "icmp_up": ("gauge", "1 if the device answered the last ICMP probe"),
+    "icmp_packet_loss_ratio": ("gauge", "Fraction of echo requests lost in the last probe"),
+    "icmp_rtt_seconds": ("gauge", "Round-trip time of the last probe by statistic"),
+    "icmp_jitter_seconds": ("gauge", "Jitter of the last probe (mdev, or RFC 3550 interarrival)"),
+    "icmp_loss_burst_max": ("gauge", "Longest run of consecutive lost echoes in the last probe"),
+    "icmp_last_probe_timestamp_seconds": ("gauge", "Unix time of the last ICMP probe"),
+    "snmp_up": ("gauge", "1 if the device answered the last SNMP poll"),
+    "snmp_interfaces": ("gauge", "Number of interfaces in the ifTable"),
+    "snmp_last_poll_timestamp_seconds": ("gauge", "Unix time of the last SNMP poll"),
+    "if_admin_status": ("gauge", "ifAdminStatus (1 up, 2 down, 3 testing)"),
+    "if_oper_status": ("gauge", "ifOperStatus (1 up, 2 down, 3 testing)"),
+    "if_speed_bps": ("gauge", "Interface speed (ifHighSpeed) in bits per second"),
+}
+FAMILIES.update({f"if_{field}": ("counter", f"Interface {field.replace('_', ' ')} counter") for field in COUNTER_FIELDS})
+
+ICMP_RTT_STATS = (("min", "latency_min_ms"), ("avg", "latency_avg_ms"), ("max", "latency_max_ms"),
+                  ("p50", "latency_p50_ms"), ("p95", "latency_p95_ms"), ("p99", "latency_p99_ms"))
+ICMP_JITTER = (("mdev", "jitter_ms"), ("rfc3550", "jitter_rfc3550_ms"))
+IF_STATUS_CODES = {"UP": 1, "DOWN": 2, "TESTING": 3}
+
+_SUFFIX = {"counter": "_total", "info": "_info"}
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_number(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value) # shortest round-trip representation
+
+def _seconds(ms):
+    return None if ms is None else round(ms / 1000.0, 9) # ns resolution, no float noise digits
+
+def _headers(openmetrics):
+    """`# HELP` / `# TYPE` block per family for one exposition format"""
+    headers = {}
+    for family, (kind, help_text) in FAMILIES.items():
+        if openmetrics:
+            name = PREFIX + family
+        else:
+            # Prometheus 0.0.4 has no info type and names counters with their suffix
+            name = PREFIX + family + _SUFFIX.get(kind, "")
+            kind = "gauge" if kind == "info" else kind
+        headers[family] = f"# HELP {name} {help_text}\n# TYPE {name} {kind}\n"
+    return headers
+
+class _Lines:
+    """Sample lines of one device, grouped by family"""
+    __slots__ = ("by_family",)
+
+    def __init__(self):
+        self.by_family = {}
+
+    def add(self, family, labels, value):
+        if value is None:
+            return
+        name = PREFIX + family + _SUFFIX.get(FAMILIES[family][0], "")
+        self.by_family.setdefault(family, []).append(f"{name}{{{labels}}} {format_number(value)}\n")
+
+    def fragments(self):
+        return {family: "".join(lines) for family, lines in self.by_family.items()}
+
+class MetricsExporter:
+    """Incrementally maintained exposition text of the latest result per inventory device"""
+
+    def __init__(self):
+        self._fragments = {family: {} for family in FAMILIES} # family -> {ip: sample lines}
+        self._sources = {}    # (ip, kind) -> families that kind of result wrote
+        self._rendered = {}   # (openmetrics, gzip) -> body of the current generation
+        self._lock = threading.Lock()
+        self._headers = {True: _headers(True), False: _headers(False)}
+        self.generation = 0
+        self.renders = 0
+
+    def _replace(self, ip, kind, fragments):
+        with self._lock:
+            for family in self._sources.get((ip, kind), ()):
+                if family not in fragments:
+                    self._fragments[family].pop(ip, None)
+            for family, text in fragments.items():
+                self._fragments[family][ip] = text
+            self._sources[(ip, kind)] = tuple(fragments)
+            self.generation += 1
+            self._rendered.clear()
+
+    def set_device(self, device):
+        """Info series of an inventory device dict"""
+        lines = _Lines()
+        labels = (f'ip="{escape_label(device["ip"])}",profile="{escape_label(device.get("profile", ""))}",'
+                  f'tags="{escape_label(",".join(device.get("tags") or ()))}"')
+        lines.add("device", labels, 1)
+        self._replace(device["ip"], "device", lines.fragments())
+
+    def update_icmp(self, ip, result, ts):
+        lines = _Lines()
+        base = f'ip="{escape_label(ip)}"'
+        lines.add("icmp_up", base, 1 if result.get("status") == "UP" else 0)
+        loss = result.get("packet_loss_pct")
+        lines.add("icmp_packet_loss_ratio", base, None if loss is None else loss / 100.0)
+        if result.get("status") == "UP":
+            for stat, key in ICMP_RTT_STATS:
+                lines.add("icmp_rtt_seconds", f'{base},stat="{stat}"', _seconds(result.get(key)))
+            for method, key in ICMP_JITTER:
+                lines.add("icmp_jitter_seconds", f'{base},method="{method}"', _seconds(result.get(key)))
+        lines.add("icmp_loss_burst_max", base, result.get("loss_burst_max"))
+        lines.add("icmp_last_probe_timestamp_seconds", base, float(ts))
+        self._replace(ip, "icmp", lines.fragments())
+
+    def update_snmp(self, ip, result, ts):
+        lines = _Lines()
+        base = f'ip="{escape_label(ip)}"'
+        up = result.get("snmp_status") == "UP"
+        lines.add("snmp_up", base, 1 if up else 0)
+        lines.add("snmp_last_poll_timestamp_seconds", base, float(ts))
+        if up:
+            interfaces = result.get("interfaces_detail") or []
+            lines.add("snmp_interfaces", base, len(interfaces))
+            for iface in interfaces:
+                labels = f'{base},ifindex="{escape_label(iface.get("id"))}",ifdescr="{escape_label(iface.get("name") or "")}"'
+                lines.add("if_admin_status", labels, IF_STATUS_CODES.get(iface.get("admin_status"), 0))
+                lines.add("if_oper_status", labels, IF_STATUS_CODES.get(iface.get("oper_status"), 0))
+                speed = iface.get("speed_mbps")
+                lines.add("if_speed_bps", labels, None if speed is None else speed * 1000000)
+                counters = iface.get("counters") or {}
+                for field in COUNTER_FIELDS:
+                    lines.add(f"if_{field}", labels, counters.get(field))
+        self._replace(ip, "snmp", lines.fragments())
+
+    def remove(self, ip):
+        with self._lock:
+            for fragments in self._fragments.values():
+                fragments.pop(ip, None)
+            for key in [k for k in self._sources if k[0] == ip]:
+                del self._sources[key]
+            self.generation += 1
+            self._rendered.clear()
+
+    def render(self, openmetrics=False, compress=False):
+        """Exposition body (bytes); rebuilt only when a device changed since the last scrape"""
+        key = (openmetrics, compress)
+        headers = self._headers[openmetrics]
+        with self._lock:
+            body = self._rendered.get(key)
+            if body is not None:
+                return body
+            generation = self.generation
+            parts = []
+            for family, fragments in self._fragments.items():
+                if fragments:
+                    parts.append(headers[family])
+                    parts.extend(fragments.values())
+
+        # Join / compress outside the lock: pollers keep recording meanwhile
+        if openmetrics:
+            parts.append("# EOF\n")
+        body = "".join(parts).encode("utf-8")
+        if compress:
+            body = gzip.compress(body, compresslevel=1)
+        with self._lock:
+            if self.generation == generation:
+                self._rendered[key] = body
+            self.renders += 1
+        return body
+
+    def series_count(self):
+        with self._lock:
+            return sum(text.count("\n") for fragments in self._fragments.values() for text in fragments.values())
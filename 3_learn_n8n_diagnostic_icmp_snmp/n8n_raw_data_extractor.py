@@ -1,21 +1,185 @@
 import platform
+import socket
 import subprocess
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # ==============================================================================
 # INSTRUCTIONS FOR N8N
 # 1. Copy the code below into an n8n "Code" node (Language: Python).
-# 2. Ensure the 'snmpwalk' command is installed and available in the n8n environment.
-#    (e.g., install 'snmp' package in the n8n Docker container)
-# 3. Adjust the 'target_ip' and 'community' inputs logic at the bottom.
+# 2. SNMP is queried in-process over UDP (SNMP_ENGINE = "native"). Only with
+#    SNMP_ENGINE = "subprocess" must the 'snmpwalk' command be installed in the
+#    n8n environment (e.g., install 'snmp' package in the n8n Docker container).
+# 3. Set the node Mode to "Run Once for All Items": every incoming item
+#    ({"ip": ..., "community": ..., "timeout": ...}) is probed concurrently and
+#    one output item per device is returned, in the same order as the input.
+# 4. A device that does not answer within DEVICE_TIMEOUT seconds is reported as
+#    "TIMEOUT" with whatever was collected so far, the rest of the batch is not held up.
 # ==============================================================================
 
+DEFAULT_COMMUNITY = "public"
+DEVICE_TIMEOUT = 20.0 # seconds per device (ping + SNMP), an item may override it with "timeout"
+MAX_WORKERS = 32      # devices probed at the same time
+
+# --- SNMP WALK PARSER ---
+# Line-by-line variant of snmp_walk_parser.py (an n8n Code node cannot import
+# local modules, so it is inlined here). Rows are keyed by the full index
+# suffix below each column OID, all columns are parsed in one pass.
+
+OID_DESCR = '1.3.6.1.2.1.2.2.1.2'
+OID_ADMIN = '1.3.6.1.2.1.2.2.1.7'
+OID_OPER = '1.3.6.1.2.1.2.2.1.8'
+
+IF_STATUS_MAP = {'1': 'UP', '2': 'DOWN', '3': 'TESTING'}
+
+def parse_walk_columns(raw_text, columns):
+    """{column OID: {index suffix: value}} from concatenated "-O qn" (or "OID = value") walk output"""
+    found = {c.strip("."): {} for c in columns}
+    prefixes = [("." + c + ".", store) for c, store in found.items()]
+    prefixes += [(p[1:], store) for p, store in prefixes]
+    prefix, store = prefixes[0]
+    for line in raw_text.splitlines():
+        # Walk output is grouped by column: test the previously matched column first
+        if not line.startswith(prefix):
+            for prefix, store in prefixes:
+                if line.startswith(prefix):
+                    break
+            else:
+                continue
+        idx, sep, value = line[len(prefix):].partition(" = ")
+        if not sep:
+            idx, sep, value = idx.partition(" ")
+            if not sep:
+                continue
+        if value[-1:] in '"': # also '' (empty value)
+            value = value.strip().strip('"')
+        store[idx] = value
+    return found
+
+# --- SNMP CLIENT ---
+# Minimal SNMPv2c GET / GETBULK client, an inlined subset of snmp_engine.py (same
+# reason as above). One UDP socket per device: one GET for sysDescr + sysUpTime
+# and a lockstep GETBULK walk of the three ifTable columns, instead of forking
+# snmpwalk five times per device. "subprocess" keeps the snmpwalk path.
+
+SNMP_ENGINE = "native"
+SNMP_PORT = 161
+SNMP_TIMEOUT = 1.0         # seconds per attempt (also bounded by the device budget)
+SNMP_RETRIES = 1
+SNMP_MAX_REPETITIONS = 25  # rows per GETBULK
+
+OID_SYS_DESCR = '1.3.6.1.2.1.1.1.0'
+OID_SYS_UPTIME = '1.3.6.1.2.1.1.3.0'
+
+GET_REQUEST, GET_RESPONSE, GET_BULK_REQUEST = 0xA0, 0xA2, 0xA5
+END_OF_MIB_VIEW = 0x82
+
+def _tlv(tag, payload):
+    size = len(payload)
+    if size < 0x80:
+        return bytes([tag, size]) + payload
+    raw = size.to_bytes((size.bit_length() + 7) // 8, "big")
+    return bytes([tag, 0x80 | len(raw)]) + raw + payload
+
+def _integer(value):
+    return _tlv(0x02, value.to_bytes(max(1, (value + (value < 0)).bit_length() // 8 + 1), "big", signed=True))
+
+def _oid(oid):
+    arcs = [int(arc) for arc in oid.strip(".").split(".")]
+    out = bytearray([arcs[0] * 40 + arcs[1]])
+    for arc in arcs[2:]:
+        chunk = [arc & 0x7F]
+        arc >>= 7
+        while arc:
+            chunk.append(0x80 | (arc & 0x7F))
+            arc >>= 7
+        out.extend(reversed(chunk))
+    return _tlv(0x06, bytes(out))
+
+def snmp_message(community, pdu_type, request_id, field1, field2, oids):
+    """BER-encoded SNMPv2c request; field1/field2 = non-repeaters/max-repetitions for GETBULK"""
+    varbinds = b"".join(_tlv(0x30, _oid(oid) + b"\x05\x00") for oid in oids)
+    pdu = _tlv(pdu_type, _integer(request_id) + _integer(field1) + _integer(field2) + _tlv(0x30, varbinds))
+    return _tlv(0x30, _integer(1) + _tlv(0x04, community.encode("utf-8")) + pdu)
+
+def _read_tlv(data, offset):
+    """(tag, value start, value end), ValueError / IndexError on truncated data"""
+    tag, length = data[offset], data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        n = length & 0x7F
+        length = int.from_bytes(data[offset:offset + n], "big")
+        offset += n
+    if offset + length > len(data):
+        raise ValueError("Truncated BER data")
+    return tag, offset, offset + length
+
+def _decode_oid(raw):
+    arcs = [raw[0] // 40, raw[0] % 40] if raw[0] < 80 else [2, raw[0] - 80]
+    value = 0
+    for byte in raw[1:]:
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            arcs.append(value)
+            value = 0
+    return ".".join(map(str, arcs))
+
+def format_snmp_value(tag, raw):
+    """A value the way `snmpwalk -O qv` prints it, None for NULL / noSuch* / endOfMibView"""
+    if tag == 0x04: # OCTET STRING
+        text = raw.decode("utf-8", errors="replace")
+        return text if text.isprintable() else " ".join(f"{b:02X}" for b in raw)
+    if tag == 0x02: # INTEGER
+        return str(int.from_bytes(raw, "big", signed=True))
+    if tag == 0x43: # TimeTicks
+        ticks = int.from_bytes(raw, "big")
+        seconds = ticks // 100
+        return f"{seconds // 86400}:{seconds // 3600 % 24}:{seconds // 60 % 60:02d}:{seconds % 60:02d}.{ticks % 100:02d}"
+    if tag in (0x41, 0x42, 0x46): # Counter32, Gauge32, Counter64
+        return str(int.from_bytes(raw, "big"))
+    if tag == 0x06:
+        return _decode_oid(raw)
+    if tag == 0x40 and len(raw) == 4: # IpAddress
+        return ".".join(map(str, raw))
+    return None
+
+def snmp_response(data):
+    """(pdu type, request id, error status, [(oid, tag, raw value)]), ValueError / IndexError if malformed"""
+    _, pos, _ = _read_tlv(data, 0)
+    _, _, pos = _read_tlv(data, pos)        # version
+    _, _, pos = _read_tlv(data, pos)        # community
+    pdu_type, pos, _ = _read_tlv(data, pos)
+    _, start, pos = _read_tlv(data, pos)    # request-id
+    request_id = int.from_bytes(data[start:pos], "big", signed=True)
+    _, start, pos = _read_tlv(data, pos)    # error-status
+    error_status = int.from_bytes(data[start:pos], "big")
+    _, _, pos = _read_tlv(data, pos)        # error-index
+    _, pos, end = _read_tlv(data, pos)
+    varbinds = []
+    while pos < end:
+        _, item, pos = _read_tlv(data, pos)
+        _, o_start, o_end = _read_tlv(data, item)
+        tag, v_start, v_end = _read_tlv(data, o_end)
+        varbinds.append((_decode_oid(data[o_start:o_end]), tag, bytes(data[v_start:v_end])))
+    return pdu_type, request_id, error_status, varbinds
+
 class NetworkCollector:
     """Kelas untuk mengambil data mentah dari perangkat network"""
     
-    def __init__(self, target_ip, community_string):
+    def __init__(self, target_ip, community_string, timeout=DEVICE_TIMEOUT, snmp_port=SNMP_PORT):
         self.ip = target_ip
         self.community = community_string
+        self.snmp_port = snmp_port
+        self.deadline = time.monotonic() + timeout
+        self.request_id = 0
+
+    def remaining(self):
+        """Seconds left of this device's time budget (subprocess timeout), raises once it is spent"""
+        left = self.deadline - time.monotonic()
+        if left <= 0:
+            raise subprocess.TimeoutExpired("collect", 0)
+        return left
 
     def ping_diagnostic(self):
         """Melakukan Advanced ICMP Ping (Status, Packet Loss, Latency, Jitter)"""
@@ -27,7 +191,7 @@ class NetworkCollector:
         
         try:
             # Capture output
-            output = subprocess.check_output(command, stderr=subprocess.STDOUT).decode('utf-8')
+            output = subprocess.check_output(command, stderr=subprocess.STDOUT, timeout=self.remaining()).decode('utf-8')
             
             # --- Parsing Logic (Linux format assumed base on environment) ---
             # Linux: "rtt min/avg/max/mdev = 0.048/0.142/0.245/0.100 ms"
@@ -84,6 +248,8 @@ class NetworkCollector:
 
             return result
 
+        except subprocess.TimeoutExpired:
+            return {"status": "DOWN", "packet_loss_pct": 100.0, "error": "Ping timed out"}
         except subprocess.CalledProcessError:
             return {"status": "DOWN", "packet_loss_pct": 100.0, "error": "Ping command failed (Host Unreachable)"}
         except Exception as e:
@@ -97,7 +263,7 @@ class NetworkCollector:
                 "-O", "qv", self.ip, oid
             ]
             
-            result = subprocess.check_output(cmd, stderr=subprocess.DEVNULL)
+            result = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, timeout=self.remaining())
             return result.decode("utf-8").strip()
             
         except subprocess.CalledProcessError:
@@ -115,7 +281,7 @@ class NetworkCollector:
                 self.ip, oid
             ]
             
-            result = subprocess.check_output(cmd, stderr=subprocess.DEVNULL).decode("utf-8").strip()
+            result = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, timeout=self.remaining()).decode("utf-8").strip()
             return result
             
         except subprocess.CalledProcessError:
@@ -124,6 +290,91 @@ class NetworkCollector:
             # print(f"[!] Error walking OID {oid}: {e}") # Suppress print in n8n
             return None
 
+    def snmp_request(self, sock, pdu_type, field1, field2, oids):
+        """Varbinds of one GET / GETBULK, None if the agent did not answer (or answered with an error)"""
+        self.request_id += 1
+        packet = snmp_message(self.community, pdu_type, self.request_id, field1, field2, oids)
+        for _ in range(SNMP_RETRIES + 1):
+            if time.monotonic() >= self.deadline:
+                break # device budget spent
+            sock.send(packet)
+            attempt_deadline = min(time.monotonic() + SNMP_TIMEOUT, self.deadline)
+            while True:
+                left = attempt_deadline - time.monotonic()
+                if left <= 0:
+                    break # retry
+                sock.settimeout(left)
+                try:
+                    data = sock.recv(65535)
+                except socket.timeout:
+                    break
+                try:
+                    resp_type, request_id, error_status, varbinds = snmp_response(data)
+                except (IndexError, ValueError):
+                    continue # garbled datagram: the real answer may still come
+                if resp_type == GET_RESPONSE and request_id == self.request_id:
+                    return None if error_status else varbinds
+        return None
+
+    def snmp_table(self, sock, columns):
+        """{column OID: {index suffix: value}} of several table columns walked together with GETBULK"""
+        found = {c: {} for c in columns}
+        cursors = {c: c for c in columns} # next OID to ask for, per unfinished column
+        while cursors:
+            active = list(cursors)
+            varbinds = self.snmp_request(sock, GET_BULK_REQUEST, 0, SNMP_MAX_REPETITIONS, [cursors[c] for c in active])
+            if not varbinds:
+                break
+            finished = set()
+            previous = dict(cursors)
+            for pos, (oid, tag, raw) in enumerate(varbinds):
+                column = active[pos % len(active)]
+                if column in finished:
+                    continue
+                if tag == END_OF_MIB_VIEW or not oid.startswith(column + "."):
+                    finished.add(column) # walked off the end of this column
+                    continue
+                found[column][oid[len(column) + 1:]] = format_snmp_value(tag, raw)
+                cursors[column] = oid
+            for column in active:
+                # Done, or the agent did not advance: stop instead of looping
+                if column in finished or cursors[column] == previous[column]:
+                    del cursors[column]
+        return found
+
+    def snmp_native(self):
+        """(sysDescr, sysUpTime, {column: {index: value}}) over one UDP socket, sysDescr None if SNMP is down"""
+        try:
+            family, _, _, _, addr = socket.getaddrinfo(self.ip, self.snmp_port, type=socket.SOCK_DGRAM)[0]
+            with socket.socket(family, socket.SOCK_DGRAM) as sock:
+                sock.connect(addr) # only accept datagrams from the agent
+                varbinds = self.snmp_request(sock, GET_REQUEST, 0, 0, [OID_SYS_DESCR, OID_SYS_UPTIME])
+                system = {oid: format_snmp_value(tag, raw) for oid, tag, raw in varbinds or ()}
+                sys_descr = system.get(OID_SYS_DESCR)
+                if not sys_descr:
+                    return None, None, {}
+                columns = {}
+                try:
+                    columns = self.snmp_table(sock, (OID_DESCR, OID_ADMIN, OID_OPER))
+                except Exception:
+                    pass
+                return sys_descr, system.get(OID_SYS_UPTIME), columns
+        except Exception:
+            # Unresolvable name, socket error or device budget spent
+            return None, None, {}
+
+    def snmp_subprocess(self):
+        """Same as snmp_native(), forking snmpwalk per OID (SNMP_ENGINE = "subprocess")"""
+        sys_descr = self.snmp_get(OID_SYS_DESCR) # sysDescr
+        sys_uptime = self.snmp_get(OID_SYS_UPTIME) # sysUpTime
+        if not sys_descr:
+            return None, None, {}
+        try:
+            raw = "\n".join(self.snmp_walk(oid) or "" for oid in (OID_DESCR, OID_ADMIN, OID_OPER))
+            return sys_descr, sys_uptime, parse_walk_columns(raw, (OID_DESCR, OID_ADMIN, OID_OPER))
+        except Exception:
+            return sys_descr, sys_uptime, {}
+
     def collect_full_diagnostic(self):
         """Mengumpulkan snapshot data untuk AI"""
         
@@ -137,54 +388,27 @@ class NetworkCollector:
              }
 
         # 2. SNMP Info Collection
-        snmp_status = "UP"
-        
-        # System Info
-        sys_descr = self.snmp_get('1.3.6.1.2.1.1.1.0') # sysDescr
-        sys_uptime = self.snmp_get('1.3.6.1.2.1.1.3.0') # sysUpTime
-        
-        # Jika basic SNMP gagal
-        if not sys_descr:
-             snmp_status = "DOWN"
+        if SNMP_ENGINE == "native":
+            sys_descr, sys_uptime, cols = self.snmp_native()
+        else:
+            sys_descr, sys_uptime, cols = self.snmp_subprocess()
+        snmp_status = "UP" if sys_descr else "DOWN" # Jika basic SNMP gagal
         
         interfaces_data = [] # List of dicts
         
-        if snmp_status == "UP":
-            try:
-                raw_descr = self.snmp_walk('1.3.6.1.2.1.2.2.1.2') or ""
-                raw_admin = self.snmp_walk('1.3.6.1.2.1.2.2.1.7') or ""
-                raw_oper  = self.snmp_walk('1.3.6.1.2.1.2.2.1.8') or ""
-                
-                def parse_walk_to_dict(raw_text):
-                    data = {}
-                    for line in raw_text.splitlines():
-                        if not line: continue
-                        parts = line.split(" = ")
-                        if len(parts) >= 2:
-                            oid_part = parts[0]
-                            val_part = parts[1].strip()
-                            idx = oid_part.split(".")[-1]
-                            data[idx] = val_part
-                    return data
-
-                d_descr = parse_walk_to_dict(raw_descr)
-                d_admin = parse_walk_to_dict(raw_admin)
-                d_oper  = parse_walk_to_dict(raw_oper)
-                
-                for idx, name in d_descr.items():
-                    a_stat = d_admin.get(idx, "0")
-                    o_stat = d_oper.get(idx, "0")
-                    status_map = {'1': 'UP', '2': 'DOWN', '3': 'TESTING'}
-                    
-                    interfaces_data.append({
-                        "id": idx,
-                        "name": name.strip('"'),
-                        "admin_status": status_map.get(a_stat, f"Unknown({a_stat})"),
-                        "oper_status": status_map.get(o_stat, f"Unknown({o_stat})")
-                    })
-                    
-            except Exception as e:
-                pass
+        if cols:
+            d_admin = cols[OID_ADMIN]
+            d_oper = cols[OID_OPER]
+
+            for idx, name in cols[OID_DESCR].items():
+                a_stat = d_admin.get(idx) or "0"
+                o_stat = d_oper.get(idx) or "0"
+                interfaces_data.append({
+                    "id": idx,
+                    "name": name,
+                    "admin_status": IF_STATUS_MAP.get(a_stat, f"Unknown({a_stat})"),
+                    "oper_status": IF_STATUS_MAP.get(o_stat, f"Unknown({o_stat})")
+                })
 
         data_package = {
             "overall_status": "UP",
@@ -196,28 +420,63 @@ class NetworkCollector:
             "interfaces_detail": interfaces_data[:10],
             "note": "Showing first 10 interfaces only"
         }
+
+        if time.monotonic() >= self.deadline:
+            # The SNMP steps were cut short: partial data, not a DOWN agent
+            data_package["overall_status"] = "TIMEOUT"
+            data_package["error"] = "Device time budget exceeded, SNMP data may be incomplete."
         
         return data_package
 
-# --- EXECUTION BLOCK ---
+def item_fields(item):
+    """json dict of an n8n item (object with .json, or plain dict as in local runs)"""
+    data = getattr(item, 'json', None)
+    if data is None and isinstance(item, dict):
+        data = item.get('json', item)
+    if hasattr(data, 'to_py'): # JsProxy in the Pyodide runner
+        data = data.to_py()
+    return data if isinstance(data, dict) else {}
 
-# 1. Get Inputs (This part depends on how you run it in n8n)
-# For testing/demo:
-target_ip = "127.0.0.1"
-community = "public"
+def collect_device(fields):
+    target_ip = fields.get('ip') or fields.get('target_ip') or fields.get('host')
+    if not target_ip:
+        return {"overall_status": "ERROR", "error": "Item has no 'ip' field."}
+    try:
+        timeout = float(fields.get('timeout') or DEVICE_TIMEOUT)
+        collector = NetworkCollector(target_ip, fields.get('community') or DEFAULT_COMMUNITY, timeout)
+        raw_data = collector.collect_full_diagnostic()
+    except Exception as e:
+        raw_data = {"overall_status": "ERROR", "error": f"Collector error: {e}"}
+    raw_data['ip'] = target_ip
+    return raw_data
 
-# If using n8n inputs, you might uncomment something like:
-# if hasattr(_input, 'all'):
-#     item = _input.all()[0].json
-#     target_ip = item.get('ip', target_ip)
-#     community = item.get('community', community)
+def collect_batch(items):
+    """Probe all items concurrently, one output item per input item, in input order"""
+    fields = [item_fields(item) for item in items]
+    if not fields:
+        return []
+    # Same device twice in the batch: probe it once
+    keys = [(f.get('ip') or f.get('target_ip') or f.get('host'), f.get('community') or DEFAULT_COMMUNITY) for f in fields]
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(set(keys)))) as pool:
+        futures = {}
+        for key, f in zip(keys, fields):
+            if key not in futures:
+                futures[key] = pool.submit(collect_device, f)
+        # Every device bounds its own ping / SNMP calls, so result() waits at most
+        # about DEVICE_TIMEOUT per wave of MAX_WORKERS devices
+        return [{'json': dict(futures[key].result()), 'pairedItem': {'item': i}} for i, key in enumerate(keys)]
 
-# 2. Run Collector
-collector = NetworkCollector(target_ip, community)
-raw_data = collector.collect_full_diagnostic()
+# --- EXECUTION BLOCK ---
 
-if isinstance(raw_data, dict):
-    raw_data['ip'] = target_ip
+# 1. Get Inputs: every n8n item is one device ({"ip": ..., "community": ..., "timeout": ...})
+try:
+    items = _input.all()
+except NameError:
+    # For testing/demo outside n8n:
+    items = [{'ip': "127.0.0.1", 'community': "public"}]
+
+# 2. Run Collector on the whole batch
+results = collect_batch(items)
 
 # 3. Return Data (Valid in n8n Code Node)
-return [{'json': raw_data}]
+return results
@@ -1,8 +1,25 @@
-import platform
-import subprocess
+import os
+import atexit
 import json
+import tempfile
+import time
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import wraps
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, jsonify, Response, g
+from flask.json.provider import DefaultJSONProvider
+
+import icmp_engine
+from probe_cache import ProbeCache
+from instrumentation import server_timing
+from snapshot_delta import SnapshotStore, DELTA_FIELDS
+from collector import NetworkCollector, use_native_icmp, snmp_pool, counter_tracker, instrumentation, PING_PROFILE
+from inventory import load_inventory, DEFAULT_INTERVAL
+from metrics_exporter import MetricsExporter, OPENMETRICS_TYPE, PROMETHEUS_TYPE
+from poller import MetricStore, BackgroundPoller, DEFAULT_HISTORY_SIZE, icmp_values, snmp_values
+from history_store import HistoryStore, metric_kind
+from sharded_poller import ShardedPoller, DEFAULT_CONCURRENCY
+from topology import suppressed_results
 
 app = Flask(__name__)
 
@@ -11,161 +28,329 @@ app = Flask(__name__)
 USERNAME = "admin"
 PASSWORD = "password"
 
-# --- HELPER CLASSES ---
+# Batch probing limits (/icmp/batch)
+BATCH_MAX_TARGETS = 4096        # a /20 worth of hosts per request
+BATCH_DEFAULT_CONCURRENCY = 64
+BATCH_MAX_CONCURRENCY = 256
 
-class NetworkCollector:
-    """Class to extract raw data from network devices (ICMP/SNMP)"""
-    
-    def __init__(self, target_ip, community_string="public"):
-        self.ip = target_ip
-        self.community = community_string
-
-    def ping_diagnostic(self):
-        """Advanced ICMP Ping (Status, Packet Loss, Latency, Jitter)"""
-        count = '4'
-        param = '-n' if platform.system().lower() == 'windows' else '-c'
-        # On Linux, we might want to add -i 0.2 for speed if needed, but sticking to standard for now
-        command = ['ping', param, count, self.ip]
-        
-        try:
-            output = subprocess.check_output(command, stderr=subprocess.STDOUT).decode('utf-8')
-            
-            result = {
-                "status": "UP", 
-                "packet_loss_pct": 0.0,
-                "latency_avg_ms": 0.0,
-                "latency_min_ms": 0.0,
-                "latency_max_ms": 0.0,
-                "jitter_ms": 0.0, # mdev approximation
-            }
+# Engine settings (ICMP_ENGINE, PING_PROFILE, SNMP_*) live in collector.py.
+# /icmp/qos profiles
+QOS_PROFILES = ("qos", "adaptive", "standard")
+QOS_MAX_COUNT = 100
+QOS_MIN_INTERVAL = 0.2 # iputils minimum for unprivileged users
 
-            # 1. Parse Packet Loss
-            loss_index = output.find("% packet loss")
-            if loss_index != -1:
-                start_loss = output.rfind(" ", 0, loss_index)
-                loss_str = output[start_loss+1:loss_index]
-                try:
-                    result['packet_loss_pct'] = float(loss_str)
-                except ValueError:
-                    pass
-
-            if result['packet_loss_pct'] == 100.0:
-                result['status'] = "DOWN"
-                return result
-
-            # 2. Parse Latency & Jitter (mdev on Linux)
-            # Linux: "rtt min/avg/max/mdev = 0.048/0.142/0.245/0.100 ms"
-            if "min/avg/max" in output:
-                try:
-                    vals_lines = [line for line in output.split("\n") if "min/avg/max" in line]
-                    if vals_lines:
-                        vals_line = vals_lines[0]
-                        parts = vals_line.split(" = ")[1].split(" ")[0].split("/")
-                        result['latency_min_ms'] = float(parts[0])
-                        result['latency_avg_ms'] = float(parts[1])
-                        result['latency_max_ms'] = float(parts[2])
-                        result['jitter_ms'] = float(parts[3]) # mdev
-                except Exception:
-                    pass
-            
-            # Simple Windows fallback
-            elif "Average =" in output:
-                # Basic parsing for Windows if needed
-                pass
-
-            return result
-
-        except subprocess.CalledProcessError:
-            return {"status": "DOWN", "packet_loss_pct": 100.0, "error": "Ping command failed"}
-        except Exception as e:
-            return {"status": "UNKNOWN", "error": f"Ping error: {e}"}
-
-    def snmp_get(self, oid):
-        """Get single OID via SNMP v2c"""
-        try:
-            cmd = [
-                "snmpwalk", "-v2c", "-c", self.community, 
-                "-O", "qv", self.ip, oid
-            ]
-            result = subprocess.check_output(cmd, stderr=subprocess.DEVNULL)
-            return result.decode("utf-8").strip()
-        except subprocess.CalledProcessError:
-            return None
-        except Exception:
-            return None
-
-    def snmp_walk(self, oid):
-        """Walk OID via SNMP v2c"""
-        try:
-            cmd = [
-                "snmpwalk", "-v2c", "-c", self.community, 
-                "-O", "qn", # qn: Quick print numeric
-                self.ip, oid
-            ]
-            result = subprocess.check_output(cmd, stderr=subprocess.DEVNULL).decode("utf-8").strip()
-            return result
-        except subprocess.CalledProcessError:
-            return None
-        except Exception:
-            return None
-
-    def collect_snmp_data(self):
-        """Collect SNMP System Info and Interface Stats"""
-        snmp_status = "UP"
-        
-        # System Info
-        sys_descr = self.snmp_get('1.3.6.1.2.1.1.1.0') # sysDescr
-        sys_uptime = self.snmp_get('1.3.6.1.2.1.1.3.0') # sysUpTime
-        
-        if not sys_descr:
-             snmp_status = "DOWN"
-             return {"snmp_status": "DOWN", "error": "No SNMP response"}
-        
-        interfaces_data = []
-        
-        if snmp_status == "UP":
+# Result cache in front of NetworkCollector (seconds / entries; TTL 0 = only de-duplicate in-flight probes)
+PROBE_CACHE_TTL = float(os.environ.get("PROBE_CACHE_TTL", "10"))
+PROBE_CACHE_SIZE = int(os.environ.get("PROBE_CACHE_SIZE", "4096"))
+
+probe_cache = ProbeCache(ttl=PROBE_CACHE_TTL, max_entries=PROBE_CACHE_SIZE)
+
+# Background poller: JSON / YAML / CSV inventory of devices to poll continuously (disabled when unset)
+POLL_INVENTORY = os.environ.get("POLL_INVENTORY")
+POLL_INTERVAL = float(os.environ.get("POLL_INTERVAL", DEFAULT_INTERVAL))
+POLL_WORKERS = int(os.environ.get("POLL_WORKERS", "16"))
+# > 1: shard the inventory over that many worker processes (asyncio collectors) instead of threads
+POLL_PROCESSES = int(os.environ.get("POLL_PROCESSES", "1"))
+POLL_CONCURRENCY = int(os.environ.get("POLL_CONCURRENCY", DEFAULT_CONCURRENCY))
+POLL_HISTORY_SIZE = int(os.environ.get("POLL_HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+
+# On-disk history (append-only day segments, mmap reads) of every poller result and
+# on-demand probe, for /history; disabled when HISTORY_DIR is unset
+HISTORY_DIR = os.environ.get("HISTORY_DIR")
+HISTORY_RETENTION_DAYS = int(os.environ.get("HISTORY_RETENTION_DAYS", "30"))
+
+history_store = HistoryStore(HISTORY_DIR, HISTORY_RETENTION_DAYS) if HISTORY_DIR else None
+if history_store is not None:
+    atexit.register(history_store.flush)
+
+# /metrics text is kept up to date by the store as results arrive (scrapes never probe)
+metrics_exporter = MetricsExporter()
+metric_store = MetricStore(history_size=POLL_HISTORY_SIZE, exporter=metrics_exporter, history=history_store)
+
+# Last interface table per device, for /snmp/data delta mode ("since" version tokens).
+# SQLite file shared by all workers on the host, so a token is understood by whichever
+# worker takes the next request; SNAPSHOT_DB=memory keeps it per process (single worker)
+SNAPSHOT_DB = os.environ.get("SNAPSHOT_DB", os.path.join(tempfile.gettempdir(), "network_api_snapshots.sqlite"))
+
+snapshot_store = SnapshotStore(path=None if SNAPSHOT_DB in ("", "memory") else SNAPSHOT_DB)
+poller = None
+
+# Self-instrumentation (GET /stats/timings, the collector object). SERVER_TIMING: "request" = Server-Timing
+# header for requests sending "X-Server-Timing: 1" (or ?timing=1), "always", "off"
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "request").lower()
+
+# --- INSTRUMENTATION UTILS ---
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider timing response serialization ("http.serialize")"""
+
+    def dumps(self, obj, **kwargs):
+        with instrumentation.timer("http.serialize"):
+            return super().dumps(obj, **kwargs)
+
+class WsgiTimer:
+    """
+    Times the whole WSGI call ("http.wsgi") and the part outside the view and its
+    hooks ("http.framework": request setup, routing, response finalization)
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if not instrumentation.enabled:
+            return self.wsgi_app(environ, start_response)
+        start = time.perf_counter()
+        result = self.wsgi_app(environ, start_response)
+        elapsed = time.perf_counter() - start
+        instrumentation.observe("http.wsgi", elapsed)
+        handler = environ.get("netdiag.handler_s")
+        if handler is not None:
+            instrumentation.observe("http.framework", max(0.0, elapsed - handler))
+        return result
+
+app.json = TimedJSONProvider(app)
+app.wsgi_app = WsgiTimer(app.wsgi_app)
+
+@app.before_request
+def start_request_timing():
+    if instrumentation.enabled:
+        g.timing_start = time.perf_counter()
+        instrumentation.begin_request(
+            SERVER_TIMING == "always" or (SERVER_TIMING == "request" and (
+                request.headers.get("X-Server-Timing") == "1" or request.args.get("timing") == "1"))
+        )
+
+@app.after_request
+def finish_request_timing(response):
+    start = g.pop("timing_start", None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    spans = instrumentation.end_request()
+    instrumentation.observe(f"http.{request.endpoint or 'unmatched'}", elapsed)
+    request.environ["netdiag.handler_s"] = elapsed
+    # Streamed bodies are produced after this point: their phases would be missing
+    if spans is not None and not response.is_streamed:
+        spans["total"] = elapsed * 1000.0
+        response.headers["Server-Timing"] = server_timing(spans)
+    return response
+
+# --- TARGET UTILS ---
+
+def parse_address(value):
+    """Normalized IP address string of a request's target, ValueError if it is not one"""
+    return str(ipaddress.ip_address(str(value).strip()))
+
+# --- BATCH UTILS ---
+
+def expand_targets(targets, limit=BATCH_MAX_TARGETS):
+    """Expand a list of IPs / CIDR ranges into unique host addresses (keeps input order)"""
+    if isinstance(targets, str):
+        targets = [targets]
+
+    hosts = []
+    seen = set()
+    for entry in targets:
+        entry = str(entry).strip()
+        if not entry:
+            continue
+        if "/" in entry:
+            network = ipaddress.ip_network(entry, strict=False)
+            # hosts() skips network/broadcast; for /32 (and /31) fall back to all addresses
+            candidates = network.hosts() if network.num_addresses > 2 else iter(network)
+        else:
+            candidates = [ipaddress.ip_address(entry)]
+
+        for addr in candidates:
+            ip = str(addr)
+            if ip in seen:
+                continue
+            if len(hosts) >= limit:
+                raise ValueError(f"Too many targets (max {limit} hosts per batch)")
+            seen.add(ip)
+            hosts.append(ip)
+    return hosts
+
+def probe_icmp_batch(hosts, concurrency=BATCH_DEFAULT_CONCURRENCY, profile=None):
+    """Ping many hosts with bounded concurrency, yielding (ip, result) as each one finishes"""
+    profile = profile or icmp_engine.PROBE_PROFILES[PING_PROFILE]
+    if hosts and all(use_native_icmp(ip) for ip in hosts):
+        # One socket multiplexes the whole sweep; concurrency bounds the in-flight window
+        with icmp_engine.IcmpProber() as prober:
+            yield from prober.probe(hosts, window=concurrency, **profile._asdict())
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(hosts) or 1)))
+    try:
+        futures = {executor.submit(NetworkCollector(ip).ping_diagnostic, profile): ip for ip in hosts}
+        for future in as_completed(futures):
+            ip = futures[future]
             try:
-                raw_descr = self.snmp_walk('1.3.6.1.2.1.2.2.1.2') or ""
-                raw_admin = self.snmp_walk('1.3.6.1.2.1.2.2.1.7') or ""
-                raw_oper  = self.snmp_walk('1.3.6.1.2.1.2.2.1.8') or ""
-                
-                def parse_walk_to_dict(raw_text):
-                    data = {}
-                    for line in raw_text.splitlines():
-                        if not line: continue
-                        parts = line.split(" = ")
-                        if len(parts) >= 2:
-                            oid_part = parts[0]
-                            val_part = parts[1].strip()
-                            idx = oid_part.split(".")[-1]
-                            data[idx] = val_part
-                    return data
-
-                d_descr = parse_walk_to_dict(raw_descr)
-                d_admin = parse_walk_to_dict(raw_admin)
-                d_oper  = parse_walk_to_dict(raw_oper)
-                
-                for idx, name in d_descr.items():
-                    a_stat = d_admin.get(idx, "0")
-                    o_stat = d_oper.get(idx, "0")
-                    status_map = {'1': 'UP', '2': 'DOWN', '3': 'TESTING'}
-                    
-                    interfaces_data.append({
-                        "id": idx,
-                        "name": name.strip('"'),
-                        "admin_status": status_map.get(a_stat, f"Unknown({a_stat})"),
-                        "oper_status": status_map.get(o_stat, f"Unknown({o_stat})")
-                    })
-            except Exception:
-                pass
-
-        return {
-            "snmp_status": snmp_status,
-            "device_info": sys_descr or "N/A",
-            "uptime_raw": sys_uptime or "N/A",
-            "interfaces_count": len(interfaces_data),
-            "interfaces_detail": interfaces_data
-        }
+                yield ip, future.result()
+            except Exception as e:
+                yield ip, {"status": "UNKNOWN", "error": f"Ping error: {e}"}
+    finally:
+        # Client went away mid-stream: drop whatever has not started yet
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# --- POLLER UTILS ---
+
+def start_poller():
+    """Start the background poller if POLL_INVENTORY is configured (once per process)"""
+    global poller
+    if poller is None and POLL_INVENTORY:
+        devices = load_inventory(POLL_INVENTORY, POLL_INTERVAL)
+        for device in devices:
+            metrics_exporter.set_device(device)
+        if POLL_PROCESSES > 1:
+            poller = ShardedPoller(devices, metric_store, processes=POLL_PROCESSES, concurrency=POLL_CONCURRENCY)
+        else:
+            poller = BackgroundPoller(
+                devices, metric_store,
+                lambda d: NetworkCollector(d["ip"], d["community"], d["snmp_port"]),
+                workers=POLL_WORKERS
+            )
+        poller.start()
+    return poller
+
+def polled_sample(target_ip, kind, community=None, profile=None):
+    """Latest poller result for an inventory device, None if not polled / stale / other community / other ping profile"""
+    if poller is None:
+        return None
+    device = poller.devices.get(target_ip)
+    if device is None or (community is not None and community != device["community"]):
+        return None
+    if profile is not None and profile != icmp_engine.PROBE_PROFILES[device["ping"]]:
+        return None
+    entry = metric_store.latest(target_ip, kind, max_age=2 * device["interval"])
+    return entry[1] if entry else None
+
+def suppressed_sample(target_ip, kind):
+    """Unreachable result for an inventory device whose parent the poller found down, else None"""
+    if poller is None:
+        return None
+    down_parent = poller.topology.down_parent(target_ip)
+    if down_parent is None:
+        return None
+    icmp, snmp = suppressed_results(down_parent)
+    return icmp if kind == "icmp" else snmp
+
+def record_history(target_ip, kind, result):
+    """Append an on-demand probe result to the on-disk history (inventory devices are recorded by the poller)"""
+    if history_store is not None and (poller is None or target_ip not in poller.devices):
+        try:
+            address = parse_address(target_ip)
+        except ValueError:
+            return result # a device directory per arbitrary string would grow without bound
+        values = icmp_values(result) if kind == "icmp" else snmp_values(result)
+        history_store.append(address, kind, time.time(), values)
+    return result
+
+# --- CACHE UTILS ---
+
+def cached_ping(target_ip, refresh=False, profile=None):
+    """ping_diagnostic() through the poller sample / probe cache, returns (result, cache_status)"""
+    profile = profile or icmp_engine.PROBE_PROFILES[PING_PROFILE]
+    # A poller sample answers the device's own ping profile, and any plain liveness check
+    if not refresh:
+        sample = polled_sample(target_ip, "icmp", profile=None if profile.first_reply else profile)
+        if sample is not None:
+            return sample, "POLLER"
+        sample = suppressed_sample(target_ip, "icmp")
+        if sample is not None:
+            return sample, "SUPPRESSED"
+    return probe_cache.get_or_compute(
+        ("icmp", target_ip, profile),
+        lambda: record_history(target_ip, "icmp", NetworkCollector(target_ip).ping_diagnostic(profile)),
+        refresh=refresh
+    )
+
+def qos_profile(data):
+    """Probe profile requested by a /icmp/qos body: "profile" plus optional "count"/"interval" """
+    name = str(data.get('profile') or "qos").lower()
+    if name not in QOS_PROFILES:
+        raise ValueError(f"Unknown profile '{name}' (expected one of {', '.join(QOS_PROFILES)})")
+    overrides = {}
+    try:
+        if data.get('count') is not None:
+            overrides['count'] = max(1, min(int(data['count']), QOS_MAX_COUNT))
+        if data.get('interval') is not None:
+            overrides['interval'] = max(QOS_MIN_INTERVAL, float(data['interval']))
+    except (TypeError, ValueError):
+        raise ValueError("count must be an integer and interval a number of seconds")
+    # Per-packet RTTs are part of every /icmp/qos answer
+    return icmp_engine.profile_for(name, keep_rtts=True, **overrides)
+
+def cached_snmp(target_ip, community, refresh=False):
+    """collect_snmp_data() through the poller sample / probe cache, returns (result, cache_status)"""
+    sample = None if refresh else polled_sample(target_ip, "snmp", community)
+    if sample is not None:
+        return sample, "POLLER"
+    # Behind a down parent every walk would just time out ("fresh" still tries)
+    sample = None if refresh else suppressed_sample(target_ip, "snmp")
+    if sample is not None:
+        return sample, "SUPPRESSED"
+    return probe_cache.get_or_compute(
+        ("snmp", target_ip, community),
+        lambda: record_history(target_ip, "snmp", NetworkCollector(target_ip, community).collect_snmp_data()),
+        refresh=refresh
+    )
+
+# --- STREAMING UTILS ---
+
+STREAM_MIMETYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def stream_format(data):
+    """"ndjson" / "sse" when the client asked for a streamed response, else None"""
+    fmt = data.get('stream')
+    if fmt is True:
+        fmt = "ndjson"
+    if fmt in STREAM_MIMETYPES:
+        return fmt
+    accept = request.headers.get('Accept', '')
+    if 'text/event-stream' in accept:
+        return "sse"
+    if 'application/x-ndjson' in accept:
+        return "ndjson"
+    return None
+
+def encode_event(fmt, event, payload):
+    with instrumentation.timer("http.serialize"):
+        if fmt == "sse":
+            return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps({"type": event, "data": payload}) + "\n"
+
+def stream_diagnostic(target_ip, community, fmt, include_icmp=True):
+    """
+    Generator of encoded events: "system", one "interface" per row as it is walked,
+    "icmp" as soon as the ping (run in parallel) finishes, then "end"
+    """
+    started = time.monotonic()
+    ping_pool = ThreadPoolExecutor(max_workers=1) if include_icmp else None
+    ping_future = ping_pool.submit(NetworkCollector(target_ip).ping_diagnostic) if include_icmp else None
+    count = 0
+    try:
+        for kind, payload in NetworkCollector(target_ip, community).iter_snmp_data():
+            if kind == "system":
+                yield encode_event(fmt, "system", dict(payload, ip=target_ip))
+            else:
+                count += 1
+                yield encode_event(fmt, "interface", payload)
+            if ping_future is not None and ping_future.done():
+                yield encode_event(fmt, "icmp", dict(ping_future.result(), ip=target_ip))
+                ping_future = None
+
+        if ping_future is not None:
+            yield encode_event(fmt, "icmp", dict(ping_future.result(), ip=target_ip))
+        yield encode_event(fmt, "end", {
+            "ip": target_ip,
+            "interfaces_count": count,
+            "elapsed_s": round(time.monotonic() - started, 3)
+        })
+    finally:
+        if ping_pool is not None:
+            ping_pool.shutdown(wait=False)
 
 # --- BASIC AUTH UTILS ---
 
@@ -198,15 +383,21 @@ def get_icmp_status():
     target_ip = data.get('ip')
     if not target_ip:
         return jsonify({"error": "IP address required"}), 400
+    try:
+        target_ip = parse_address(target_ip)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    collector = NetworkCollector(target_ip)
-    # We use ping_diagnostic but only return status for this endpoint
-    result = collector.ping_diagnostic()
+    # Liveness only: the "fast" profile returns on the first echo reply
+    result, cache_status = cached_ping(target_ip, refresh=bool(data.get('fresh')),
+                                       profile=icmp_engine.PROBE_PROFILES["fast"])
     
-    return jsonify({
+    response = jsonify({
         "ip": target_ip,
         "status": result.get("status", "UNKNOWN")
     })
+    response.headers['X-Cache'] = cache_status
+    return response
 
 @app.route('/icmp/qos', methods=['POST'])
 @requires_auth
@@ -215,9 +406,17 @@ def get_icmp_qos():
     target_ip = data.get('ip')
     if not target_ip:
         return jsonify({"error": "IP address required"}), 400
+    try:
+        target_ip = parse_address(target_ip)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    collector = NetworkCollector(target_ip)
-    result = collector.ping_diagnostic()
+    try:
+        profile = qos_profile(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    result, cache_status = cached_ping(target_ip, refresh=bool(data.get('fresh')), profile=profile)
     
     # Enrich with requested QoS fields
     response = {
@@ -226,10 +425,22 @@ def get_icmp_qos():
         "latency_avg_ms": result.get("latency_avg_ms"),
         "latency_min_ms": result.get("latency_min_ms"),
         "latency_max_ms": result.get("latency_max_ms"),
+        "latency_p50_ms": result.get("latency_p50_ms"),
+        "latency_p95_ms": result.get("latency_p95_ms"),
+        "latency_p99_ms": result.get("latency_p99_ms"),
         "jitter_ms": result.get("jitter_ms"),
+        "jitter_rfc3550_ms": result.get("jitter_rfc3550_ms"),
+        "ipdv_avg_ms": result.get("ipdv_avg_ms"),
+        "packets_sent": result.get("packets_sent"),
+        "packets_received": result.get("packets_received"),
+        "loss_bursts": result.get("loss_bursts"),
+        "loss_burst_max": result.get("loss_burst_max"),
+        "rtt_ms": result.get("rtt_ms"),
         "status": result.get("status")
     }
-    return jsonify(response)
+    response = jsonify(response)
+    response.headers['X-Cache'] = cache_status
+    return response
 
 @app.route('/snmp/data', methods=['POST'])
 @requires_auth
@@ -240,13 +451,206 @@ def get_snmp_data():
     
     if not target_ip:
         return jsonify({"error": "IP address required"}), 400
+    try:
+        target_ip = parse_address(target_ip)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    fmt = stream_format(data)
+    if fmt is not None:
+        # Live walk, rows are sent while the table is still being read
+        events = stream_diagnostic(target_ip, community, fmt, include_icmp=data.get('icmp', True))
+        return Response(events, mimetype=STREAM_MIMETYPES[fmt], headers={'Cache-Control': 'no-cache'})
+
+    delta_mode = bool(data.get('delta')) or 'since' in data
+    delta_fields = data.get('delta_fields', 'all')
+    if delta_fields not in DELTA_FIELDS:
+        return jsonify({"error": f"delta_fields must be one of: {', '.join(DELTA_FIELDS)}"}), 400
 
-    collector = NetworkCollector(target_ip, community)
-    result = collector.collect_snmp_data()
+    result, cache_status = cached_snmp(target_ip, community, refresh=bool(data.get('fresh')))
     
-    result['ip'] = target_ip
-    return jsonify(result)
+    result = dict(result, ip=target_ip) # never mutate the cached dict
+    if result.get('snmp_status') == 'UP':
+        key = NetworkCollector(target_ip, community).device_key()
+        interfaces = result.get('interfaces_detail') or []
+        if delta_mode:
+            # Only the interfaces that changed since the client's token
+            delta = snapshot_store.delta(key, interfaces, since=data.get('since'), fields=delta_fields)
+            result.pop('interfaces_detail', None)
+            result.update(
+                delta=True, version=delta["version"], since=data.get('since'), full=delta["full"],
+                reason=delta["reason"], # why a full snapshot was sent (None for a delta)
+                interfaces_count=len(interfaces), unchanged_count=delta["unchanged_count"],
+                interfaces_changed=delta["changed"], interfaces_removed=delta["removed"]
+            )
+        else:
+            result['version'] = snapshot_store.observe(key, interfaces)
+    response = jsonify(result)
+    response.headers['X-Cache'] = cache_status
+    return response
+
+@app.route('/cache/stats', methods=['GET'])
+@requires_auth
+def get_cache_stats():
+    return jsonify(dict(probe_cache.stats(), snapshots=snapshot_store.stats()))
+
+@app.route('/snmp/sessions', methods=['GET'])
+@requires_auth
+def get_snmp_sessions():
+    """SNMP session pool counters; ?ip= adds what was learned about that device"""
+    stats = snmp_pool.stats()
+    stats["counter_rates"] = counter_tracker.stats()
+    ip = request.args.get('ip')
+    if ip:
+        stats["device"] = snmp_pool.device(ip)
+    return jsonify(stats)
+
+@app.route('/icmp/batch', methods=['POST'])
+@requires_auth
+def get_icmp_batch():
+    """Probe a list of IPs / CIDR ranges, streaming one NDJSON line per host as it completes"""
+    data = request.get_json() or {}
+    targets = data.get('targets') or data.get('ips')
+    if not targets:
+        return jsonify({"error": "targets (list of IPs or CIDR ranges) required"}), 400
+
+    try:
+        hosts = expand_targets(targets)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        concurrency = int(data.get('concurrency', BATCH_DEFAULT_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({"error": "concurrency must be an integer"}), 400
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+    status_only = data.get('mode', 'qos') == 'status'
+    # A status sweep only needs one reply per host
+    profile = icmp_engine.PROBE_PROFILES["fast" if status_only else PING_PROFILE]
+
+    def generate():
+        started = time.monotonic()
+        up = 0
+        for ip, result in probe_icmp_batch(hosts, concurrency, profile):
+            if result.get("status") == "UP":
+                up += 1
+            row = {"ip": ip, "status": result.get("status", "UNKNOWN")} if status_only else dict(result, ip=ip)
+            yield json.dumps(row) + "\n"
+
+        yield json.dumps({
+            "summary": {
+                "targets": len(hosts),
+                "up": up,
+                "down": len(hosts) - up,
+                "elapsed_s": round(time.monotonic() - started, 3)
+            }
+        }) + "\n"
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/timeseries/query', methods=['POST'])
+@requires_auth
+def query_timeseries():
+    """Range query over the poller history: {"ip", "metric", "start", "end"} (epoch seconds)"""
+    data = request.get_json() or {}
+    target_ip = data.get('ip')
+    metric = data.get('metric')
+    if not target_ip or not metric:
+        return jsonify({"error": "ip and metric required"}), 400
+
+    try:
+        start = float(data.get('start', 0))
+        end = float(data['end']) if data.get('end') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "start/end must be epoch seconds"}), 400
+
+    points = metric_store.query(target_ip, metric, start, end)
+    if points is None:
+        return jsonify({"error": f"No series '{metric}' for {target_ip}",
+                        "available": metric_store.metrics(target_ip)}), 404
+    # float32 storage: round away the representation noise
+    return jsonify({"ip": target_ip, "metric": metric, "points": [[ts, round(v, 3)] for ts, v in points]})
+
+@app.route('/timeseries/metrics', methods=['GET'])
+@requires_auth
+def list_timeseries():
+    target_ip = request.args.get('ip')
+    if not target_ip:
+        return jsonify({"error": "ip query parameter required"}), 400
+    return jsonify({"ip": target_ip, "metrics": metric_store.metrics(target_ip)})
+
+@app.route('/history', methods=['GET'])
+@requires_auth
+def query_history():
+    """
+    On-disk history: ?ip=&metric=&start=&end= (epoch seconds, default the last 24 h),
+    &step= averages into buckets of that many seconds. Without metric: what is stored for ip.
+    """
+    if history_store is None:
+        return jsonify({"error": "History is disabled (set HISTORY_DIR)"}), 404
+    target_ip = request.args.get('ip')
+    if not target_ip:
+        return jsonify({"error": "ip query parameter required"}), 400
+    try:
+        target_ip = parse_address(target_ip)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    metric = request.args.get('metric')
+    if not metric:
+        return jsonify({"ip": target_ip, "metrics": history_store.metrics(target_ip), "store": history_store.stats()})
+    if metric_kind(metric) is None:
+        return jsonify({"error": f"Unknown metric '{metric}'", "available": history_store.metrics(target_ip)}), 400
+
+    try:
+        end = float(request.args['end']) if request.args.get('end') else time.time()
+        start = float(request.args['start']) if request.args.get('start') else end - 86400
+        step = int(request.args['step']) if request.args.get('step') else None
+    except ValueError:
+        return jsonify({"error": "start/end must be epoch seconds and step an integer"}), 400
+    if step is not None and step <= 0:
+        return jsonify({"error": "step must be positive"}), 400
+
+    points = history_store.query(target_ip, metric, start, end, step)
+    # float32 storage: round away the representation noise
+    return jsonify({"ip": target_ip, "metric": metric, "start": start, "end": end, "step": step,
+                    "points": [[ts, round(v, 3)] for ts, v in points]})
+
+@app.route('/poller/status', methods=['GET'])
+@requires_auth
+def get_poller_status():
+    if poller is None:
+        return jsonify({"enabled": False})
+    return jsonify(dict(poller.status(), enabled=True))
+
+@app.route('/stats/timings', methods=['GET'])
+@requires_auth
+def get_timing_stats():
+    """Phase histograms (count/avg/max/p50/p90/p99 ms); ?prefix=icmp. filters, ?reset=1 starts over"""
+    stats = instrumentation.snapshot(request.args.get('prefix'))
+    if request.args.get('reset') == "1":
+        instrumentation.reset()
+    return jsonify(stats)
+
+@app.route('/metrics', methods=['GET'])
+@requires_auth
+def get_metrics():
+    """Latest poller results of every inventory device in Prometheus / OpenMetrics text format"""
+    openmetrics = "application/openmetrics-text" in request.headers.get("Accept", "")
+    compress = "gzip" in request.headers.get("Accept-Encoding", "")
+    response = Response(metrics_exporter.render(openmetrics, compress),
+                        content_type=OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE)
+    if compress:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept, Accept-Encoding"
+    return response
 
 if __name__ == '__main__':
+    debug = os.environ.get("FLASK_DEBUG", "1") == "1"
+    # With the reloader the module runs twice; only poll from the serving child
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_poller()
+
+    # Development server only. In production run: gunicorn -c gunicorn.conf.py network_api:app
     # Running on 0.0.0.0 to be accessible from outside if needed (e.g. Docker container)
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=int(os.environ.get("PORT", "5000")),
+            debug=debug, threaded=True)
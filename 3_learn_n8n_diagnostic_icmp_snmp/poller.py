@@ -0,0 +1,278 @@
+import heapq
+import itertools
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+import icmp_engine
+from topology import Topology, suppressed_results
+
+# Continuous background polling + in-memory time series.
+# Every inventory device is probed on its own fixed interval; each result is
+# stored as the "latest sample" (so the API can answer instantly) and appended
+# to compact array-backed ring buffers for range queries.
+
+ICMP_METRICS = (
+    "icmp_up", "packet_loss_pct", "latency_avg_ms", "latency_min_ms", "latency_max_ms", "jitter_ms",
+    "latency_p50_ms", "latency_p95_ms", "latency_p99_ms", "jitter_rfc3550_ms", "loss_burst_max",
+)
+SNMP_METRICS = ("snmp_up", "interfaces_count", "interfaces_oper_down")
+INTERFACE_METRICS = ("admin_status", "oper_status")
+
+# ifAdminStatus / ifOperStatus codes, as stored in the interface series
+STATUS_CODES = {"UP": 1, "DOWN": 2, "TESTING": 3}
+
+DEFAULT_HISTORY_SIZE = 1440      # one day of 1-minute samples
+INTERFACE_HISTORY_SIZE = 64      # interface series only record status changes
+
+class RingSeries:
+    """Fixed-capacity ring buffer: one uint32 timestamp column plus one typed column per metric"""
+    __slots__ = ("columns", "capacity", "ts", "values", "head")
+
+    def __init__(self, columns, capacity, typecode="f"):
+        self.columns = columns
+        self.capacity = capacity
+        # Arrays grow until capacity and are overwritten in place afterwards,
+        # so memory follows the number of samples actually taken
+        self.ts = array("I")
+        self.values = [array(typecode) for _ in columns]
+        self.head = 0 # next slot to overwrite once full
+
+    def __len__(self):
+        return len(self.ts)
+
+    def append(self, ts, values):
+        if len(self.ts) < self.capacity:
+            self.ts.append(int(ts))
+            for column, value in zip(self.values, values):
+                column.append(value)
+            return
+        self.ts[self.head] = int(ts)
+        for column, value in zip(self.values, values):
+            column[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+
+    def _ordered_slots(self):
+        size = len(self.ts)
+        start = self.head if size == self.capacity else 0
+        return (i % size for i in range(start, start + size))
+
+    def latest(self):
+        """(ts, [values]) of the newest sample, None if empty"""
+        if not self.ts:
+            return None
+        slot = (self.head - 1) % len(self.ts) if len(self.ts) == self.capacity else len(self.ts) - 1
+        return self.ts[slot], [column[slot] for column in self.values]
+
+    def query(self, column, start=0, end=None):
+        """[(ts, value)] of one metric with start <= ts <= end, oldest first"""
+        values = self.values[self.columns.index(column)]
+        end = float("inf") if end is None else end
+        return [(self.ts[i], values[i]) for i in self._ordered_slots() if start <= self.ts[i] <= end]
+
+def icmp_values(result):
+    """ICMP_METRICS values of a ping_diagnostic() result"""
+    values = [1.0 if result.get("status") == "UP" else 0.0]
+    values += [float(result.get(m) or 0.0) for m in ICMP_METRICS[1:]]
+    return values
+
+def snmp_values(result):
+    """SNMP_METRICS values of a collect_snmp_data() result"""
+    interfaces = result.get("interfaces_detail") or []
+    return [
+        1.0 if result.get("snmp_status") == "UP" else 0.0,
+        float(len(interfaces)),
+        float(sum(1 for i in interfaces if i.get("oper_status") == "DOWN")),
+    ]
+
+class MetricStore:
+    """Latest results and ring-buffer history per device"""
+
+    def __init__(self, history_size=DEFAULT_HISTORY_SIZE, exporter=None, history=None):
+        self.history_size = history_size
+        self.exporter = exporter # MetricsExporter kept in step with the latest results (optional)
+        self.history = history   # HistoryStore every sample is also appended to (optional)
+        self._latest = {}     # (ip, kind) -> (ts, result)
+        self._series = {}     # (ip, kind) -> RingSeries
+        self._interfaces = {} # (ip, if id) -> RingSeries (change-only)
+        self._lock = threading.Lock()
+
+    def _ring(self, key, columns):
+        ring = self._series.get(key)
+        if ring is None:
+            ring = self._series[key] = RingSeries(columns, self.history_size)
+        return ring
+
+    def record_icmp(self, ip, result, ts=None):
+        ts = time.time() if ts is None else ts
+        values = icmp_values(result)
+        with self._lock:
+            self._latest[(ip, "icmp")] = (ts, result)
+            self._ring((ip, "icmp"), ICMP_METRICS).append(ts, values)
+        if self.exporter is not None:
+            self.exporter.update_icmp(ip, result, ts)
+        if self.history is not None:
+            self.history.append(ip, "icmp", ts, values)
+
+    def record_snmp(self, ip, result, ts=None):
+        ts = time.time() if ts is None else ts
+        interfaces = result.get("interfaces_detail") or []
+        values = snmp_values(result)
+        with self._lock:
+            self._latest[(ip, "snmp")] = (ts, result)
+            self._ring((ip, "snmp"), SNMP_METRICS).append(ts, values)
+            for iface in interfaces:
+                codes = [STATUS_CODES.get(iface.get("admin_status"), 0), STATUS_CODES.get(iface.get("oper_status"), 0)]
+                key = (ip, str(iface.get("id")))
+                ring = self._interfaces.get(key)
+                if ring is None:
+                    ring = self._interfaces[key] = RingSeries(INTERFACE_METRICS, INTERFACE_HISTORY_SIZE, "b")
+                last = ring.latest()
+                if last is None or last[1] != codes:
+                    ring.append(ts, codes)
+        if self.exporter is not None:
+            self.exporter.update_snmp(ip, result, ts)
+        if self.history is not None:
+            self.history.append(ip, "snmp", ts, values)
+
+    def latest(self, ip, kind, max_age=None):
+        """Newest (ts, result) of "icmp" or "snmp" for a device, None if missing or older than max_age"""
+        with self._lock:
+            entry = self._latest.get((ip, kind))
+        if entry is None or (max_age is not None and time.time() - entry[0] > max_age):
+            return None
+        return entry
+
+    def query(self, ip, metric, start=0, end=None):
+        """
+        Range query. `metric` is one of ICMP_METRICS / SNMP_METRICS, or
+        "if.<id>.admin_status" / "if.<id>.oper_status" (status changes only).
+        Returns None for unknown series.
+        """
+        with self._lock:
+            if metric.startswith("if."):
+                if_id, _, column = metric[3:].rpartition(".") # if ids may be dotted (multi-index)
+                ring = self._interfaces.get((ip, if_id))
+            elif metric in ICMP_METRICS:
+                column, ring = metric, self._series.get((ip, "icmp"))
+            elif metric in SNMP_METRICS:
+                column, ring = metric, self._series.get((ip, "snmp"))
+            else:
+                return None
+            if ring is None or column not in ring.columns:
+                return None
+            return ring.query(column, start, end)
+
+    def metrics(self, ip):
+        """Names of every series held for a device"""
+        with self._lock:
+            names = []
+            if (ip, "icmp") in self._series:
+                names.extend(ICMP_METRICS)
+            if (ip, "snmp") in self._series:
+                names.extend(SNMP_METRICS)
+            for dev, if_id in self._interfaces:
+                if dev == ip:
+                    names.extend(f"if.{if_id}.{m}" for m in INTERFACE_METRICS)
+            return names
+
+class BackgroundPoller:
+    """Polls every device on its own fixed interval and feeds a MetricStore"""
+
+    def __init__(self, devices, store, collector_factory, workers=16):
+        self.devices = {d["ip"]: d for d in devices}
+        self.store = store
+        self.collector_factory = collector_factory # device dict -> NetworkCollector
+        self.workers = workers
+        self.topology = Topology(devices)
+        self.polls = 0
+        self.skipped = 0 # ticks dropped because the previous poll was still running
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    def interval_of(self, ip):
+        device = self.devices.get(ip)
+        return device["interval"] if device else None
+
+    def poll_device(self, device):
+        """One ICMP (+ SNMP) poll of a device, results go to the store"""
+        try:
+            down_parent = self.topology.down_parent(device["ip"])
+            if down_parent is not None:
+                # Behind a down parent: record it as unreachable without probing
+                icmp, snmp = suppressed_results(down_parent, device["snmp"])
+                self.topology.report(device["ip"], icmp)
+                self.store.record_icmp(device["ip"], icmp)
+                if snmp is not None:
+                    self.store.record_snmp(device["ip"], snmp)
+                return
+            collector = self.collector_factory(device)
+            profile = icmp_engine.PROBE_PROFILES.get(device.get("ping"))
+            icmp = collector.ping_diagnostic(profile)
+            self.topology.report(device["ip"], icmp)
+            self.store.record_icmp(device["ip"], icmp)
+            if device["snmp"]:
+                self.store.record_snmp(device["ip"], collector.collect_snmp_data())
+        finally:
+            with self._lock:
+                self._running.discard(device["ip"])
+                self.polls += 1
+
+    def _run(self):
+        order = itertools.count()
+        now = time.monotonic()
+        # Spread the first round over one interval so startup is not a thundering herd
+        count = max(1, len(self.devices))
+        heap = [(now + d["interval"] * i / count, next(order), d) for i, d in enumerate(self.devices.values())]
+        heapq.heapify(heap)
+
+        while heap and not self._stop.is_set():
+            due, _, device = heap[0]
+            wait = due - time.monotonic()
+            if wait > 0:
+                self._stop.wait(min(wait, 1.0))
+                continue
+            heapq.heappop(heap)
+
+            with self._lock:
+                busy = device["ip"] in self._running
+                if not busy:
+                    self._running.add(device["ip"])
+            if busy:
+                self.skipped += 1
+            else:
+                self._executor.submit(self.poll_device, device)
+
+            # Fixed-rate schedule; if we fell behind, skip the missed ticks
+            next_due = due + device["interval"]
+            if next_due < time.monotonic():
+                next_due = time.monotonic() + device["interval"]
+            heapq.heappush(heap, (next_due, next(order), device))
+
+    def start(self):
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="poller")
+            self._thread = threading.Thread(target=self._run, name="poller-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._thread = None
+
+    def status(self):
+        with self._lock:
+            return {
+                "devices": len(self.devices),
+                "polls": self.polls,
+                "in_progress": len(self._running),
+                "skipped_ticks": self.skipped,
+                "topology": self.topology.stats()
+            }
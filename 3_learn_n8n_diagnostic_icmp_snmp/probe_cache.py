@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Per-target result cache for the network API.
+# - TTL: results younger than `ttl` seconds are served without probing again
+# - LRU: at most `max_entries` results are kept, least recently used go first
+# - single-flight: concurrent misses for the same key wait for one in-flight
+#   probe instead of each forking their own ping/snmpwalk
+
+class _Flight:
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+class ProbeCache:
+    """Thread-safe TTL + LRU cache with single-flight de-duplication"""
+
+    def __init__(self, ttl=10.0, max_entries=4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # key -> (expires_at, value)
+        self._inflight = {}           # key -> _Flight
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0   # misses that joined another request's in-flight probe
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute, refresh=False):
+        """
+        Return (value, cache_status) where cache_status is "HIT", "MISS" or "SHARED".
+        `compute` runs at most once per key at a time; `refresh` skips the stored value.
+        """
+        with self._lock:
+            if not refresh:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    if entry[0] > time.monotonic():
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return entry[1], "HIT"
+                    del self._entries[key]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, "SHARED"
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            self._store(key, flight.value)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+        return flight.value, "MISS"
+
+    def _store(self, key, value):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.shared
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_inflight": self.shared,
+                "evictions": self.evictions,
+                "in_flight": len(self._inflight),
+                "hit_ratio": round((self.hits + self.shared) / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,257 @@
+import asyncio
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zlib
+
+import icmp_engine
+from async_collector import AsyncIcmpProber, AsyncNetworkCollector
+from topology import Topology, root_of, suppressed_results
+
+# Inventory polling sharded across processes.
+# Every device is assigned to one worker process (crc32(ip) % processes, so a
+# device stays on the same worker and its counter history with it; devices with
+# a parent go with the root of their subtree, so every worker sees the state of
+# the parents of its own devices, see topology.py). Each worker
+# runs one asyncio loop with its own ICMP socket and AsyncNetworkCollector
+# coroutines, and sends results back in batches over a single queue; the parent
+# merges them into the MetricStore from one thread.
+
+DEFAULT_PROCESSES = os.cpu_count() or 1
+DEFAULT_CONCURRENCY = 256       # devices in flight per worker process
+DEFAULT_DEVICE_TIMEOUT = 10.0
+BATCH_SIZE = 256                # results per queue message
+BATCH_DELAY = 0.2               # max seconds a result waits for its batch
+
+def shard_devices(devices, processes):
+    """Split devices into `processes` lists, stable per IP (per topology root)"""
+    shards = [[] for _ in range(processes)]
+    roots = root_of(devices)
+    for device in devices:
+        shards[zlib.crc32(roots[device["ip"]].encode()) % processes].append(device)
+    return shards
+
+# --- WORKER PROCESS ---
+
+def _shard_main(shard_id, devices, results, stop, rounds, concurrency, device_timeout):
+    asyncio.run(_run_shard(shard_id, devices, results, stop, rounds, concurrency, device_timeout))
+
+async def _run_shard(shard_id, devices, results, stop, rounds, concurrency, device_timeout):
+    try:
+        prober = AsyncIcmpProber()
+    except OSError:
+        prober = None # subprocess fallback inside ping_diagnostic()
+    semaphore = asyncio.Semaphore(concurrency)
+    topology = Topology(devices)
+    batch = []
+    running = set()
+    stats = {"shard": shard_id, "pid": os.getpid(), "devices": len(devices), "polls": 0, "skipped_ticks": 0,
+             "suppressed": 0}
+
+    def flush():
+        nonlocal batch
+        if batch:
+            results.put(("results", dict(stats, in_progress=len(running)), batch))
+            batch = []
+
+    async def poll(device):
+        down_parent = topology.down_parent(device["ip"])
+        if down_parent is not None:
+            # Behind a down parent: no probe, no semaphore slot
+            icmp, snmp = suppressed_results(down_parent, device["snmp"])
+            topology.report(device["ip"], icmp)
+            running.discard(device["ip"])
+            stats["polls"] += 1
+            stats["suppressed"] += 1
+            batch.append((device["ip"], time.time(), icmp, snmp))
+            if len(batch) >= BATCH_SIZE:
+                flush()
+            return
+
+        async with semaphore:
+            collector = AsyncNetworkCollector(device["ip"], device["community"], prober, device["snmp_port"])
+            jobs = [collector.ping_diagnostic(icmp_engine.PROBE_PROFILES.get(device["ping"]))]
+            if device["snmp"]:
+                jobs.append(collector.collect_snmp_data())
+            try:
+                outcome = await asyncio.wait_for(asyncio.gather(*jobs, return_exceptions=True), device_timeout)
+            except asyncio.TimeoutError:
+                outcome = [TimeoutError(f"Collection timed out after {device_timeout}s")] * len(jobs)
+
+        icmp = outcome[0]
+        if isinstance(icmp, BaseException):
+            icmp = {"status": "UNKNOWN", "error": f"Ping error: {icmp}"}
+        topology.report(device["ip"], icmp)
+        snmp = outcome[1] if len(outcome) > 1 else None
+        if isinstance(snmp, BaseException):
+            snmp = {"snmp_status": "DOWN", "error": f"SNMP error: {snmp}"}
+        running.discard(device["ip"])
+        stats["polls"] += 1
+        batch.append((device["ip"], time.time(), icmp, snmp))
+        if len(batch) >= BATCH_SIZE:
+            flush()
+
+    order = itertools.count()
+    now = time.monotonic()
+    if rounds is None:
+        # Continuous: spread the first round over one interval (no thundering herd)
+        count = max(1, len(devices))
+        heap = [(now + d["interval"] * i / count, next(order), d, None) for i, d in enumerate(devices)]
+    else:
+        heap = [(now, next(order), d, rounds) for d in devices]
+    heapq.heapify(heap)
+
+    tasks = set()
+    last_flush = time.monotonic()
+    try:
+        while heap and not stop.is_set():
+            due, _, device, left = heap[0]
+            wait = due - time.monotonic()
+            if time.monotonic() - last_flush >= BATCH_DELAY:
+                flush()
+                last_flush = time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(min(wait, BATCH_DELAY))
+                continue
+            heapq.heappop(heap)
+
+            if device["ip"] in running:
+                stats["skipped_ticks"] += 1
+            else:
+                running.add(device["ip"])
+                task = asyncio.ensure_future(poll(device))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if left is None or left > 1:
+                # Fixed-rate schedule; if we fell behind, skip the missed ticks
+                next_due = due + device["interval"]
+                if next_due < time.monotonic():
+                    next_due = time.monotonic() + device["interval"]
+                heapq.heappush(heap, (next_due, next(order), device, None if left is None else left - 1))
+
+        while tasks and not stop.is_set():
+            await asyncio.wait(tasks, timeout=BATCH_DELAY)
+            flush()
+    finally:
+        for task in tasks:
+            task.cancel()
+        flush()
+        if prober is not None:
+            prober.close()
+        results.put(("done", dict(stats, in_progress=0), None))
+
+# --- PARENT ---
+
+class ShardedPoller:
+    """Polls an inventory from `processes` worker processes and feeds a MetricStore"""
+
+    def __init__(self, devices, store, processes=DEFAULT_PROCESSES, concurrency=DEFAULT_CONCURRENCY,
+                 device_timeout=DEFAULT_DEVICE_TIMEOUT, rounds=None):
+        self.devices = {d["ip"]: d for d in devices}
+        self.store = store
+        self.processes = max(1, min(processes, len(self.devices) or 1))
+        self.concurrency = concurrency
+        self.device_timeout = device_timeout
+        self.rounds = rounds # None = poll forever on each device's interval
+        self.topology = Topology(devices) # parent-side view of the worker results, for the API
+        self.polls = 0
+        self._shard_stats = {}
+        self._ctx = multiprocessing.get_context("spawn") # no fork of a threaded server process
+        self._results = None
+        self._stop = None
+        self._workers = []
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def interval_of(self, ip):
+        device = self.devices.get(ip)
+        return device["interval"] if device else None
+
+    def _spawn(self):
+        self._results = self._ctx.Queue()
+        self._stop = self._ctx.Event()
+        for shard_id, shard in enumerate(shard_devices(list(self.devices.values()), self.processes)):
+            worker = self._ctx.Process(
+                target=_shard_main, name=f"poller-shard-{shard_id}", daemon=True,
+                args=(shard_id, shard, self._results, self._stop, self.rounds, self.concurrency, self.device_timeout))
+            worker.start()
+            self._workers.append(worker)
+
+    def iter_results(self):
+        """(ip, ts, icmp_result, snmp_result or None) as batches arrive, until every worker is done"""
+        if not self._workers:
+            self._spawn()
+        running = len(self._workers)
+        while running:
+            try:
+                kind, stats, batch = self._results.get(timeout=1.0)
+            except queue.Empty:
+                if not any(w.is_alive() for w in self._workers):
+                    break # a worker died without saying goodbye
+                continue
+            with self._lock:
+                self._shard_stats[stats["shard"]] = stats
+                if batch:
+                    self.polls += len(batch)
+            if kind == "done":
+                running -= 1
+            if batch:
+                yield from batch
+
+    def _merge(self):
+        for ip, ts, icmp, snmp in self.iter_results():
+            self.topology.report(ip, icmp, ts)
+            self.store.record_icmp(ip, icmp, ts)
+            if snmp is not None:
+                self.store.record_snmp(ip, snmp, ts)
+
+    def start(self):
+        if self._thread is None:
+            self._spawn()
+            self._thread = threading.Thread(target=self._merge, name="poller-merge", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        if self._stop is not None:
+            self._stop.set()
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._workers = []
+
+    def status(self):
+        with self._lock:
+            shards = [self._shard_stats.get(i, {"shard": i}) for i in range(len(self._workers))]
+            return {
+                "devices": len(self.devices),
+                "processes": len(self._workers),
+                "polls": self.polls,
+                "in_progress": sum(s.get("in_progress", 0) for s in shards),
+                "skipped_ticks": sum(s.get("skipped_ticks", 0) for s in shards),
+                "topology": self.topology.stats(),
+                "shards": shards
+            }
+
+def collect_once(devices, processes=DEFAULT_PROCESSES, concurrency=DEFAULT_CONCURRENCY,
+                 device_timeout=DEFAULT_DEVICE_TIMEOUT):
+    """One poll of every device across worker processes, [(icmp, snmp)] in input order"""
+    devices = list(devices)
+    poller = ShardedPoller(devices, None, processes, concurrency, device_timeout, rounds=1)
+    by_ip = {}
+    try:
+        for ip, _, icmp, snmp in poller.iter_results():
+            by_ip[ip] = (icmp, snmp)
+    finally:
+        poller.stop()
+    missing = ({"status": "UNKNOWN", "error": "Worker process exited"}, None)
+    return [by_ip.get(d["ip"], missing) for d in devices]
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Change detection for SNMP interface tables ("delta mode").
+# Every observed snapshot of a device is diffed against the previous one: each
+# interface remembers the device version at which its status (name, admin/oper
+# status, speed) and its counters last changed. A client that sends back the
+# version token of its last response only gets what changed since then.
+#
+# With a `path` the state lives in a SQLite file shared by every process on the
+# host (all gunicorn workers see the same versions, and tokens survive restarts);
+# without one it is kept in this process only. Tokens ("<epoch>-<generation>.<version>")
+# carry the store's epoch and the generation of the device's state: a token from
+# another store (or a wiped file), or from before the device was evicted, gives a
+# full snapshot again, with the reason in "reason".
+
+STATUS_FIELDS = ("name", "admin_status", "oper_status", "speed_mbps")
+DELTA_FIELDS = ("all", "status") # what counts as a change: status + counters, or status only
+MAX_REMOVED = 256                # removed interfaces remembered per device
+
+# Why a delta request got a full snapshot
+NO_TOKEN = "no_token"           # no "since" sent
+UNKNOWN_TOKEN = "unknown_token" # malformed, or issued by another store / before it was reset
+EXPIRED_TOKEN = "expired_token" # device state evicted, or removals since then were forgotten
+
+class _Device:
+    __slots__ = ("generation", "version", "interfaces", "removed", "forgotten")
+
+    def __init__(self):
+        self.generation = secrets.token_hex(2) # new state after an eviction: old tokens expire
+        self.version = 0
+        self.interfaces = {}         # if id -> [status fingerprint, counters fingerprint, status version, counters version]
+        self.removed = OrderedDict() # if id -> version it disappeared at
+        self.forgotten = 0           # newest removal version dropped from `removed`
+
+    def dumps(self):
+        return json.dumps([self.generation, self.version, self.forgotten, self.interfaces,
+                           list(self.removed.items())], separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, text):
+        device = cls()
+        device.generation, device.version, device.forgotten, device.interfaces, removed = json.loads(text)
+        device.removed = OrderedDict(removed)
+        return device
+
+def _digest(values):
+    return hashlib.blake2b(repr(values).encode("utf-8"), digest_size=8).hexdigest()
+
+def _fingerprints(row):
+    counters = row.get("counters")
+    return (_digest(tuple(row.get(f) for f in STATUS_FIELDS)),
+            _digest(tuple(counters.values())) if counters else None)
+
+def _diff(device, rows):
+    """Apply snapshot `rows` to `device`, True if anything changed"""
+    changed = False
+    next_version = device.version + 1
+    seen = set()
+    for row in rows:
+        if_id = str(row.get("id"))
+        seen.add(if_id)
+        status_fp, counters_fp = _fingerprints(row)
+        entry = device.interfaces.get(if_id)
+        if entry is None:
+            device.interfaces[if_id] = [status_fp, counters_fp, next_version, next_version]
+            device.removed.pop(if_id, None)
+            changed = True
+            continue
+        if entry[0] != status_fp:
+            entry[0], entry[2] = status_fp, next_version
+            changed = True
+        if entry[1] != counters_fp:
+            entry[1], entry[3] = counters_fp, next_version
+            changed = True
+
+    for if_id in [i for i in device.interfaces if i not in seen]:
+        del device.interfaces[if_id]
+        device.removed[if_id] = next_version
+        changed = True
+    while len(device.removed) > MAX_REMOVED:
+        _, dropped = device.removed.popitem(last=False)
+        device.forgotten = max(device.forgotten, dropped)
+
+    if changed:
+        device.version = next_version
+    return changed
+
+class SnapshotStore:
+    """Last interface snapshot and per-interface change versions of every device (in memory or SQLite)"""
+
+    def __init__(self, max_devices=16384, path=None):
+        self.max_devices = max_devices
+        self.path = path
+        self._devices = OrderedDict() # device key -> _Device (LRU), in-memory mode
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        self.epoch = self._connect() if path else secrets.token_hex(4)
+
+    # --- SQLITE ---
+
+    def _connect(self):
+        """(Re)open the database in this process, returns the store's epoch"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._pid = os.getpid()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL") # losing the last snapshots on power loss only costs a full resync
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS devices (
+            key TEXT PRIMARY KEY, state TEXT NOT NULL, interfaces INTEGER NOT NULL, last_used REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS devices_last_used ON devices (last_used)")
+        self._db.execute("INSERT OR IGNORE INTO meta VALUES ('epoch', ?)", (secrets.token_hex(4),))
+        return self._db.execute("SELECT value FROM meta WHERE name = 'epoch'").fetchone()[0]
+
+    @contextmanager
+    def _device(self, key):
+        """Exclusive access to the state of `key` (created if missing) for one observation"""
+        with self._lock:
+            if self.path is None:
+                device = self._devices.get(key)
+                if device is None:
+                    device = self._devices[key] = _Device()
+                    while len(self._devices) > self.max_devices:
+                        self._devices.popitem(last=False)
+                self._devices.move_to_end(key)
+                yield device
+                return
+
+            if self._pid != os.getpid(): # forked after opening (e.g. gunicorn --preload)
+                self._connect()
+            db = self._db
+            db.execute("BEGIN IMMEDIATE") # one writer across processes: versions stay consistent
+            try:
+                row = db.execute("SELECT state FROM devices WHERE key = ?", (key,)).fetchone()
+                device = _Device.loads(row[0]) if row else _Device()
+                yield device
+                db.execute("INSERT OR REPLACE INTO devices VALUES (?, ?, ?, ?)",
+                           (key, device.dumps(), len(device.interfaces), time.time()))
+                if row is None:
+                    excess = db.execute("SELECT COUNT(*) FROM devices").fetchone()[0] - self.max_devices
+                    if excess > 0:
+                        db.execute("DELETE FROM devices WHERE key IN "
+                                   "(SELECT key FROM devices ORDER BY last_used LIMIT ?)", (excess,))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    # --- API ---
+
+    def token(self, device):
+        return f"{self.epoch}-{device.generation}.{device.version}"
+
+    def _parse(self, token, device):
+        """(version, None) of a token we can answer from, else (None, reason)"""
+        if not token:
+            return None, NO_TOKEN
+        state, _, version = str(token).partition(".")
+        epoch, _, generation = state.partition("-")
+        if epoch != self.epoch or not version.isdigit():
+            return None, UNKNOWN_TOKEN
+        version = int(version)
+        if generation != device.generation or version > device.version or version < device.forgotten:
+            return None, EXPIRED_TOKEN
+        return version, None
+
+    def observe(self, key, rows):
+        """Record a snapshot, returns its version token"""
+        with self._device(key) as device:
+            _diff(device, rows)
+            return self.token(device)
+
+    def delta(self, key, rows, since=None, fields="all"):
+        """
+        Record a snapshot and return {"version", "full", "reason", "changed", "removed", "unchanged_count"}.
+        `since` = token of the client's last response; a missing / unknown / expired token
+        gives a full snapshot, "reason" says which (None for a real delta).
+        """
+        with self._device(key) as device:
+            _diff(device, rows)
+            version, reason = self._parse(since, device)
+            token = self.token(device)
+            if version is None:
+                return {"version": token, "full": True, "reason": reason, "changed": list(rows), "removed": [],
+                        "unchanged_count": 0}
+
+            status_only = fields == "status"
+            changed = []
+            for row in rows:
+                entry = device.interfaces[str(row.get("id"))]
+                if entry[2] > version or (not status_only and entry[3] > version):
+                    changed.append(row)
+            removed = [if_id for if_id, v in device.removed.items() if v > version]
+        return {
+            "version": token,
+            "full": False,
+            "reason": None,
+            "changed": changed,
+            "removed": removed,
+            "unchanged_count": len(rows) - len(changed)
+        }
+
+    def stats(self):
+        with self._lock:
+            if self.path is None:
+                devices = len(self._devices)
+                interfaces = sum(len(d.interfaces) for d in self._devices.values())
+            else:
+                if self._pid != os.getpid():
+                    self._connect()
+                devices, interfaces = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(interfaces), 0) FROM devices").fetchone()
+            return {
+                "devices": devices,
+                "interfaces": interfaces,
+                "epoch": self.epoch,
+                "shared": self.path is not None,
+                "path": self.path
+            }
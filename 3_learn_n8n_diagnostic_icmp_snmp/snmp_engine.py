@@ -0,0 +1,407 @@
+import random
+import socket
+import time
+
+# Minimal in-process SNMPv2c client.
+# Builds BER-encoded PDUs by hand so one GET fetches all scalars and one
+# GETBULK stream walks several table columns in lockstep over a single UDP
+# socket, instead of forking one snmpwalk process per OID.
+
+# --- BER TAGS ---
+INTEGER = 0x02
+OCTET_STRING = 0x04
+NULL = 0x05
+OBJECT_IDENTIFIER = 0x06
+SEQUENCE = 0x30
+
+IP_ADDRESS = 0x40
+COUNTER32 = 0x41
+GAUGE32 = 0x42
+TIMETICKS = 0x43
+OPAQUE = 0x44
+COUNTER64 = 0x46
+
+NO_SUCH_OBJECT = 0x80
+NO_SUCH_INSTANCE = 0x81
+END_OF_MIB_VIEW = 0x82
+
+GET_REQUEST = 0xA0
+GET_NEXT_REQUEST = 0xA1
+GET_RESPONSE = 0xA2
+GET_BULK_REQUEST = 0xA5
+
+SNMP_VERSION_2C = 1
+ERROR_TOO_BIG = 1
+
+EXCEPTION_TAGS = (NO_SUCH_OBJECT, NO_SUCH_INSTANCE, END_OF_MIB_VIEW)
+
+class SnmpError(Exception):
+    """SNMP protocol or agent error"""
+
+class SnmpTimeout(SnmpError):
+    """No response from the agent within timeout/retries"""
+
+# --- BER ENCODING ---
+
+def encode_length(length):
+    if length < 0x80:
+        return bytes([length])
+    raw = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes([0x80 | len(raw)]) + raw
+
+def encode_tlv(tag, payload):
+    return bytes([tag]) + encode_length(len(payload)) + payload
+
+def encode_integer(value, tag=INTEGER):
+    if tag == INTEGER:
+        raw = value.to_bytes(max(1, (value + (value < 0)).bit_length() // 8 + 1), "big", signed=True)
+    else:
+        # Unsigned application types (Counter32, Gauge32, TimeTicks, Counter64)
+        raw = value.to_bytes(value.bit_length() // 8 + 1, "big")
+    return encode_tlv(tag, raw)
+
+def encode_oid(oid):
+    arcs = oid_to_tuple(oid)
+    if len(arcs) < 2:
+        raise ValueError(f"Invalid OID: {oid}")
+    out = bytearray([arcs[0] * 40 + arcs[1]])
+    for arc in arcs[2:]:
+        chunk = [arc & 0x7F]
+        arc >>= 7
+        while arc:
+            chunk.append(0x80 | (arc & 0x7F))
+            arc >>= 7
+        out.extend(reversed(chunk))
+    return encode_tlv(OBJECT_IDENTIFIER, bytes(out))
+
+def encode_value(tag, value):
+    """Encode a (tag, python value) pair as used by the stand-in agent"""
+    if tag in (INTEGER, COUNTER32, GAUGE32, TIMETICKS, COUNTER64):
+        return encode_integer(value, tag)
+    if tag == OCTET_STRING:
+        return encode_tlv(tag, value.encode("utf-8") if isinstance(value, str) else value)
+    if tag == OBJECT_IDENTIFIER:
+        return encode_oid(value)
+    if tag == IP_ADDRESS:
+        return encode_tlv(tag, socket.inet_aton(value))
+    return encode_tlv(tag, b"") # NULL and exception markers
+
+def encode_varbinds(varbinds):
+    """varbinds: iterable of (oid, tag, value)"""
+    return encode_tlv(SEQUENCE, b"".join(
+        encode_tlv(SEQUENCE, encode_oid(oid) + encode_value(tag, value)) for oid, tag, value in varbinds
+    ))
+
+def encode_message(community, pdu_type, request_id, field1, field2, varbinds):
+    """field1/field2 = error-status/error-index, or non-repeaters/max-repetitions for GETBULK"""
+    pdu = encode_tlv(pdu_type,
+        encode_integer(request_id) + encode_integer(field1) + encode_integer(field2) + encode_varbinds(varbinds))
+    community = community.encode("utf-8") if isinstance(community, str) else community
+    return encode_tlv(SEQUENCE, encode_integer(SNMP_VERSION_2C) + encode_tlv(OCTET_STRING, community) + pdu)
+
+def build_get(community, request_id, oids):
+    return encode_message(community, GET_REQUEST, request_id, 0, 0, [(oid, NULL, None) for oid in oids])
+
+def build_getnext(community, request_id, oids):
+    return encode_message(community, GET_NEXT_REQUEST, request_id, 0, 0, [(oid, NULL, None) for oid in oids])
+
+def build_getbulk(community, request_id, oids, non_repeaters=0, max_repetitions=25):
+    return encode_message(community, GET_BULK_REQUEST, request_id, non_repeaters, max_repetitions,
+                          [(oid, NULL, None) for oid in oids])
+
+# --- BER DECODING ---
+
+def decode_tlv(data, offset=0):
+    """Returns (tag, value_start, value_end)"""
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        n = length & 0x7F
+        length = int.from_bytes(data[offset:offset + n], "big")
+        offset += n
+    end = offset + length
+    if end > len(data):
+        raise SnmpError("Truncated BER data")
+    return tag, offset, end
+
+def decode_oid(raw):
+    first = raw[0]
+    arcs = [first // 40, first % 40] if first < 80 else [2, first - 80]
+    value = 0
+    for byte in raw[1:]:
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            arcs.append(value)
+            value = 0
+    return ".".join(map(str, arcs))
+
+def decode_value(tag, raw):
+    if tag == INTEGER:
+        return int.from_bytes(raw, "big", signed=True)
+    if tag in (COUNTER32, GAUGE32, TIMETICKS, COUNTER64):
+        return int.from_bytes(raw, "big")
+    if tag in (OCTET_STRING, OPAQUE):
+        return bytes(raw)
+    if tag == OBJECT_IDENTIFIER:
+        return decode_oid(raw)
+    if tag == IP_ADDRESS:
+        return socket.inet_ntoa(raw)
+    return None # NULL, noSuchObject, noSuchInstance, endOfMibView
+
+def decode_message(data):
+    """
+    Decode an SNMP message.
+    Returns (pdu_type, request_id, field1, field2, community, varbinds) with varbinds = [(oid, tag, value)]
+    """
+    try:
+        _, start, end = decode_tlv(data)
+        _, v_start, v_end = decode_tlv(data, start)                 # version
+        _, c_start, c_end = decode_tlv(data, v_end)                 # community
+        pdu_type, p_start, p_end = decode_tlv(data, c_end)
+        _, r_start, r_end = decode_tlv(data, p_start)               # request-id
+        _, f1_start, f1_end = decode_tlv(data, r_end)
+        _, f2_start, f2_end = decode_tlv(data, f1_end)
+        _, vb_start, vb_end = decode_tlv(data, f2_end)
+
+        varbinds = []
+        pos = vb_start
+        while pos < vb_end:
+            _, item_start, item_end = decode_tlv(data, pos)
+            _, o_start, o_end = decode_tlv(data, item_start)
+            tag, val_start, val_end = decode_tlv(data, o_end)
+            varbinds.append((decode_oid(data[o_start:o_end]), tag, decode_value(tag, data[val_start:val_end])))
+            pos = item_end
+    except (IndexError, ValueError) as e:
+        raise SnmpError(f"Malformed SNMP message: {e}")
+
+    return (
+        pdu_type,
+        int.from_bytes(data[r_start:r_end], "big", signed=True),
+        int.from_bytes(data[f1_start:f1_end], "big", signed=True),
+        int.from_bytes(data[f2_start:f2_end], "big", signed=True),
+        bytes(data[c_start:c_end]),
+        varbinds,
+    )
+
+# --- VALUE HELPERS ---
+
+def oid_to_tuple(oid):
+    return tuple(int(arc) for arc in oid.strip(".").split(".") if arc)
+
+def oid_suffix(oid, prefix):
+    """Index part of `oid` below `prefix` ("1.3.6...2.1.2.17" under "...2.1.2" -> "17"), None if outside"""
+    if oid.startswith(prefix) and len(oid) > len(prefix) and oid[len(prefix)] == ".":
+        return oid[len(prefix) + 1:]
+    return None
+
+def format_value(tag, value):
+    """Render a decoded value the way `snmpwalk -O qv` prints it"""
+    if value is None:
+        return None
+    if tag in (OCTET_STRING, OPAQUE):
+        text = value.decode("utf-8", errors="replace")
+        if text.isprintable():
+            return text
+        return " ".join(f"{b:02X}" for b in value)
+    if tag == TIMETICKS:
+        centis = value % 100
+        seconds = value // 100
+        return f"{seconds // 86400}:{seconds // 3600 % 24}:{seconds // 60 % 60:02d}:{seconds % 60:02d}.{centis:02d}"
+    return str(value)
+
+# --- CLIENT ---
+
+class SnmpClient:
+    """SNMPv2c client over one UDP socket (GET + GETBULK table walks)"""
+
+    def __init__(self, target_ip, community="public", port=161, timeout=1.0, retries=1):
+        self.ip = target_ip
+        self.community = community
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self._request_id = random.randint(1, 0x3FFFFFFF)
+        self._sock = None
+        self.last_response_size = 0 # bytes of the latest response datagram
+        self.wait_time = 0.0        # seconds spent in request() (send, wait, decode), cumulative
+
+    @property
+    def is_open(self):
+        return self._sock is not None
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _socket(self):
+        if self._sock is None:
+            try:
+                family, _, _, _, addr = socket.getaddrinfo(self.ip, self.port, type=socket.SOCK_DGRAM)[0]
+            except (OSError, UnicodeError) as e:
+                # Unknown name, or one idna cannot encode ("a..b"): no agent to talk to
+                raise SnmpError(f"Cannot resolve SNMP agent {self.ip}: {e}")
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            try:
+                sock.connect(addr) # only accept datagrams from the agent
+            except OSError as e:
+                sock.close()
+                raise SnmpError(f"SNMP connect to {self.ip} failed: {e}")
+            sock.settimeout(self.timeout)
+            self._sock = sock
+        return self._sock
+
+    def _next_request_id(self):
+        self._request_id = (self._request_id % 0x7FFFFFFF) + 1
+        return self._request_id
+
+    def request(self, build, *args):
+        """Send build(community, request_id, *args) and return the varbinds of the matching response"""
+        started = time.perf_counter()
+        try:
+            return self._request(build, *args)
+        finally:
+            self.wait_time += time.perf_counter() - started
+
+    def _request(self, build, *args):
+        sock = self._socket()
+        request_id = self._next_request_id()
+        packet = build(self.community, request_id, *args)
+
+        for _ in range(self.retries + 1):
+            try:
+                sock.send(packet)
+            except OSError as e:
+                raise SnmpError(f"SNMP send failed: {e}")
+            while True:
+                try:
+                    data = sock.recv(65535)
+                except socket.timeout:
+                    break # retry
+                except OSError as e:
+                    # e.g. ECONNREFUSED from an ICMP port-unreachable
+                    raise SnmpError(f"SNMP receive failed: {e}")
+                try:
+                    pdu_type, resp_id, error_status, error_index, _, varbinds = decode_message(data)
+                except SnmpError:
+                    continue # truncated / garbled datagram: the real answer may still come
+                if pdu_type != GET_RESPONSE or resp_id != request_id:
+                    continue # stale reply of an earlier retry
+                if error_status:
+                    raise SnmpError(f"SNMP error-status {error_status} at index {error_index}", error_status)
+                self.last_response_size = len(data)
+                return varbinds
+
+        raise SnmpTimeout(f"No SNMP response from {self.ip}:{self.port}")
+
+    def get(self, oids):
+        """Fetch several scalars in one GET, returns {oid: (tag, value)} (value None if missing)"""
+        oids = [oid.strip(".") for oid in oids]
+        varbinds = self.request(build_get, oids)
+        result = {oid: (NO_SUCH_OBJECT, None) for oid in oids}
+        for oid, tag, value in varbinds:
+            if oid in result:
+                result[oid] = (tag, None if tag in EXCEPTION_TAGS else value)
+        return result
+
+    def walk_table(self, columns, max_repetitions=25):
+        """
+        Walk several table columns in lockstep with GETBULK.
+        Yields (index, [(tag, value) or None per column]) in index order as soon as
+        every column has moved past that index, so rows stream while the walk runs.
+        """
+        return self.run_walk(TableWalk(columns, max_repetitions))
+
+    def run_walk(self, walk):
+        """Drive a TableWalk to the end, yielding its rows (see walk_table)"""
+        while not walk.done:
+            try:
+                varbinds = self.request(build_getbulk, walk.next_oids(), 0, walk.max_repetitions)
+            except SnmpError as e:
+                if walk.too_big(e):
+                    continue
+                raise
+            yield from walk.feed(varbinds, self.last_response_size)
+        yield from walk.flush()
+
+class TableWalk:
+    """Transport-independent state of a lockstep GETBULK walk over several columns"""
+
+    def __init__(self, columns, max_repetitions=25):
+        self.columns = [c.strip(".") for c in columns]
+        self.max_repetitions = max_repetitions
+        self.cursors = list(self.columns)        # next OID to ask for, per column
+        self.frontier = [()] * len(self.columns) # last index seen, per column (None = exhausted)
+        self.rows = {}
+        self.filled = [False] * len(self.columns) # column returned at least one row
+        self.requests = 0
+        self.bytes_per_repetition = 0.0 # largest seen, for sizing the next walk of this agent
+        self.too_big_errors = 0
+        self._active = []
+
+    @property
+    def done(self):
+        return all(f is None for f in self.frontier)
+
+    def next_oids(self):
+        """OIDs for the next GETBULK request (one per unfinished column)"""
+        self._active = [i for i, f in enumerate(self.frontier) if f is not None]
+        return [self.cursors[i] for i in self._active]
+
+    def too_big(self, error):
+        """Shrink max-repetitions after a tooBig error, False if it cannot shrink further"""
+        if len(error.args) > 1 and error.args[1] == ERROR_TOO_BIG and self.max_repetitions > 1:
+            self.max_repetitions //= 2
+            self.too_big_errors += 1
+            return True
+        return False
+
+    def feed(self, varbinds, size=None):
+        """Consume one GETBULK response (`size` = its datagram bytes), returns the rows that are now complete"""
+        active = self._active
+        self.requests += 1
+        if not varbinds or not active:
+            self.frontier = [None] * len(self.columns)
+            return []
+        if size:
+            repetitions = max(1.0, len(varbinds) / len(active))
+            self.bytes_per_repetition = max(self.bytes_per_repetition, size / repetitions)
+
+        for pos, (oid, tag, value) in enumerate(varbinds):
+            col = active[pos % len(active)]
+            if self.frontier[col] is None:
+                continue
+            index = oid_suffix(oid, self.columns[col])
+            if index is None or tag == END_OF_MIB_VIEW:
+                self.frontier[col] = None # walked off the end of this column
+                continue
+            key = oid_to_tuple(index)
+            if key <= self.frontier[col]:
+                self.frontier[col] = None # agent did not advance: stop instead of looping
+                continue
+            self.frontier[col] = key
+            self.cursors[col] = oid
+            row = self.rows.get(key)
+            if row is None:
+                row = self.rows[key] = [None] * len(self.columns)
+            row[col] = (tag, value)
+            self.filled[col] = True
+
+        # Every index at or below the slowest unfinished column is complete
+        pending = [f for f in self.frontier if f is not None]
+        if not pending:
+            return self.flush()
+        limit = min(pending)
+        ready = sorted(key for key in self.rows if key <= limit)
+        return [(".".join(map(str, key)), self.rows.pop(key)) for key in ready]
+
+    def flush(self):
+        """Remaining rows once the walk is over"""
+        return [(".".join(map(str, key)), self.rows.pop(key)) for key in sorted(self.rows)]
@@ -0,0 +1,257 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import snmp_engine
+
+# Per-device SNMP sessions reused across polls.
+# - keep-warm socket: a device's SnmpClient stays open (address resolved and
+#   socket connected once) while the device keeps being polled; sockets idle for
+#   `idle_timeout` seconds are closed, the learned state below is kept
+# - negative cache: scalars answered with noSuchObject/noSuchInstance and table
+#   columns that returned no rows are not asked for again for `negative_ttl`
+#   seconds, or until sysUpTime shows the agent restarted
+# - max-repetitions: the GETBULK size of each agent is set from the bytes per
+#   repetition seen in its last walk (aiming at `response_budget` bytes per
+#   response), halved after tooBig errors or a response lost mid-walk
+
+DEFAULT_MAX_REPETITIONS = 10
+MAX_REPETITIONS_CAP = 64
+DEFAULT_RESPONSE_BUDGET = 4096 # bytes per GETBULK response
+DEFAULT_NEGATIVE_TTL = 600.0
+DEFAULT_IDLE_TIMEOUT = 300.0
+
+class SnmpDeviceState:
+    """What has been learned about one agent: OIDs it does not have and its GETBULK size"""
+
+    def __init__(self, max_repetitions=DEFAULT_MAX_REPETITIONS, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 response_budget=DEFAULT_RESPONSE_BUDGET):
+        self.max_repetitions = max_repetitions
+        self.negative_ttl = negative_ttl
+        self.response_budget = response_budget
+        self.unsupported = {} # oid -> monotonic expiry
+        self.uptime = None
+        self.skipped = 0      # OIDs not requested thanks to the negative cache
+
+    def supported(self, oids):
+        """`oids` minus the ones known to be missing on this agent"""
+        if not self.unsupported:
+            return list(oids)
+        now = time.monotonic()
+        keep = []
+        for oid in oids:
+            expires = self.unsupported.get(oid)
+            if expires is None:
+                keep.append(oid)
+            elif expires <= now:
+                del self.unsupported[oid]
+                keep.append(oid)
+            else:
+                self.skipped += 1
+        return keep
+
+    def mark_unsupported(self, oids):
+        expires = time.monotonic() + self.negative_ttl
+        for oid in oids:
+            self.unsupported[oid] = expires
+
+    def observe_uptime(self, ticks):
+        """Forget the negative cache when the agent restarted (it may run new firmware)"""
+        if ticks is None:
+            return
+        if self.uptime is not None and ticks < self.uptime:
+            self.unsupported.clear()
+        self.uptime = ticks
+
+    # --- GET ---
+
+    def request_oids(self, oids):
+        return self.supported(oid.strip(".") for oid in oids)
+
+    def get_result(self, oids, result):
+        """Full {oid: (tag, value)} for `oids` from the answer to request_oids(); records missing ones"""
+        self.mark_unsupported(oid for oid, (tag, _) in result.items()
+                              if tag in (snmp_engine.NO_SUCH_OBJECT, snmp_engine.NO_SUCH_INSTANCE))
+        missing = (snmp_engine.NO_SUCH_OBJECT, None)
+        return {oid: result.get(oid, missing) for oid in (o.strip(".") for o in oids)}
+
+    # --- GETBULK WALK ---
+
+    def start_walk(self, columns):
+        """TableWalk over the columns not known to be empty, None when nothing is left to walk"""
+        wanted = self.supported(c.strip(".") for c in columns)
+        if not wanted:
+            return None
+        return snmp_engine.TableWalk(wanted, self.max_repetitions)
+
+    def widen(self, columns, walk, rows):
+        """Map rows of start_walk()'s walk back to one cell per requested column (None for skipped ones)"""
+        columns = [c.strip(".") for c in columns]
+        if walk.columns == columns:
+            yield from rows
+            return
+        positions = [columns.index(c) for c in walk.columns]
+        width = len(columns)
+        for idx, cells in rows:
+            full = [None] * width
+            for pos, cell in zip(positions, cells):
+                full[pos] = cell
+            yield idx, full
+
+    def end_walk(self, walk, lost=False):
+        """
+        Learn from a finished walk: columns without rows go to the negative cache and
+        max-repetitions is resized. `lost` = a response went missing after the walk started.
+        """
+        if lost:
+            if walk.requests:
+                self.max_repetitions = max(1, walk.max_repetitions // 2)
+            return
+        self.mark_unsupported(c for c, filled in zip(walk.columns, walk.filled) if not filled)
+        if walk.bytes_per_repetition:
+            fit = int(self.response_budget / walk.bytes_per_repetition)
+            if walk.too_big_errors:
+                fit = min(fit, walk.max_repetitions)
+            self.max_repetitions = max(1, min(fit, MAX_REPETITIONS_CAP))
+        elif walk.too_big_errors:
+            self.max_repetitions = walk.max_repetitions
+
+    def snapshot(self):
+        now = time.monotonic()
+        return {
+            "max_repetitions": self.max_repetitions,
+            "unsupported_oids": sorted(oid for oid, expires in self.unsupported.items() if expires > now),
+            "skipped_oids": self.skipped
+        }
+
+class SnmpSession:
+    """SnmpClient + SnmpDeviceState of one (ip, port, community); use through SnmpSessionPool.session()"""
+
+    def __init__(self, client, state):
+        self.client = client
+        self.state = state
+        self.lock = threading.Lock() # one request stream per socket at a time
+        self.last_used = time.monotonic()
+        self.evicted = False
+
+    def get(self, oids):
+        """SnmpClient.get() that does not ask for OIDs the agent is known not to have"""
+        wanted = self.state.request_oids(oids)
+        result = self.client.get(wanted) if wanted else {}
+        return self.state.get_result(oids, result)
+
+    def walk_table(self, columns):
+        """SnmpClient.walk_table() over the supported columns, at this agent's max-repetitions"""
+        walk = self.state.start_walk(columns)
+        if walk is None:
+            return
+        try:
+            yield from self.state.widen(columns, walk, self.client.run_walk(walk))
+        except snmp_engine.SnmpTimeout:
+            self.state.end_walk(walk, lost=True)
+            raise
+        self.state.end_walk(walk)
+
+class SnmpSessionPool:
+    """Thread-safe LRU of SnmpSessions keyed by (ip, port, community)"""
+
+    def __init__(self, max_sessions=4096, idle_timeout=DEFAULT_IDLE_TIMEOUT, timeout=1.0, retries=1,
+                 max_repetitions=DEFAULT_MAX_REPETITIONS, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 response_budget=DEFAULT_RESPONSE_BUDGET):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.retries = retries
+        self.max_repetitions = max_repetitions
+        self.negative_ttl = negative_ttl
+        self.response_budget = response_budget
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.created = 0
+        self.reused = 0
+        self.evictions = 0
+        self.idle_closed = 0
+
+    def _entry(self, ip, community, port):
+        """Session for a device (created on first use), caller holds self._lock"""
+        key = (ip, port, community)
+        session = self._sessions.get(key)
+        if session is not None:
+            self._sessions.move_to_end(key)
+            self.reused += 1
+            return session
+        client = snmp_engine.SnmpClient(ip, community, port=port, timeout=self.timeout, retries=self.retries)
+        state = SnmpDeviceState(self.max_repetitions, self.negative_ttl, self.response_budget)
+        session = self._sessions[key] = SnmpSession(client, state)
+        self.created += 1
+        while len(self._sessions) > self.max_sessions:
+            _, old = self._sessions.popitem(last=False)
+            old.evicted = True
+            self.evictions += 1
+            if old.lock.acquire(blocking=False): # busy ones are closed by their user
+                old.client.close()
+                old.lock.release()
+        return session
+
+    def state(self, ip, community="public", port=161):
+        """Learned state of a device, for clients with their own transport (asyncio)"""
+        with self._lock:
+            return self._entry(ip, community, port).state
+
+    @contextmanager
+    def session(self, ip, community="public", port=161):
+        """Exclusive use of a device's session (concurrent users of one device take turns)"""
+        with self._lock:
+            session = self._entry(ip, community, port)
+        self._close_idle()
+        with session.lock:
+            try:
+                yield session
+            finally:
+                session.last_used = time.monotonic()
+                if session.evicted:
+                    session.client.close()
+
+    def _close_idle(self):
+        """Close sockets unused for idle_timeout (at most one sweep per half timeout)"""
+        now = time.monotonic()
+        if now - self._last_sweep < self.idle_timeout / 2:
+            return
+        self._last_sweep = now
+        with self._lock:
+            idle = [s for s in self._sessions.values() if s.client.is_open and now - s.last_used > self.idle_timeout]
+        for session in idle:
+            if session.lock.acquire(blocking=False):
+                session.client.close()
+                session.lock.release()
+                self.idle_closed += 1
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            with session.lock:
+                session.client.close()
+
+    def device(self, ip):
+        """Learned state of every session of an IP"""
+        with self._lock:
+            sessions = [(key, s) for key, s in self._sessions.items() if key[0] == ip]
+        return [dict(s.state.snapshot(), port=port, open=s.client.is_open) for (_, port, _), s in sessions]
+
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            return {
+                "sessions": len(sessions),
+                "max_sessions": self.max_sessions,
+                "open_sockets": sum(1 for s in sessions if s.client.is_open),
+                "created": self.created,
+                "reused": self.reused,
+                "evictions": self.evictions,
+                "idle_closed": self.idle_closed,
+                "unsupported_oids": sum(len(s.state.unsupported) for s in sessions),
+                "skipped_oids": sum(s.state.skipped for s in sessions)
+            }
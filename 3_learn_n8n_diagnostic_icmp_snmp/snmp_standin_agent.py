@@ -0,0 +1,172 @@
+import argparse
+import bisect
+import socket
+import struct
+import sys
+import threading
+
+import snmp_engine as ber
+
+# Local UDP stand-in for an SNMPv2c agent.
+# Serves GET / GETNEXT / GETBULK from an in-memory MIB so the native SNMP
+# engine (and NetworkCollector on top of it) can be exercised without a real
+# device or net-snmp installed.
+#
+# Usage:
+#   python snmp_standin_agent.py --port 1161 --interfaces 48
+#   SNMP_PORT=1161 python network_api.py
+
+SYS_DESCR = "1.3.6.1.2.1.1.1.0"
+SYS_UPTIME = "1.3.6.1.2.1.1.3.0"
+IF_TABLE_ENTRY = "1.3.6.1.2.1.2.2.1"
+IF_X_TABLE_ENTRY = "1.3.6.1.2.1.31.1.1.1"
+
+IP_PKTINFO = getattr(socket, "IP_PKTINFO", 8) # Linux value; not exported by every Python build
+
+def build_demo_mib(interfaces=8, down_every=5, elapsed=0.0):
+    """
+    sysDescr/sysUpTime plus ifTable/ifXTable where every `down_every`-th port is admin UP / oper DOWN.
+    Counters are what the ports would show `elapsed` seconds after boot: port N carries N Mbit/s
+    each way and 1 in 1000 of its packets are errors. Call set_mib() again with a later
+    `elapsed` to simulate traffic between polls.
+    """
+    mib = {
+        SYS_DESCR: (ber.OCTET_STRING, "Stand-in SNMP agent (network_api test)"),
+        SYS_UPTIME: (ber.TIMETICKS, 123456 + int(elapsed * 100)),
+    }
+    for idx in range(1, interfaces + 1):
+        oper = 2 if down_every and idx % down_every == 0 else 1
+        octets = int(idx * 125000 * elapsed) if oper == 1 else 0 # idx Mbit/s
+        pkts = octets // 1000
+        mib[f"{IF_TABLE_ENTRY}.1.{idx}"] = (ber.INTEGER, idx)
+        mib[f"{IF_TABLE_ENTRY}.2.{idx}"] = (ber.OCTET_STRING, f"GigabitEthernet0/{idx}")
+        mib[f"{IF_TABLE_ENTRY}.7.{idx}"] = (ber.INTEGER, 1)
+        mib[f"{IF_TABLE_ENTRY}.8.{idx}"] = (ber.INTEGER, oper)
+        mib[f"{IF_TABLE_ENTRY}.10.{idx}"] = (ber.COUNTER32, octets % (1 << 32))
+        mib[f"{IF_TABLE_ENTRY}.13.{idx}"] = (ber.COUNTER32, 0)
+        mib[f"{IF_TABLE_ENTRY}.14.{idx}"] = (ber.COUNTER32, pkts // 1000)
+        mib[f"{IF_TABLE_ENTRY}.16.{idx}"] = (ber.COUNTER32, octets % (1 << 32))
+        mib[f"{IF_TABLE_ENTRY}.19.{idx}"] = (ber.COUNTER32, 0)
+        mib[f"{IF_TABLE_ENTRY}.20.{idx}"] = (ber.COUNTER32, 0)
+        mib[f"{IF_X_TABLE_ENTRY}.6.{idx}"] = (ber.COUNTER64, octets)
+        mib[f"{IF_X_TABLE_ENTRY}.7.{idx}"] = (ber.COUNTER64, pkts)
+        mib[f"{IF_X_TABLE_ENTRY}.10.{idx}"] = (ber.COUNTER64, octets)
+        mib[f"{IF_X_TABLE_ENTRY}.11.{idx}"] = (ber.COUNTER64, pkts)
+        mib[f"{IF_X_TABLE_ENTRY}.15.{idx}"] = (ber.GAUGE32, 1000)
+    return mib
+
+class SnmpStandinAgent:
+    """Threaded UDP SNMPv2c responder backed by a {oid: (tag, value)} dict"""
+
+    def __init__(self, mib, community="public", host="127.0.0.1", port=0):
+        self.community = community.encode("utf-8")
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.port = self.sock.getsockname()[1]
+        # Bound to the wildcard address: answer from the address each request was sent
+        # to (as real agents do), so clients with a connected socket accept the reply
+        self._pktinfo = host in ("", "0.0.0.0") and sys.platform.startswith("linux")
+        if self._pktinfo:
+            self.sock.setsockopt(socket.IPPROTO_IP, IP_PKTINFO, 1)
+        self.requests = 0
+        self._thread = None
+        self.set_mib(mib)
+
+    def set_mib(self, mib):
+        ordered = sorted((ber.oid_to_tuple(oid), oid, tv) for oid, tv in mib.items())
+        self._keys = [k for k, _, _ in ordered]
+        self._entries = [(oid, tag, value) for _, oid, (tag, value) in ordered]
+        self._exact = {oid: (tag, value) for oid, (tag, value) in mib.items()}
+
+    def _next(self, oid):
+        pos = bisect.bisect_right(self._keys, ber.oid_to_tuple(oid))
+        if pos >= len(self._entries):
+            return oid, ber.END_OF_MIB_VIEW, None
+        return self._entries[pos]
+
+    def handle(self, data):
+        """Return the response datagram for one request (None = drop, e.g. wrong community)"""
+        try:
+            pdu_type, request_id, field1, field2, community, varbinds = ber.decode_message(data)
+        except ber.SnmpError:
+            return None
+        if community != self.community:
+            return None # real agents stay silent on a bad community
+        self.requests += 1
+
+        oids = [oid for oid, _, _ in varbinds]
+        out = []
+        if pdu_type == ber.GET_REQUEST:
+            for oid in oids:
+                tag, value = self._exact.get(oid, (ber.NO_SUCH_OBJECT, None))
+                out.append((oid, tag, value))
+        elif pdu_type == ber.GET_NEXT_REQUEST:
+            out = [self._next(oid) for oid in oids]
+        elif pdu_type == ber.GET_BULK_REQUEST:
+            non_repeaters = max(0, field1)
+            out = [self._next(oid) for oid in oids[:non_repeaters]]
+            cursors = oids[non_repeaters:]
+            for _ in range(max(0, field2)):
+                if not cursors:
+                    break
+                step = [self._next(oid) for oid in cursors]
+                out.extend(step)
+                if all(tag == ber.END_OF_MIB_VIEW for _, tag, _ in step):
+                    break
+                cursors = [oid for oid, _, _ in step]
+        else:
+            return None
+
+        return ber.encode_message(self.community, ber.GET_RESPONSE, request_id, 0, 0, out)
+
+    def serve_forever(self):
+        while True:
+            try:
+                if self._pktinfo:
+                    data, ancdata, _, addr = self.sock.recvmsg(65535, socket.CMSG_SPACE(12))
+                else:
+                    data, addr = self.sock.recvfrom(65535)
+                    ancdata = None
+            except OSError:
+                return # socket closed
+            response = self.handle(data)
+            if response is None:
+                continue
+            reply_from = [
+                # struct in_pktinfo {ifindex, spec_dst, addr}: reply from the request's destination
+                (socket.IPPROTO_IP, IP_PKTINFO, struct.pack("=i4s4s", 0, info[8:12], b"\0" * 4))
+                for level, kind, info in ancdata or ()
+                if level == socket.IPPROTO_IP and kind == IP_PKTINFO
+            ]
+            try:
+                if reply_from:
+                    self.sock.sendmsg([response], reply_from, 0, addr)
+                else:
+                    self.sock.sendto(response, addr)
+            except OSError:
+                return
+
+    def start(self):
+        """Serve in a daemon thread, returns self"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR) # wakes up the blocked recvfrom()
+        except OSError:
+            pass
+        self.sock.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stand-in SNMPv2c agent for local testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1161)
+    parser.add_argument("--community", default="public")
+    parser.add_argument("--interfaces", type=int, default=48)
+    args = parser.parse_args()
+
+    agent = SnmpStandinAgent(build_demo_mib(args.interfaces), args.community, args.host, args.port)
+    print(f"Stand-in SNMP agent listening on {args.host}:{agent.port} (community '{args.community}')")
+    agent.serve_forever()
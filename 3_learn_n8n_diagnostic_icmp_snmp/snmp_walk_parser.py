@@ -0,0 +1,177 @@
+# Shared parser for `snmpwalk` text output (the subprocess SNMP path).
+#
+# The output of one or more walks is parsed into a columnar table keyed by the
+# full index suffix below each column OID, so multi-index tables
+# (e.g. "...ipNetToMediaPhysAddress.3.10.0.0.1") keep distinct rows instead of
+# collapsing on the last arc.
+#
+# snmpwalk prints one column as one contiguous run of lines, so each run is
+# located with str.find and split with str/dict builtins (no per-line Python
+# code). Interleaved or wrapped output falls back to a single line-by-line pass.
+# Benchmark: bench_walk_parser.py
+
+from itertools import repeat
+from operator import methodcaller
+
+OID_IF_DESCR = '1.3.6.1.2.1.2.2.1.2'
+OID_IF_ADMIN_STATUS = '1.3.6.1.2.1.2.2.1.7'
+OID_IF_OPER_STATUS = '1.3.6.1.2.1.2.2.1.8'
+
+IF_STATUS_MAP = {'1': 'UP', '2': 'DOWN', '3': 'TESTING'}
+
+# Type prefixes printed by snmpwalk without -Oq ("INTEGER: up(1)", "STRING: \"eth0\"")
+_TYPE_PREFIXES = (
+    "STRING: ", "INTEGER: ", "Counter32: ", "Counter64: ", "Gauge32: ", "Timeticks: ",
+    "OID: ", "IpAddress: ", "Hex-STRING: ", "Opaque: ", "Network Address: ",
+)
+_has_type_prefix = methodcaller("startswith", _TYPE_PREFIXES)
+_needs_cleaning = methodcaller("endswith", ('"', ")", " "))
+
+class WalkTable:
+    """Columnar walk result: one list of index suffixes, one value list per column"""
+    __slots__ = ("columns", "index", "values")
+
+    def __init__(self, columns, index, values):
+        self.columns = list(columns)
+        self.index = index   # index suffix per row, first-seen order
+        self.values = values # values[col][row], None where the column has no such row
+
+    def __len__(self):
+        return len(self.index)
+
+    def column(self, oid):
+        return self.values[self.columns.index(oid.strip("."))]
+
+    def rows(self):
+        """(index, [value per column]) in first-seen order"""
+        return zip(self.index, map(list, zip(*self.values)))
+
+def clean_value(value):
+    """Strip the type prefix, quotes and enum label: 'INTEGER: up(1)' -> '1', 'STRING: "lo"' -> 'lo'"""
+    value = value.strip()
+    if value.startswith(_TYPE_PREFIXES):
+        value = value.split(": ", 1)[1]
+    if len(value) > 1 and value[0] == '"' and value[-1] == '"':
+        return value[1:-1]
+    if value.endswith(")"):
+        label, _, number = value[:-1].rpartition("(")
+        if label and number.lstrip("-").isdigit():
+            return number
+    return value
+
+def _clean_column(values):
+    """clean_value() over a column, skipped when no value needs it"""
+    present = values if None not in values else [v for v in values if v is not None]
+    if any(map(_needs_cleaning, present)) or any(map(_has_type_prefix, present)):
+        return [None if v is None else clean_value(v) for v in values]
+    return values
+
+def _column_run(text, column):
+    """
+    ({index suffix: value}, needs_cleaning) of one column when its lines form one
+    contiguous run of well-formed lines in `text` (which starts with "\n"), else None.
+    """
+    for needle in ("\n." + column + ".", "\n" + column + "."):
+        start = text.find(needle)
+        if start >= 0:
+            break
+    else:
+        return {}, False
+    end = text.find("\n", text.rfind(needle) + 1)
+    run = text[start:end] if end >= 0 else text[start:]
+    lines = run.count("\n")
+    if lines != run.count(needle):
+        return None # interleaved with other lines (or a wrapped multi-line value)
+
+    body = run[len(needle):].replace(needle, "\n") # "idx = value\nidx = value..."
+    sep = " = " if " = " in body.partition("\n")[0] else " "
+    # "-O q" strings: every value quoted -> strip the quotes on the whole run at once
+    if body.endswith('"') and body.count(sep + '"') == lines and body.count('"\n') == lines - 1:
+        body = body[:-1].replace('"\n', "\n").replace(sep + '"', sep)
+    needs_cleaning = '"' in body or ")" in body or ": " in body or " \n" in body or body.endswith(" ")
+
+    if body.count(sep) == lines:
+        # Exactly one separator per line: split keys and values in one go
+        flat = body.replace(sep, "\n").split("\n")
+        return dict(zip(flat[::2], flat[1::2])), needs_cleaning
+    pairs = list(map(str.split, body.split("\n"), repeat(sep), repeat(1)))
+    if min(map(len, pairs)) != 2:
+        return None
+    return dict(pairs), needs_cleaning
+
+def _parse_lines(text, columns):
+    """Line-by-line fallback: one pass, any line order"""
+    prefixes = [("." + c + ".", found) for c, found in columns.items()]
+    prefixes += [(p[1:], found) for p, found in prefixes]
+    prefix, store = prefixes[0]
+    plen = len(prefix)
+    for line in text.splitlines():
+        # Walks are grouped by column: test the previously matched column first
+        if not line.startswith(prefix):
+            for prefix, store in prefixes:
+                if line.startswith(prefix):
+                    plen = len(prefix)
+                    break
+            else:
+                continue # other subtree / wrapped continuation line
+        idx, sep, value = line[plen:].partition(" = ")
+        if not sep:
+            idx, sep, value = idx.partition(" ")
+            if not sep:
+                continue
+        store[idx] = value
+
+def parse_walk(raw_text, columns):
+    """
+    Parse snmpwalk output of any of `columns` (numeric OIDs) into a WalkTable.
+    Accepts "-O qn" lines (".1.3.6...2.1 lo") and "OID = TYPE: value" lines, so the
+    outputs of several walks can simply be concatenated.
+    """
+    columns = [c.strip(".") for c in columns]
+    text = "\n" + (raw_text.replace("\r", "") if "\r" in raw_text else raw_text)
+
+    found = {}
+    for column in columns:
+        run = _column_run(text, column)
+        if run is None:
+            found = {c: ({}, True) for c in columns}
+            _parse_lines(text, {c: d for c, (d, _) in found.items()})
+            break
+        found[column] = run
+    found, cleaning = zip(*(found[c] for c in columns))
+
+    # Row order: first-seen across columns (normally every column has the first one's order)
+    index = list(found[0])
+    keys = [list(d) for d in found]
+    if any(k != index for k in keys):
+        index = list(dict.fromkeys(k for d in found for k in d))
+    values = []
+    for d, k, needs_cleaning in zip(found, keys, cleaning):
+        column = list(d.values()) if k == index else [d.get(i) for i in index]
+        values.append(_clean_column(column) if needs_cleaning else column)
+    return WalkTable(columns, index, values)
+
+def interface_row(idx, name, a_stat, o_stat):
+    """One interfaces_detail entry from raw ifDescr / ifAdminStatus / ifOperStatus values"""
+    return {
+        "id": idx,
+        "name": (name or "").strip('"'),
+        "admin_status": IF_STATUS_MAP.get(a_stat, f"Unknown({a_stat})"),
+        "oper_status": IF_STATUS_MAP.get(o_stat, f"Unknown({o_stat})")
+    }
+
+def interfaces_from_walk(raw_text):
+    """interfaces_detail rows from the (concatenated) ifDescr, ifAdminStatus and ifOperStatus walks"""
+    table = parse_walk(raw_text, (OID_IF_DESCR, OID_IF_ADMIN_STATUS, OID_IF_OPER_STATUS))
+    status = IF_STATUS_MAP
+    # interface_row() inlined: this loop runs once per interface
+    return [
+        {
+            "id": idx,
+            "name": name,
+            "admin_status": status.get(a_stat) or f"Unknown({a_stat or '0'})",
+            "oper_status": status.get(o_stat) or f"Unknown({o_stat or '0'})"
+        }
+        for idx, name, a_stat, o_stat in zip(table.index, *table.values)
+        if name is not None
+    ]
@@ -0,0 +1,73 @@
+import copy
+
+import pytest
+
+import analysis_cache
+from analysis_cache import AnalysisCache, fingerprint
+
+# Fingerprint of a diagnostic result and the on-disk analysis cache.
+
+DATA = {
+    "ip": "10.0.0.1",
+    "overall_status": "UP",
+    "icmp_metrics": {"status": "UP", "packet_loss_pct": 0.0, "latency_avg_ms": 1.21, "jitter_ms": 0.3},
+    "snmp_status": "UP",
+    "device_info": "Stand-in switch",
+    "uptime_raw": "0:0:20:34.56",
+    "interfaces_count": 2,
+    "interfaces_detail": [
+        {"id": "1", "name": "Gi0/1", "admin_status": "UP", "oper_status": "UP", "rates": {"in_bps": 1200.0}},
+        {"id": "2", "name": "Gi0/2", "admin_status": "UP", "oper_status": "UP", "rates": {"in_util_pct": 93.0}},
+    ],
+}
+
+def variant(**icmp):
+    data = copy.deepcopy(DATA)
+    data["icmp_metrics"].update(icmp)
+    return data
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1760000000.0]
+    monkeypatch.setattr(analysis_cache.time, "time", lambda: now[0])
+    return now
+
+def test_fingerprint_ignores_measurement_noise():
+    noisy = variant(latency_avg_ms=1.87, jitter_ms=0.9)
+    noisy["uptime_raw"] = "0:0:25:34.56"
+    noisy["interfaces_detail"][0]["rates"]["in_bps"] = 98000.0
+    noisy["interfaces_detail"][1]["rates"]["in_util_pct"] = 97.5 # still "util"
+    assert fingerprint(noisy) == fingerprint(DATA)
+
+def test_fingerprint_follows_meaningful_changes():
+    key = fingerprint(DATA)
+    assert fingerprint(variant(latency_avg_ms=2.5)) != key # next latency bucket
+    assert fingerprint(variant(packet_loss_pct=10.0)) != key
+    link_down = copy.deepcopy(DATA)
+    link_down["interfaces_detail"][0]["oper_status"] = "DOWN"
+    assert fingerprint(link_down) != key
+    assert fingerprint(DATA, salt="other-model") != key
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = AnalysisCache(str(tmp_path / "cache.sqlite"), ttl=60)
+    cache.put("k", "report")
+    clock[0] += 59
+    assert cache.get("k") == "report"
+    clock[0] += 2 # TTL counts from creation, not from the last hit
+    assert cache.get("k") is None
+    assert (cache.hits, cache.misses, cache.expired) == (1, 1, 1)
+    cache.close()
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = AnalysisCache(str(tmp_path / "cache.sqlite"), ttl=0, max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, key.upper())
+        clock[0] += 1
+    assert cache.get("a") == "A" # "b" is the least recently used now
+    clock[0] += 1
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("A", "C")
+    assert cache.stats()["entries"] == 2 and cache.evictions == 1
+    cache.close()
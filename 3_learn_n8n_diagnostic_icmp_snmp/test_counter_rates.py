@@ -0,0 +1,63 @@
+import counter_rates
+from counter_rates import CounterRateTracker, COUNTER_FIELDS
+
+# Previous-sample bookkeeping of the interface counter -> rate conversion.
+
+WIDTHS = [64] * len(COUNTER_FIELDS)
+
+def sample(octets):
+    return [octets] * len(COUNTER_FIELDS)
+
+def test_idle_devices_are_forgotten(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(counter_rates.time, "monotonic", lambda: now[0])
+    tracker = CounterRateTracker(idle_timeout=60)
+    for ip in ("10.0.0.1", "10.0.0.2"):
+        tracker.update(ip, "1", 0, sample(0), WIDTHS)
+
+    now[0] += 30
+    assert tracker.update("10.0.0.1", "1", 30, sample(30), WIDTHS)["in_bps"] == 8.0
+    now[0] += 45 # 10.0.0.2 idle for 75 s, 10.0.0.1 for 45 s
+    tracker.update("10.0.0.3", "1", 75, sample(0), WIDTHS)
+    assert tracker.stats()["devices"] == 2 and tracker.evictions == 1
+    # A forgotten device starts over: first sample again, no rate
+    assert tracker.update("10.0.0.2", "1", 75, sample(75), WIDTHS) is None
+
+def test_least_recently_sampled_device_is_evicted_over_the_cap():
+    tracker = CounterRateTracker(max_devices=2)
+    tracker.update("a", "1", 0, sample(0), WIDTHS)
+    tracker.update("b", "1", 0, sample(0), WIDTHS)
+    tracker.observe_uptime("a", 100) # "a" is the most recent now
+    tracker.update("c", "1", 0, sample(0), WIDTHS)
+
+    assert tracker.stats()["devices"] == 2
+    assert tracker.update("b", "1", 10, sample(10), WIDTHS) is None # evicted
+    assert tracker.update("a", "1", 10, sample(10), WIDTHS) is None # ... pushed out by "b"
+    assert tracker.update("b", "1", 20, sample(20), WIDTHS)["in_bps"] == 8.0
+
+def test_counter32_wrap_and_counter64_reset():
+    tracker = CounterRateTracker()
+    tracker.update("10.0.0.1", "1", 0, sample((1 << 32) - 100), [32] * len(COUNTER_FIELDS))
+    rates = tracker.update("10.0.0.1", "1", 10, sample(400), [32] * len(COUNTER_FIELDS))
+    assert rates["in_bps"] == 400.0 and rates["in_pps"] == 50.0 # 500 across the wrap
+
+    # A 64-bit counter going down is a reset, not a wrap
+    tracker.update("10.0.0.2", "1", 0, sample(1000), WIDTHS)
+    assert tracker.update("10.0.0.2", "1", 10, sample(10), WIDTHS)["in_bps"] is None
+    assert tracker.update("10.0.0.2", "1", 20, sample(20), WIDTHS)["in_bps"] == 8.0
+
+    # A 32-bit "wrap" above line rate was a reset too
+    tracker.update("10.0.0.3", "1", 0, sample(1000), [32] * len(COUNTER_FIELDS))
+    rates = tracker.update("10.0.0.3", "1", 10, sample(10), [32] * len(COUNTER_FIELDS), speed_bps=10 ** 6)
+    assert rates["in_bps"] is None and rates["in_util_pct"] is None
+
+def test_uptime_going_backwards_resets_the_device():
+    tracker = CounterRateTracker()
+    tracker.observe_uptime("10.0.0.1", 50000)
+    tracker.update("10.0.0.1", "1", 0, sample(0), WIDTHS)
+    tracker.observe_uptime("10.0.0.1", 51000)
+    assert tracker.update("10.0.0.1", "1", 10, sample(10), WIDTHS)["in_bps"] == 8.0
+
+    tracker.observe_uptime("10.0.0.1", 300) # rebooted: counters restarted from 0
+    assert tracker.update("10.0.0.1", "1", 20, sample(5), WIDTHS) is None
+    assert tracker.update("10.0.0.1", "1", 30, sample(15), WIDTHS)["in_bps"] == 8.0
@@ -32,4 +32,46 @@ curl -s -u "wrong:user" -X POST "$API_URL/icmp/status" \
      -H "Content-Type: application/json" \
      -d "{\"ip\": \"$TARGET_IP\"}"
 
+echo -e "\n[TEST 5] ICMP Batch (streams NDJSON, one line per host)"
+curl -s -N -u "$USER:$PASS" -X POST "$API_URL/icmp/batch" \
+     -H "Content-Type: application/json" \
+     -d "{\"targets\": [\"$TARGET_IP\", \"127.0.0.0/30\"], \"concurrency\": 16}"
+
+echo -e "\n\n[TEST 6] Probe cache stats (repeat TEST 1 within the TTL to see a hit)"
+curl -s -u "$USER:$PASS" "$API_URL/cache/stats" | jq .
+
+echo -e "\n[TEST 7] SNMP Data streamed as NDJSON (system, one line per interface, icmp, end)"
+curl -s -N -u "$USER:$PASS" -X POST "$API_URL/snmp/data" \
+     -H "Content-Type: application/json" \
+     -d "{\"ip\": \"$TARGET_IP\", \"community\": \"public\", \"stream\": \"ndjson\"}"
+
+echo -e "\n\n[TEST 8] ICMP QoS, adaptive profile (more echoes only when loss is seen)"
+curl -s -u "$USER:$PASS" -X POST "$API_URL/icmp/qos" \
+     -H "Content-Type: application/json" \
+     -d "{\"ip\": \"$TARGET_IP\", \"profile\": \"adaptive\"}" | jq .
+
+echo -e "\n[TEST 9] SNMP sessions (socket reuse, OIDs skipped, GETBULK size learned for $TARGET_IP)"
+curl -s -u "$USER:$PASS" "$API_URL/snmp/sessions?ip=$TARGET_IP" | jq .
+
+echo -e "\n[TEST 10] Prometheus scrape of the poller results (needs POLL_INVENTORY)"
+curl -s -u "$USER:$PASS" "$API_URL/metrics" | head -20
+
+echo -e "\n[TEST 11] Server-Timing of one SNMP request, then the phase histograms"
+curl -s -o /dev/null -D - -u "$USER:$PASS" -X POST "$API_URL/snmp/data" \
+     -H "Content-Type: application/json" -H "X-Server-Timing: 1" \
+     -d "{\"ip\": \"$TARGET_IP\", \"community\": \"public\"}" | grep -i server-timing
+curl -s -u "$USER:$PASS" "$API_URL/stats/timings" | jq .
+
+echo -e "\n[TEST 12] SNMP delta mode: full table + version token, then only what changed since"
+VERSION=$(curl -s -u "$USER:$PASS" -X POST "$API_URL/snmp/data" \
+     -H "Content-Type: application/json" \
+     -d "{\"ip\": \"$TARGET_IP\", \"community\": \"public\"}" | jq -r .version)
+curl -s -u "$USER:$PASS" -X POST "$API_URL/snmp/data" \
+     -H "Content-Type: application/json" \
+     -d "{\"ip\": \"$TARGET_IP\", \"community\": \"public\", \"since\": \"$VERSION\", \"fresh\": true}" | jq .
+
+echo -e "\n[TEST 13] On-disk history (needs HISTORY_DIR): stored metrics, then 1h-averaged latency of the last day"
+curl -s -u "$USER:$PASS" "$API_URL/history?ip=$TARGET_IP" | jq .
+curl -s -u "$USER:$PASS" "$API_URL/history?ip=$TARGET_IP&metric=latency_avg_ms&step=3600" | jq .
+
 echo -e "\n=== Test Complete ==="
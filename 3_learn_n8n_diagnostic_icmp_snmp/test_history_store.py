@@ -0,0 +1,116 @@
+import base64
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+import history_store
+from history_store import HistoryStore, HEADER, MAGIC
+from poller import ICMP_METRICS
+
+# Segment files written by several threads / processes, and by writers with
+# different column counts (an upgrade during the day).
+
+TS = 1760000000 # fixed day: one segment per device and kind
+
+def values(n):
+    return [float(n)] * len(ICMP_METRICS)
+
+def write_records(root, writer, count):
+    store = HistoryStore(root, retention_days=0)
+    for i in range(count):
+        store.append("10.0.0.1", "icmp", TS + writer * 100000 + i, values(writer))
+        if i % 7 == 0:
+            store.flush() # many small appends: maximal interleaving
+    store.flush()
+
+def check_segment(path, columns):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, _, found = HEADER.unpack_from(data)
+    assert magic == MAGIC and found == columns
+    assert (len(data) - HEADER.size) % (4 * (columns + 1)) == 0
+    # exactly one header: no second magic where a record should be
+    assert data.count(MAGIC) == 1
+
+def test_concurrent_processes_share_one_well_formed_segment(tmp_path):
+    root = str(tmp_path)
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=write_records, args=(root, w, 200)) for w in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+        assert w.exitcode == 0
+
+    store = HistoryStore(root, retention_days=0)
+    [path] = store._segments(history_store._day(TS), "10.0.0.1", "icmp")
+    check_segment(path, len(ICMP_METRICS))
+    points = store.query("10.0.0.1", "latency_avg_ms", TS, TS + 10 ** 6)
+    assert len(points) == 800
+    assert sorted({v for _, v in points}) == [0.0, 1.0, 2.0, 3.0]
+
+def test_concurrent_threads_flushing_a_new_segment(tmp_path):
+    store = HistoryStore(str(tmp_path), retention_days=0)
+    barrier = threading.Barrier(8)
+
+    def writer(n):
+        barrier.wait()
+        for i in range(50):
+            store.append("10.0.0.2", "icmp", TS + n * 1000 + i, values(n))
+            store.flush()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    [path] = store._segments(history_store._day(TS), "10.0.0.2", "icmp")
+    check_segment(path, len(ICMP_METRICS))
+    assert len(store.query("10.0.0.2", "packet_loss_pct", TS, TS + 10 ** 5)) == 400
+
+def test_writer_with_more_columns_starts_its_own_segment(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path), retention_days=0)
+    store.append("10.0.0.3", "icmp", TS, values(1))
+    store.flush()
+
+    wider = ICMP_METRICS + ("new_metric",)
+    monkeypatch.setitem(history_store.KINDS, "icmp", wider)
+    upgraded = HistoryStore(str(tmp_path), retention_days=0)
+    upgraded.append("10.0.0.3", "icmp", TS + 60, values(2) + [7.0])
+    upgraded.flush()
+
+    day = history_store._day(TS)
+    paths = upgraded._segments(day, "10.0.0.3", "icmp")
+    assert [os.path.basename(p) for p in paths] == ["icmp.c%d.seg" % len(wider), "icmp.seg"]
+    check_segment(paths[0], len(wider))
+    check_segment(paths[1], len(ICMP_METRICS))
+    assert upgraded.query("10.0.0.3", "latency_avg_ms", TS, TS + 60) == [(TS, 1.0), (TS + 60, 2.0)]
+    assert upgraded.query("10.0.0.3", "new_metric", TS, TS + 60) == [(TS + 60, 7.0)]
+
+def test_only_ip_addresses_become_device_directories(tmp_path):
+    root = tmp_path / "history"
+    store = HistoryStore(str(root), retention_days=0)
+    for bad in (str(tmp_path / "outside"), "../outside", "a..b", "host.example"):
+        with pytest.raises(ValueError):
+            store.append(bad, "icmp", TS, values(1))
+    store.flush()
+    assert sorted(os.listdir(tmp_path)) == ["history"] and os.listdir(root) == []
+
+    # One directory per address, however it was written
+    store.append("2001:db8::1", "icmp", TS, values(1))
+    store.append("2001:0db8:0:0::1", "icmp", TS + 60, values(2))
+    assert len(store.query("2001:db8:0::1", "latency_avg_ms", TS, TS + 60)) == 2
+    assert os.listdir(root / history_store._day(TS)) == ["2001_db8__1"]
+
+def test_history_endpoint_rejects_non_addresses(tmp_path, monkeypatch):
+    network_api = pytest.importorskip("network_api") # Flask app module
+    monkeypatch.setattr(network_api, "history_store", HistoryStore(str(tmp_path), retention_days=0))
+    client = network_api.app.test_client()
+    auth = {"Authorization": "Basic " + base64.b64encode(b"admin:password").decode()}
+
+    response = client.get("/history", query_string={"ip": "../../etc", "metric": "latency_avg_ms"}, headers=auth)
+    assert response.status_code == 400
+    response = client.get("/history", query_string={"ip": "10.0.0.1"}, headers=auth)
+    assert response.status_code == 200 and response.get_json()["metrics"] == []
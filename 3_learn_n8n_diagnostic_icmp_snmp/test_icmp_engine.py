@@ -0,0 +1,76 @@
+import base64
+
+import pytest
+
+import icmp_engine
+
+# In-process ICMP engine: target resolution, the API's target validation and
+# the RTT statistics of a probe.
+#
+#   python -m pytest -q test_icmp_engine.py
+
+AUTH = {"Authorization": "Basic " + base64.b64encode(b"admin:password").decode()}
+
+@pytest.mark.parametrize("name", ["a..b", "../x", "nonexistent.invalid"])
+def test_unresolvable_target_yields_unknown(name):
+    if not icmp_engine.icmp_available():
+        pytest.skip("no ICMP socket permission")
+    with icmp_engine.IcmpProber() as prober:
+        [(target, result)] = list(prober.probe([name], count=1, timeout=0.2))
+    assert target == name
+    assert result["status"] == "UNKNOWN" and result["error"].startswith("Ping error:")
+
+@pytest.mark.parametrize("path", ["/icmp/status", "/icmp/qos", "/snmp/data"])
+@pytest.mark.parametrize("target", ["a..b", "/tmp/outside", "10.0.0.300"])
+def test_endpoints_reject_non_addresses(path, target):
+    network_api = pytest.importorskip("network_api") # Flask app module
+    response = network_api.app.test_client().post(path, json={"ip": target}, headers=AUTH)
+    assert response.status_code == 400
+    assert "does not appear to be an IPv4 or IPv6 address" in response.get_json()["error"]
+
+# --- RTT statistics (pure functions) ---
+
+def test_loss_bursts_are_runs_of_lost_echoes():
+    nan = float("nan")
+    stats = icmp_engine.rtt_statistics([1.0, None, None, 2.0, nan, 3.0, None, None, None])
+    assert stats["loss_bursts"] == 3
+    assert stats["loss_burst_max"] == 3
+    assert icmp_engine.rtt_statistics([None, None]) == {"loss_bursts": 1, "loss_burst_max": 2}
+    assert icmp_engine.rtt_statistics([1.0, 2.0])["loss_bursts"] == 0
+
+def test_percentiles_interpolate_between_ranks():
+    ordered = [10.0, 20.0, 30.0, 40.0]
+    assert icmp_engine.percentile(ordered, 0) == 10.0
+    assert icmp_engine.percentile(ordered, 50) == 25.0
+    assert icmp_engine.percentile(ordered, 95) == pytest.approx(38.5)
+    assert icmp_engine.percentile(ordered, 100) == 40.0
+    assert icmp_engine.percentile([7.0], 99) == 7.0
+
+    # rtt_statistics sorts the replies itself and ignores lost echoes
+    stats = icmp_engine.rtt_statistics([40.0, None, 10.0, 30.0, 20.0])
+    assert (stats["latency_p50_ms"], stats["latency_p95_ms"], stats["latency_p99_ms"]) == (25.0, 38.5, 39.7)
+
+def test_rfc3550_jitter_recurrence():
+    # D = 4, 2, 8 between consecutive replies; J += (|D| - J) / 16
+    stats = icmp_engine.rtt_statistics([10.0, 14.0, 12.0, 20.0])
+    expected = 0.0
+    for d in (4.0, 2.0, 8.0):
+        expected += (d - expected) / 16.0
+    assert stats["jitter_rfc3550_ms"] == round(expected, 3) == 0.837
+    assert stats["ipdv_avg_ms"] == round(14.0 / 3, 3)
+    # A lost echo is skipped: D is taken between the replies around it
+    assert icmp_engine.rtt_statistics([10.0, None, 14.0])["jitter_rfc3550_ms"] == 0.25
+    assert icmp_engine.rtt_statistics([10.0])["jitter_rfc3550_ms"] == 0.0
+
+def test_summarize_rtts_matches_ping_summary():
+    result = icmp_engine.summarize_rtts([1.0, None, 3.0, None], 4, keep_rtts=True)
+    assert result["status"] == "UP"
+    assert result["packet_loss_pct"] == 50.0
+    assert (result["latency_min_ms"], result["latency_avg_ms"], result["latency_max_ms"]) == (1.0, 2.0, 3.0)
+    assert result["jitter_ms"] == 1.0 # iputils mdev: sqrt(mean(r^2) - mean(r)^2)
+    assert (result["packets_sent"], result["packets_received"]) == (4, 2)
+    assert result["rtt_ms"] == [1.0, None, 3.0, None]
+
+    down = icmp_engine.summarize_rtts([None, None], 2)
+    assert down["status"] == "DOWN" and down["packet_loss_pct"] == 100.0
+    assert down["loss_burst_max"] == 2 and "rtt_ms" not in down
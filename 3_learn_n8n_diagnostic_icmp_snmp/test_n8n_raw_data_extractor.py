@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from snmp_standin_agent import SnmpStandinAgent, build_demo_mib
+
+# n8n Code node script against the local UDP stand-in SNMP agent. The script ends
+# with a top-level `return` (n8n wraps it in a function), so only the part above
+# its execution block is loaded here.
+#
+#   python -m pytest -q test_n8n_raw_data_extractor.py
+
+PING_UP = {"status": "UP", "packet_loss_pct": 0.0, "latency_avg_ms": 1.0,
+           "latency_min_ms": 1.0, "latency_max_ms": 1.0, "jitter_ms": 0.0}
+
+@pytest.fixture(scope="module")
+def extractor():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "n8n_raw_data_extractor.py")
+    with open(path) as f:
+        source = f.read().split("# --- EXECUTION BLOCK ---")[0]
+    namespace = {"__name__": "n8n_raw_data_extractor"}
+    exec(compile(source, path, "exec"), namespace)
+    return namespace
+
+@pytest.fixture
+def agent():
+    agent = SnmpStandinAgent(build_demo_mib(12), port=0).start()
+    yield agent
+    agent.stop()
+
+def collector(extractor, monkeypatch, community, port):
+    monkeypatch.setattr(extractor["NetworkCollector"], "ping_diagnostic", lambda self: dict(PING_UP))
+    # Native engine: never forks snmpwalk
+    monkeypatch.setattr(extractor["subprocess"], "check_output", lambda *a, **k: pytest.fail(f"forked {a}"))
+    return extractor["NetworkCollector"]("127.0.0.1", community, timeout=5.0, snmp_port=port)
+
+def test_native_snmp_collection(extractor, agent, monkeypatch):
+    data = collector(extractor, monkeypatch, "public", agent.port).collect_full_diagnostic()
+
+    assert data["overall_status"] == "UP" and data["snmp_status"] == "UP"
+    assert data["device_info"] == "Stand-in SNMP agent (network_api test)"
+    assert data["uptime_raw"] == "0:0:20:34.56"
+    assert data["interfaces_count"] == 12
+    assert data["interfaces_detail"][4] == {"id": "5", "name": "GigabitEthernet0/5",
+                                            "admin_status": "UP", "oper_status": "DOWN"}
+    assert agent.requests == 2 # 1 GET + 1 GETBULK instead of 5 snmpwalk processes
+
+def test_table_walk_spans_several_getbulks(extractor, agent, monkeypatch):
+    monkeypatch.setitem(extractor, "SNMP_MAX_REPETITIONS", 5)
+    data = collector(extractor, monkeypatch, "public", agent.port).collect_full_diagnostic()
+    assert data["interfaces_count"] == 12
+    assert [row["id"] for row in data["interfaces_detail"]] == [str(i) for i in range(1, 11)]
+    assert agent.requests == 1 + 3
+
+def test_silent_agent_is_snmp_down(extractor, agent, monkeypatch):
+    monkeypatch.setitem(extractor, "SNMP_TIMEOUT", 0.2)
+    data = collector(extractor, monkeypatch, "wrong", agent.port).collect_full_diagnostic()
+    assert data["snmp_status"] == "DOWN" and data["interfaces_count"] == 0
+    assert agent.requests == 0
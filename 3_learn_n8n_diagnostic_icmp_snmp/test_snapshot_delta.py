@@ -0,0 +1,62 @@
+import pytest
+
+from snapshot_delta import SnapshotStore, NO_TOKEN, UNKNOWN_TOKEN, EXPIRED_TOKEN
+
+# Delta mode state, in memory and shared through SQLite between "workers"
+# (two SnapshotStore instances on one file).
+
+def table(oper_down=(), octets=0):
+    return [{"id": str(i), "name": f"Gi0/{i}", "admin_status": "UP",
+             "oper_status": "DOWN" if i in oper_down else "UP", "speed_mbps": 1000,
+             "counters": {"in_octets": octets + i, "out_octets": octets}}
+            for i in range(1, 9)]
+
+@pytest.fixture(params=["memory", "sqlite"])
+def stores(request, tmp_path):
+    """Two stores that should behave as one (two gunicorn workers)"""
+    if request.param == "memory":
+        store = SnapshotStore()
+        return store, store
+    path = str(tmp_path / "snapshots.sqlite")
+    return SnapshotStore(path=path), SnapshotStore(path=path)
+
+def test_delta_returns_only_changes(stores):
+    first, second = stores
+    full = first.delta("10.0.0.1:161", table())
+    assert full["full"] and full["reason"] == NO_TOKEN and len(full["changed"]) == 8
+
+    delta = second.delta("10.0.0.1:161", table(oper_down=[3]), since=full["version"], fields="status")
+    assert not delta["full"] and delta["reason"] is None
+    assert [row["id"] for row in delta["changed"]] == ["3"]
+    assert delta["unchanged_count"] == 7
+
+    again = first.delta("10.0.0.1:161", table(oper_down=[3]), since=delta["version"])
+    assert again["version"] == delta["version"] and again["changed"] == []
+
+    counters = second.delta("10.0.0.1:161", table(oper_down=[3], octets=500), since=again["version"])
+    assert len(counters["changed"]) == 8
+    shrunk = first.delta("10.0.0.1:161", table(oper_down=[3], octets=500)[:6], since=counters["version"])
+    assert shrunk["removed"] == ["7", "8"] and shrunk["changed"] == []
+
+def test_full_snapshot_reasons(stores, tmp_path):
+    first, second = stores
+    token = first.delta("10.0.0.2:161", table())["version"]
+    assert second.delta("10.0.0.2:161", table(), since="bogus")["reason"] == UNKNOWN_TOKEN
+    assert second.delta("10.0.0.2:161", table(), since=token.split(".")[0] + ".99")["reason"] == EXPIRED_TOKEN
+    assert second.delta("10.0.0.2:161", table(), since=first.epoch + "-0000.1")["reason"] == EXPIRED_TOKEN
+    other = SnapshotStore(path=str(tmp_path / "other.sqlite"))
+    assert other.delta("10.0.0.2:161", table(), since=token)["reason"] == UNKNOWN_TOKEN
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = str(tmp_path / "snapshots.sqlite")
+    token = SnapshotStore(path=path).observe("10.0.0.3:161", table())
+    restarted = SnapshotStore(path=path)
+    delta = restarted.delta("10.0.0.3:161", table(oper_down=[1]), since=token)
+    assert not delta["full"] and [row["id"] for row in delta["changed"]] == ["1"]
+    assert restarted.stats()["devices"] == 1 and restarted.stats()["interfaces"] == 8
+
+def test_sqlite_store_evicts_least_recently_used(tmp_path):
+    store = SnapshotStore(max_devices=2, path=str(tmp_path / "snapshots.sqlite"))
+    tokens = {ip: store.observe(ip, table()) for ip in ("a", "b", "c")}
+    assert store.stats()["devices"] == 2
+    assert store.delta("a", table(), since=tokens["a"])["reason"] == EXPIRED_TOKEN
@@ -0,0 +1,122 @@
+import socket
+import threading
+import time
+
+import pytest
+
+import collector
+import snmp_engine
+from snmp_engine import SnmpClient, TableWalk, build_getbulk
+from snmp_standin_agent import SnmpStandinAgent, build_demo_mib, SYS_DESCR, SYS_UPTIME, IF_TABLE_ENTRY, IF_X_TABLE_ENTRY
+
+# Native SNMPv2c engine against the local UDP stand-in agent (ephemeral port).
+#
+#   python -m pytest -q test_snmp_engine.py
+
+INTERFACES = 12
+
+@pytest.fixture
+def agent():
+    agent = SnmpStandinAgent(build_demo_mib(INTERFACES), port=0).start()
+    yield agent
+    agent.stop()
+
+def test_get_decodes_scalars(agent):
+    missing = "1.3.6.1.2.1.1.99.0"
+    with SnmpClient("127.0.0.1", port=agent.port, timeout=1.0) as client:
+        result = client.get([SYS_DESCR, SYS_UPTIME, missing])
+
+    assert result[SYS_DESCR] == (snmp_engine.OCTET_STRING, b"Stand-in SNMP agent (network_api test)")
+    assert result[SYS_UPTIME] == (snmp_engine.TIMETICKS, 123456)
+    assert result[missing] == (snmp_engine.NO_SUCH_OBJECT, None)
+    assert snmp_engine.format_value(*result[SYS_UPTIME]) == "0:0:20:34.56"
+    assert agent.requests == 1 # all scalars in one GET
+
+def test_getbulk_walk_ends_on_end_of_mib_view(agent):
+    # ifHighSpeed is the last column of the stand-in MIB: the walk runs off its end
+    columns = [f"{IF_TABLE_ENTRY}.2", f"{IF_TABLE_ENTRY}.8", f"{IF_X_TABLE_ENTRY}.15"]
+    walk = TableWalk(columns, max_repetitions=5)
+    rows, responses = [], []
+    with SnmpClient("127.0.0.1", port=agent.port, timeout=1.0) as client:
+        while not walk.done:
+            varbinds = client.request(build_getbulk, walk.next_oids(), 0, walk.max_repetitions)
+            responses.append(varbinds)
+            rows.extend(walk.feed(varbinds))
+        rows.extend(walk.flush())
+
+    assert len(responses) == 3 # 12 rows at 5 repetitions per GETBULK
+    assert agent.requests == 3
+    assert responses[-1][-1][1] == snmp_engine.END_OF_MIB_VIEW
+    assert [idx for idx, _ in rows] == [str(i) for i in range(1, INTERFACES + 1)]
+    idx, (descr, oper, speed) = rows[4]
+    assert descr == (snmp_engine.OCTET_STRING, b"GigabitEthernet0/5")
+    assert oper == (snmp_engine.INTEGER, 2) # every 5th port is oper DOWN
+    assert speed == (snmp_engine.GAUGE32, 1000)
+
+def test_walk_table_streams_whole_if_table(agent):
+    columns = [f"{IF_TABLE_ENTRY}.{c}" for c in (2, 7, 8, 10)]
+    with SnmpClient("127.0.0.1", port=agent.port, timeout=1.0) as client:
+        rows = list(client.walk_table(columns, max_repetitions=4))
+
+    assert len(rows) == INTERFACES
+    assert agent.requests == 4 # 3 full GETBULKs + the one that walks past the last row
+    assert all(len(cells) == len(columns) and None not in cells for _, cells in rows)
+
+def test_wrong_community_times_out_and_is_negatively_cached(agent, monkeypatch):
+    network_api = pytest.importorskip("network_api") # Flask app module
+    with SnmpClient("127.0.0.1", "wrong", port=agent.port, timeout=0.2, retries=0) as client:
+        with pytest.raises(snmp_engine.SnmpTimeout):
+            client.get([SYS_DESCR])
+    assert agent.requests == 0 # the agent stays silent on a bad community
+
+    monkeypatch.setattr(collector, "SNMP_ENGINE", "native")
+    monkeypatch.setattr(collector, "SNMP_PORT", agent.port)
+    monkeypatch.setattr(collector.snmp_pool, "timeout", 0.2)
+    monkeypatch.setattr(collector.snmp_pool, "retries", 0)
+    network_api.probe_cache.clear()
+
+    result, status = network_api.cached_snmp("127.0.0.1", "wrong")
+    assert status == "MISS"
+    assert result == {"snmp_status": "DOWN", "error": "No SNMP response"}
+
+    # The failure is cached: the repeat answers at once instead of waiting out the timeout again
+    started = time.perf_counter()
+    result, status = network_api.cached_snmp("127.0.0.1", "wrong")
+    assert status == "HIT"
+    assert result["snmp_status"] == "DOWN"
+    assert time.perf_counter() - started < 0.1
+    assert agent.requests == 0
+    # A silent agent is not the same as missing OIDs: nothing went into the OID negative cache
+    assert collector.snmp_pool.state("127.0.0.1", "wrong", agent.port).unsupported == {}
+
+@pytest.mark.parametrize("host", ["nonexistent.invalid", "a..b"])
+def test_unresolvable_agent_is_an_snmp_error(host):
+    with SnmpClient(host, timeout=0.2, retries=0) as client:
+        with pytest.raises(snmp_engine.SnmpError):
+            client.get([SYS_DESCR])
+    # ... so the collector reports the device as silent instead of raising
+    assert collector.NetworkCollector(host).collect_snmp_data() == {"snmp_status": "DOWN", "error": "No SNMP response"}
+
+def test_garbled_datagram_does_not_abort_the_request(agent):
+    # Relay that answers every request with a truncated datagram before the agent's reply
+    relay = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    relay.bind(("127.0.0.1", 0))
+    upstream = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    upstream.connect(("127.0.0.1", agent.port))
+
+    def serve():
+        data, client = relay.recvfrom(65535)
+        relay.sendto(b"\x30\x82\x01\x00\x02\x01", client)
+        upstream.send(data)
+        relay.sendto(upstream.recv(65535), client)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    try:
+        with SnmpClient("127.0.0.1", port=relay.getsockname()[1], timeout=1.0, retries=0) as client:
+            result = client.get([SYS_UPTIME])
+    finally:
+        thread.join(1.0)
+        relay.close()
+        upstream.close()
+    assert result[SYS_UPTIME] == (snmp_engine.TIMETICKS, 123456)
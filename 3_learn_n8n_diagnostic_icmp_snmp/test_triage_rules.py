@@ -0,0 +1,50 @@
+from triage_rules import triage, render_report, HEALTHY, WARNING, CRITICAL
+
+# Rule pre-triage: which results the rules settle on their own (conclusive)
+# and which are left to the LLM.
+
+def port(index, admin="UP", oper="UP", **rates):
+    return {"id": str(index), "name": f"Gi0/{index}", "admin_status": admin, "oper_status": oper, "rates": rates}
+
+def result(icmp=None, snmp_status="UP", interfaces=()):
+    return {
+        "ip": "10.0.0.1",
+        "icmp_metrics": icmp or {"status": "UP", "packet_loss_pct": 0.0, "jitter_ms": 0.4},
+        "snmp_status": snmp_status,
+        "interfaces_detail": list(interfaces),
+    }
+
+def rules(verdict):
+    return [f["rule"] for f in verdict["findings"]]
+
+def test_healthy_device_is_conclusive():
+    verdict = triage(result(interfaces=[port(1), port(2, admin="DOWN", oper="DOWN")]))
+    assert (verdict["verdict"], verdict["conclusive"], verdict["findings"]) == (HEALTHY, True, [])
+    assert "[rule-based]" in render_report(verdict, "10.0.0.1")
+
+def test_single_category_is_conclusive():
+    verdict = triage(result(interfaces=[port(1), port(2, oper="DOWN"), port(3, in_errors_ps=0.5)]))
+    assert rules(verdict) == ["admin_up_oper_down", "interface_errors"] # both "physical"
+    assert (verdict["verdict"], verdict["conclusive"]) == (WARNING, True)
+
+def test_unreachable_device_is_conclusive():
+    verdict = triage(result(icmp={"status": "DOWN"}, snmp_status="DOWN", interfaces=[port(1, oper="DOWN")]))
+    assert rules(verdict) == ["icmp_down"] # nothing else could be measured
+    assert (verdict["verdict"], verdict["conclusive"]) == (CRITICAL, True)
+
+def test_symptoms_in_several_categories_are_inconclusive():
+    icmp = {"status": "UP", "packet_loss_pct": 60.0, "jitter_ms": 0.4}
+    verdict = triage(result(icmp=icmp, snmp_status="DOWN", interfaces=[port(1, out_errors_ps=2.0)]))
+    assert rules(verdict) == ["packet_loss", "snmp_down_ping_up", "interface_errors"]
+    assert (verdict["verdict"], verdict["conclusive"]) == (CRITICAL, False)
+    assert len(verdict["next_steps"]) == 3
+
+def test_unknown_states_are_inconclusive():
+    unknown_icmp = triage(result(icmp={"status": "UNKNOWN", "error": "Ping error: timeout"}))
+    assert rules(unknown_icmp) == ["icmp_unknown"] and not unknown_icmp["conclusive"]
+
+    odd_port = triage(result(interfaces=[port(1, oper="TESTING")]))
+    assert rules(odd_port) == ["interface_state_unknown"] and not odd_port["conclusive"]
+
+    # Nothing measured at all: nothing to conclude either
+    assert triage({"ip": "10.0.0.1"})["conclusive"] is False
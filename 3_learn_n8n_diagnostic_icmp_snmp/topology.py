@@ -0,0 +1,91 @@
+import threading
+import time
+
+# Topology-aware polling.
+# Inventory devices may name their upstream device ("parent": IP). When the
+# nearest ancestor with a recent ICMP result is down, a device is not probed at
+# all: it is recorded as unreachable behind that parent, so an outage of a
+# distribution switch costs one probe instead of a timeout storm for
+# everything behind it. Probing resumes on the device's next tick once the
+# parent answers again.
+
+SUPPRESSED_REASON = "unreachable (parent down)"
+STALE_INTERVALS = 2 # an ancestor's result older than this many of its intervals is ignored
+
+def check_parents(devices):
+    """Raise ValueError for a parent that is not in the inventory or a dependency cycle"""
+    parents = {d["ip"]: d.get("parent") for d in devices}
+    for ip, parent in parents.items():
+        if parent and parent not in parents:
+            raise ValueError(f"{ip}: parent {parent} is not in the inventory")
+    for ip in parents:
+        seen = {ip}
+        parent = parents[ip]
+        while parent:
+            if parent in seen:
+                raise ValueError(f"{ip}: dependency cycle through parent {parent}")
+            seen.add(parent)
+            parent = parents.get(parent)
+
+def root_of(devices):
+    """{ip: topmost ancestor ip} (the device itself when it has no parent in `devices`)"""
+    parents = {d["ip"]: d.get("parent") for d in devices}
+    roots = {}
+    for ip in parents:
+        root, hops = ip, 0
+        while parents.get(root) in parents and hops < len(parents):
+            root, hops = parents[root], hops + 1
+        roots[ip] = root
+    return roots
+
+def suppressed_results(parent_ip, snmp=True):
+    """(icmp result, snmp result or None) recorded for a device behind a down parent"""
+    icmp = {"status": "UNREACHABLE", "error": SUPPRESSED_REASON, "parent": parent_ip, "suppressed": True}
+    if not snmp:
+        return icmp, None
+    return icmp, {"snmp_status": "UNREACHABLE", "error": SUPPRESSED_REASON, "parent": parent_ip, "suppressed": True}
+
+class Topology:
+    """Parent links of an inventory plus the last probed reachability of every device"""
+
+    def __init__(self, devices):
+        self.parents = {d["ip"]: d.get("parent") for d in devices if d.get("parent")}
+        self.intervals = {d["ip"]: d["interval"] for d in devices}
+        self.suppressed = 0
+        self._down = {} # ip -> (down, ts) of its last real probe
+        self._lock = threading.Lock()
+
+    def report(self, ip, icmp_result, ts=None):
+        """Record a poll result; suppressed results say nothing about the device itself"""
+        if not self.parents:
+            return # flat inventory: nothing depends on anything
+        with self._lock:
+            if icmp_result.get("suppressed"):
+                self._down.pop(ip, None)
+                self.suppressed += 1
+            else:
+                self._down[ip] = (icmp_result.get("status") == "DOWN", time.time() if ts is None else ts)
+
+    def down_parent(self, ip, now=None):
+        """IP of the nearest ancestor whose recent probe found it DOWN, None if the path looks up (or unknown)"""
+        parent = self.parents.get(ip)
+        if parent is None:
+            return None
+        now = time.time() if now is None else now
+        with self._lock:
+            hops = 0
+            while parent is not None and hops <= len(self.parents):
+                state = self._down.get(parent)
+                if state is not None and now - state[1] <= STALE_INTERVALS * self.intervals.get(parent, 0):
+                    # The nearest fresh answer decides: an ancestor that is up means the path is up
+                    return parent if state[0] else None
+                parent, hops = self.parents.get(parent), hops + 1
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "dependent_devices": len(self.parents),
+                "down": sorted(ip for ip, (down, _) in self._down.items() if down),
+                "suppressed_polls": self.suppressed
+            }
@@ -0,0 +1,143 @@
+# Rule-based pre-triage of one diagnostic result.
+# The interpretation rules of the troubleshooting prompt, evaluated in-process:
+# every rule that fires adds a finding (category, severity, detail, next steps)
+# and the worst severity is the health verdict. The verdict is "conclusive"
+# when the data is fully understood by the rules: a healthy device, or issues
+# of a single category (e.g. only physical port problems). Unknown states or
+# symptoms in several categories at once (loss + port errors + SNMP silent)
+# need correlation, which is left to the LLM.
+
+HEALTHY, WARNING, CRITICAL = "Healthy", "Warning", "Critical"
+SEVERITY_RANK = {HEALTHY: 0, WARNING: 1, CRITICAL: 2}
+
+LOSS_CRITICAL_PCT = 50.0
+JITTER_WARN_MS = 20.0
+UTIL_WARN_PCT = 90.0
+
+def _finding(rule, category, severity, detail, next_steps, conclusive=True):
+    return {"rule": rule, "category": category, "severity": severity, "detail": detail,
+            "next_steps": next_steps, "conclusive": conclusive}
+
+def _icmp_findings(icmp, findings):
+    status = icmp.get("status")
+    if status == "DOWN":
+        findings.append(_finding("icmp_down", "reachability", CRITICAL,
+                                 "Device does not answer ICMP (100% loss).",
+                                 ["Check power and the uplink cable / upstream port of the device",
+                                  "traceroute to the device to find where the path stops"]))
+        return
+    if status != "UP":
+        findings.append(_finding("icmp_unknown", "reachability", WARNING,
+                                 f"ICMP probe result is {status}: {icmp.get('error', 'no detail')}.",
+                                 ["Re-run the probe and check the collector host's network access"],
+                                 conclusive=False))
+        return
+    loss = icmp.get("packet_loss_pct") or 0.0
+    if loss > 0:
+        severity = CRITICAL if loss >= LOSS_CRITICAL_PCT else WARNING
+        findings.append(_finding("packet_loss", "icmp", severity, f"{loss:g}% packet loss.",
+                                 ["Extended ping (e.g. 100 packets) to measure the loss pattern",
+                                  "Check interface error counters along the path"]))
+    jitter = icmp.get("jitter_ms") or 0.0
+    if jitter > JITTER_WARN_MS:
+        findings.append(_finding("high_jitter", "icmp", WARNING,
+                                 f"Jitter {jitter:g} ms (> {JITTER_WARN_MS:g} ms): congestion or bad cabling.",
+                                 ["Check uplink utilisation and QoS queue drops",
+                                  "Inspect / replace the cabling on the path"]))
+
+def _interface_findings(interfaces, findings):
+    link_down, other_state, errors, saturated = [], [], [], []
+    for row in interfaces:
+        admin, oper = row.get("admin_status"), row.get("oper_status")
+        name = row.get("name") or row.get("id")
+        if admin == "UP" and oper == "DOWN":
+            link_down.append(name)
+        elif (admin == "UP" and oper != "UP") or admin not in ("UP", "DOWN"):
+            other_state.append(f"{name} ({admin}/{oper})")
+        if admin == "DOWN":
+            continue
+        rates = row.get("rates") or {}
+        if any(rates.get(k) for k in ("in_errors_ps", "out_errors_ps", "in_discards_ps", "out_discards_ps")):
+            errors.append(name)
+        if max(rates.get("in_util_pct") or 0, rates.get("out_util_pct") or 0) >= UTIL_WARN_PCT:
+            saturated.append(name)
+
+    if link_down:
+        findings.append(_finding("admin_up_oper_down", "physical", WARNING,
+                                 f"{len(link_down)} port(s) admin UP / oper DOWN: {', '.join(map(str, link_down[:20]))}"
+                                 + (" ..." if len(link_down) > 20 else "") + ". Physical layer (cable unplugged, SFP, remote end).",
+                                 ["Check cable and SFP of the listed ports and the remote side",
+                                  "show interfaces status / show logging | include LINK"]))
+    if errors:
+        findings.append(_finding("interface_errors", "physical", WARNING,
+                                 f"Errors or discards increasing on: {', '.join(map(str, errors[:20]))}.",
+                                 ["show interfaces counters errors on the listed ports",
+                                  "Check duplex / speed mismatch and replace the cable"]))
+    if saturated:
+        findings.append(_finding("saturated", "capacity", WARNING,
+                                 f"Utilisation >= {UTIL_WARN_PCT:g}% on: {', '.join(map(str, saturated[:20]))}.",
+                                 ["Identify top talkers on the saturated ports", "Consider a bundle / faster uplink"]))
+    if other_state:
+        findings.append(_finding("interface_state_unknown", "physical", WARNING,
+                                 f"Ports in unusual states: {', '.join(other_state[:20])}.",
+                                 ["Check the port state on the device CLI"], conclusive=False))
+
+def triage(data):
+    """
+    Structured verdict of a diagnostic result:
+    {"verdict", "conclusive", "findings": [...], "next_steps": [...]}
+    """
+    findings = []
+    icmp = data.get("icmp_metrics") or data.get("icmp") or data.get("ping_diagnostics")
+    if icmp:
+        _icmp_findings(icmp, findings)
+    elif data.get("status") == "DOWN" or data.get("overall_status") == "DOWN":
+        _icmp_findings({"status": "DOWN"}, findings)
+
+    reachable = not findings or findings[0]["rule"] != "icmp_down"
+    snmp_status = data.get("snmp_status")
+    if reachable and snmp_status == "DOWN":
+        findings.append(_finding("snmp_down_ping_up", "snmp", WARNING,
+                                 "Device answers ping but not SNMP: community string or ACL / SNMP view issue.",
+                                 ["Verify the SNMP community and the ACL that allows this collector",
+                                  "snmpwalk -v2c -c <community> <ip> sysDescr from the collector host"]))
+    elif reachable and snmp_status not in (None, "UP", "DOWN"):
+        findings.append(_finding("snmp_unknown", "snmp", WARNING, f"SNMP status is {snmp_status}.",
+                                 ["Check the collector's SNMP configuration"], conclusive=False))
+    if reachable:
+        _interface_findings(data.get("interfaces_detail") or [], findings)
+
+    verdict = HEALTHY
+    for f in findings:
+        if SEVERITY_RANK[f["severity"]] > SEVERITY_RANK[verdict]:
+            verdict = f["severity"]
+    categories = {f["category"] for f in findings}
+    # Unreachable says it all: nothing else could be measured
+    conclusive = (not findings or not reachable
+                  or (len(categories) == 1 and all(f["conclusive"] for f in findings)))
+    if not icmp and snmp_status is None and not data.get("interfaces_detail"):
+        conclusive = False # nothing measured, nothing to conclude
+    next_steps = []
+    for f in findings:
+        next_steps.extend(s for s in f["next_steps"] if s not in next_steps)
+    return {"verdict": verdict, "conclusive": conclusive, "findings": findings, "next_steps": next_steps[:3]}
+
+def render_report(result, ip=None):
+    """Text report of a triage() result in the layout the LLM is asked for"""
+    lines = [f"**Health Verdict: {result['verdict']}**" + (f" ({ip})" if ip else "") + " [rule-based]", ""]
+    if not result["findings"]:
+        lines.append("No loss, normal jitter, SNMP reachable and no interface anomalies.")
+    for i, f in enumerate(result["findings"], 1):
+        lines.append(f"{i}. [{f['severity']}] {f['detail']}")
+    if result["next_steps"]:
+        lines.append("")
+        lines.append("Next steps:")
+        lines.extend(f"- {step}" for step in result["next_steps"])
+    return "\n".join(lines)
+
+def findings_hint(result):
+    """Compact rule findings for an LLM prompt ("explain" mode)"""
+    if not result["findings"]:
+        return f"Rule pre-triage: {result['verdict']}, no rule fired."
+    return f"Rule pre-triage: {result['verdict']}. " + " ".join(
+        f"[{f['rule']}] {f['detail']}" for f in result["findings"])